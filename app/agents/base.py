@@ -3,6 +3,8 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, List
 from app.rag.rag_service import RAGService
+from app.rag.ingestion_queue import KnowledgeIngestionQueue
+from app.core.execution_metrics import record_llm_call
 import logging
 
 # Setup logging
@@ -16,6 +18,8 @@ class BaseAgent(ABC):
         """Initialize the base agent with RAG service access."""
         self.rag_service = RAGService.get_instance()
         self.generated_knowledge = []
+        # Set by the workflow engine, which stores each step's knowledge once the step finishes
+        self.defer_knowledge_writes = False
         logger.info("Initializing BaseAgent")
 
     @abstractmethod
@@ -49,6 +53,28 @@ class BaseAgent(ABC):
         """Return the JSON schema for agent configuration."""
         pass
 
+    def generate_content(self, prompt: Any):
+        """
+        Call the agent's LLM (self.model) with a prompt.
+
+        The call and its token usage are counted toward the workflow step
+        running it, for the execution history.
+
+        Args:
+            prompt: Prompt passed to the model's generate_content()
+
+        Returns:
+            The model's response
+        """
+        tokens = 0
+        try:
+            response = self.model.generate_content(prompt)
+            usage = getattr(response, "usage_metadata", None)
+            tokens = getattr(usage, "total_token_count", 0) or 0
+            return response
+        finally:
+            record_llm_call(tokens)
+
     def add_knowledge(
         self,
         collection_name: str,
@@ -56,18 +82,17 @@ class BaseAgent(ABC):
         metadata: Optional[Dict[str, Any]] = None,
     ):
         """
-        Add knowledge to a RAG collection and record it.
+        Record knowledge for a RAG collection and queue it for storage.
+
+        The document is written by the background ingestion queue, so no
+        embedding happens here. Inside a workflow the engine submits it when
+        the step finishes; otherwise it is queued immediately.
 
         Args:
             collection_name: Name of the collection to add to
             document: Text document to add
             metadata: Optional metadata for the document
         """
-        self.rag_service.add_documents(
-            collection_name=collection_name,
-            documents=[document],
-            metadatas=[metadata] if metadata else None,
-        )
         self.generated_knowledge.append(
             {
                 "collection": collection_name,
@@ -75,7 +100,9 @@ class BaseAgent(ABC):
                 "metadata": metadata or {},
             }
         )
-        logger.info(f"Added knowledge to collection: {collection_name}")
+        if not self.defer_knowledge_writes:
+            KnowledgeIngestionQueue.get_instance().submit(collection_name, document, metadata)
+        logger.info(f"Queued knowledge for collection: {collection_name}")
 
     def get_generated_knowledge(self) -> List[Dict[str, Any]]:
         """Get knowledge generated by this agent instance."""
@@ -87,6 +114,9 @@ class BaseAgent(ABC):
         query: str,
         collection_name: Optional[str] = None,
         context: Optional[Dict[str, Any]] = None,
+        n_results: int = 5,
+        rerank: bool = False,
+        token_budget: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """
         Search for knowledge in collections.
@@ -95,6 +125,9 @@ class BaseAgent(ABC):
             query: Text query to search for
             collection_name: Specific collection to search (if None, uses shared collections)
             context: Workflow context that may contain RAG information
+            n_results: Number of results to return per collection
+            rerank: Rescore candidates locally and return a deduplicated top-k
+            token_budget: With rerank, cap on the total tokens of returned documents
 
         Returns:
             List of relevant documents
@@ -103,20 +136,32 @@ class BaseAgent(ABC):
             f"Searching knowledge with query: {query}, collection: {collection_name}"
         )
         if collection_name:
-            return self.rag_service.search(collection_name, query)
+            return self.rag_service.search(
+                collection_name,
+                query,
+                n_results,
+                rerank=rerank,
+                token_budget=token_budget,
+            )
 
         # If no specific collection, check context for shared collections
         if context and "rag_context" in context:
             results = []
             shared_collections = context["rag_context"].get("shared_collections", [])
 
-            for collection in shared_collections:
-                try:
-                    results.extend(self.rag_service.search(collection, query))
-                except Exception as e:
-                    logger.error(f"Error searching collection {collection}: {e}")
-                    pass
-
+            # Only the shared collections closest to the query are searched,
+            # with the query embedded once
+            by_collection = self.rag_service.search_across_collections(
+                query, n_results, shared_collections, route=True
+            )
+            for collection_results in by_collection.values():
+                results.extend(collection_results)
+
+            if rerank:
+                # Rerank the merged pool so the budget applies across collections
+                return self.rag_service.rerank_results(
+                    query, results, n_results, token_budget
+                )
             return results
 
         return []
@@ -55,7 +55,7 @@ class GrammarAndStyleChecker(BaseAgent):
         try:
             # Updated model name to use one from the available models list
             self.model = genai.GenerativeModel("gemini-1.5-pro")
-            response = self.model.generate_content(prompt)
+            response = self.generate_content(prompt)
             suggestions = response.text if response.text else "No grammar issues found."
 
             # Return the corrected text and suggestions
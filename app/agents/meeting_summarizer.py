@@ -157,7 +157,7 @@ Meeting Transcript:
 {transcript}
 """
         try:
-            response = self.model.generate_content(prompt)
+            response = self.generate_content(prompt)
             logger.info(f"Gemini summary generated (raw): {response.text}")  # Log Raw
             return response.text
         except Exception as e:
@@ -175,7 +175,7 @@ Meeting Transcript:
 {transcript}
 """
         try:
-            response = self.model.generate_content(prompt)
+            response = self.generate_content(prompt)
             logger.info(
                 f"Gemini participants generated (raw): {response.text}"
             )  # Log Raw
@@ -236,7 +236,7 @@ Meeting Transcript:
 {transcript}
 """
         try:
-            response = self.model.generate_content(prompt)
+            response = self.generate_content(prompt)
             logger.info(
                 f"Gemini action items generated (raw): {response.text}"
             )  # Log raw
@@ -274,7 +274,7 @@ Meeting Transcript:
 {transcript}
 """
         try:
-            response = self.model.generate_content(prompt)
+            response = self.generate_content(prompt)
             logger.info(f"Gemini duration generated (raw): {response.text}")  # Log raw
             try:
                 duration = int(response.text.strip())
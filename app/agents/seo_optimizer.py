@@ -1,54 +1,69 @@
 from typing import Dict, Any, Optional, List
 from app.agents.base import BaseAgent
 from app.rag.rag_service import RAGService
+from app.rag.seeding import KnowledgeSeeder
+
+SEO_KNOWLEDGE_COLLECTION = "seo_knowledge"
+SEO_KNOWLEDGE_SEED = "seo_best_practices"
+
+SEO_BEST_PRACTICES = [
+    "Use descriptive titles with primary keywords under 60 characters.",
+    "Create meta descriptions between 150-160 characters with a call to action.",
+    "Structure content with H1, H2, and H3 tags in hierarchical order.",
+    "Optimize images with descriptive filenames and alt text.",
+    "Ensure responsive design for mobile optimization.",
+    "Improve page loading speed by optimizing image sizes and leveraging browser caching.",
+    "Create high-quality, original content of at least 300 words per page.",
+    "Include relevant internal and external links with descriptive anchor text.",
+    "Use canonical tags to prevent duplicate content issues.",
+    "Create a logical site structure with breadcrumb navigation.",
+    "Implement schema markup for rich snippets in search results.",
+    "Ensure proper URL structure with keywords and logical hierarchy.",
+    "Create an XML sitemap and submit to search engines.",
+    "Use 301 redirects for changed or moved pages.",
+    "Set up Google Analytics and Google Search Console for monitoring.",
+]
+
+
+def register_seo_seed(collection_name: str = SEO_KNOWLEDGE_COLLECTION) -> str:
+    """Register the SEO best practices as a seed for a collection; returns the seed name."""
+    name = (
+        SEO_KNOWLEDGE_SEED
+        if collection_name == SEO_KNOWLEDGE_COLLECTION
+        else f"{SEO_KNOWLEDGE_SEED}:{collection_name}"
+    )
+    seeder = KnowledgeSeeder.get_instance()
+    if name in seeder.seeds:
+        return name
+    seeder.register(
+        name,
+        collection_name,
+        SEO_BEST_PRACTICES,
+        metadatas=[{"type": "seo_best_practice"} for _ in SEO_BEST_PRACTICES],
+        ids=[f"seo_{i}" for i in range(len(SEO_BEST_PRACTICES))],
+    )
+    return name
+
+
+# Written once at startup by KnowledgeRegistry.seed_knowledge()
+register_seo_seed()
 
 
 class SEOOptimizer(BaseAgent):
     """Agent that analyzes content and provides SEO recommendations."""
 
-    def __init__(self, collection_name: str = "seo_knowledge"):
+    def __init__(self, collection_name: str = SEO_KNOWLEDGE_COLLECTION):
         super().__init__()
         self.collection_name = collection_name
         self.rag_service = RAGService.get_instance()
 
-        # Populate with some SEO knowledge if empty
-        self._initialize_knowledge()
-
-    def _initialize_knowledge(self):
-        # Check if collection exists and has documents
-        try:
-            collection = self.rag_service.get_collection(self.collection_name)
-            if len(collection.collection.get()["ids"]) == 0:
-                self._populate_seo_knowledge()
-        except:
-            # Collection doesn't exist yet, create and populate
-            self._populate_seo_knowledge()
-
-    def _populate_seo_knowledge(self):
-        seo_documents = [
-            "Use descriptive titles with primary keywords under 60 characters.",
-            "Create meta descriptions between 150-160 characters with a call to action.",
-            "Structure content with H1, H2, and H3 tags in hierarchical order.",
-            "Optimize images with descriptive filenames and alt text.",
-            "Ensure responsive design for mobile optimization.",
-            "Improve page loading speed by optimizing image sizes and leveraging browser caching.",
-            "Create high-quality, original content of at least 300 words per page.",
-            "Include relevant internal and external links with descriptive anchor text.",
-            "Use canonical tags to prevent duplicate content issues.",
-            "Create a logical site structure with breadcrumb navigation.",
-            "Implement schema markup for rich snippets in search results.",
-            "Ensure proper URL structure with keywords and logical hierarchy.",
-            "Create an XML sitemap and submit to search engines.",
-            "Use 301 redirects for changed or moved pages.",
-            "Set up Google Analytics and Google Search Console for monitoring.",
-        ]
-
-        self.rag_service.add_documents(
-            collection_name=self.collection_name,
-            documents=seo_documents,
-            metadatas=[{"type": "seo_best_practice"} for _ in seo_documents],
-            ids=[f"seo_{i}" for i in range(len(seo_documents))],
+        # A manifest lookup; only writes if startup seeding didn't run
+        seed_name = (
+            SEO_KNOWLEDGE_SEED
+            if collection_name == SEO_KNOWLEDGE_COLLECTION
+            else register_seo_seed(collection_name)
         )
+        KnowledgeSeeder.get_instance().ensure_seeded(seed_name)
 
     def process(
         self, input_data: Dict[str, Any], context: Optional[Dict[str, Any]] = None
@@ -323,7 +323,7 @@ Meeting Summary:
 {body}
 """
         try:
-            response = self.model.generate_content(prompt)
+            response = self.generate_content(prompt)
             logger.info(
                 f"Gemini meeting response generated (raw): {response.text}"
             )  # Log Raw
@@ -438,7 +438,7 @@ Original Content:
 {body}
 """
         try:
-            response = self.model.generate_content(prompt)
+            response = self.generate_content(prompt)
             logger.info(f"Gemini SEO response generated (raw): {response.text}")
             return response.text
         except Exception as e:
@@ -524,7 +524,7 @@ Original Content:
 {body}
 """
         try:
-            response = self.model.generate_content(prompt)
+            response = self.generate_content(prompt)
             logger.info(f"Gemini grammar response generated (raw): {response.text}")
             return response.text
         except Exception as e:
@@ -711,7 +711,7 @@ Email Body:
         )
 
         try:
-            response = self.model.generate_content(prompt)
+            response = self.generate_content(prompt)
             result = response.text.strip()
             logger.info(f"Extracted key points (processed): {result}")
             return result
@@ -765,7 +765,7 @@ Original Email Body:
 {body}
 """
         try:
-            response = self.model.generate_content(prompt)
+            response = self.generate_content(prompt)
             response_content = response.text.strip()
             logger.info(f"Generated response (processed): {response_content}")
             return response_content
@@ -0,0 +1,173 @@
+import json
+from typing import Dict, Any, Iterator, List
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app.models.agent import AgentCreate
+from app.models.workflow import WorkflowCreate
+from app.db.repository import CatalogRepository, get_catalog
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+EXPORT_KINDS = ("all", "agents", "workflows")
+
+# Errors listed in an import report; later ones are only counted
+MAX_REPORTED_ERRORS = 1000
+
+# Longest accepted NDJSON line, in bytes
+MAX_LINE_BYTES = 1024 * 1024
+
+
+def parse_record(line: bytes) -> Dict[str, Any]:
+    """
+    Validate one NDJSON catalog record.
+
+    Returns:
+        {"kind", "data"} ready for CatalogRepository.import_batch()
+
+    Raises:
+        ValueError: If the line isn't a valid agent or workflow record
+    """
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {str(e)}")
+    if not isinstance(record, dict):
+        raise ValueError("Record must be a JSON object")
+
+    kind = record.pop("kind", None)
+    record_id = record.get("id")
+    if record_id is not None and (not isinstance(record_id, int) or isinstance(record_id, bool)):
+        raise ValueError("id must be an integer")
+    try:
+        if kind == "agent":
+            AgentCreate.model_validate(record)
+            # Listing fields beyond the schema are kept as agent attributes
+            return {"kind": kind, "data": record}
+        if kind == "workflow":
+            data = WorkflowCreate.model_validate(record).model_dump()
+            return {"kind": kind, "data": {**data, "id": record_id}}
+    except ValidationError as e:
+        raise ValueError(
+            "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            )
+        )
+    raise ValueError("kind must be 'agent' or 'workflow'")
+
+
+def export_lines(catalog: CatalogRepository, kind: str, batch_size: int) -> Iterator[bytes]:
+    """NDJSON lines of the catalog: agents first, so an import can resolve workflow steps."""
+    if kind in ("all", "agents"):
+        for page in catalog.iter_agents(batch_size):
+            yield b"".join(
+                json.dumps({"kind": "agent", **agent}, default=str).encode("utf-8") + b"\n"
+                for agent in page
+            )
+    if kind in ("all", "workflows"):
+        for page in catalog.iter_workflows(batch_size):
+            yield b"".join(
+                json.dumps({"kind": "workflow", **workflow}, default=str).encode("utf-8") + b"\n"
+                for workflow in page
+            )
+
+
+@router.get("/catalog/export")
+def export_catalog(
+    kind: str = "all",
+    batch_size: int = 500,
+    catalog: CatalogRepository = Depends(get_catalog),
+):
+    """
+    Stream the catalog as newline-delimited JSON, one record per line.
+
+    Each record carries a "kind" of "agent" or "workflow"; the output can be
+    posted to /catalog/import as is. Records are read a page at a time, so
+    memory use doesn't grow with the catalog.
+    """
+    if kind not in EXPORT_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {EXPORT_KINDS}")
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be at least 1")
+    return StreamingResponse(
+        export_lines(catalog, kind, batch_size), media_type="application/x-ndjson"
+    )
+
+
+@router.post("/catalog/import")
+async def import_catalog(
+    request: Request,
+    replace: bool = False,
+    batch_size: int = 500,
+    catalog: CatalogRepository = Depends(get_catalog),
+):
+    """
+    Load agents and workflows from a newline-delimited JSON body.
+
+    Each line is a record as produced by /catalog/export. The body is read as
+    it arrives, validated line by line and stored in transactions of
+    ``batch_size`` records. Records with an "id" keep it (with
+    ``replace=true`` existing ones are overwritten, otherwise they are
+    reported); records without one are assigned the next id. Invalid or
+    conflicting records don't stop the import.
+
+    Returns:
+        Counts of records imported and failed, and the line number and
+        error of each failure (the first MAX_REPORTED_ERRORS of them)
+    """
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be at least 1")
+
+    report = {"imported": 0, "failed": 0, "errors": []}
+
+    def fail(errors: List[Dict[str, Any]]):
+        report["failed"] += len(errors)
+        room = MAX_REPORTED_ERRORS - len(report["errors"])
+        report["errors"].extend(errors[: max(room, 0)])
+
+    async def store(batch: List[Dict[str, Any]]):
+        errors = await run_in_threadpool(catalog.import_batch, batch, replace)
+        report["imported"] += len(batch) - len(errors)
+        fail(errors)
+
+    batch: List[Dict[str, Any]] = []
+    buffer = b""
+    line_number = 0
+
+    async def take(line: bytes):
+        nonlocal line_number
+        line_number += 1
+        if not line.strip():
+            return
+        try:
+            batch.append({"line": line_number, **parse_record(line)})
+        except ValueError as e:
+            fail([{"line": line_number, "error": str(e)}])
+        if len(batch) >= batch_size:
+            await store(batch[:])
+            batch.clear()
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            await take(line)
+        if len(buffer) > MAX_LINE_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Line {line_number + 1} is longer than {MAX_LINE_BYTES} bytes",
+            )
+    await take(buffer)
+    if batch:
+        await store(batch)
+
+    logger.info(f"Catalog import: {report['imported']} imported, {report['failed']} failed")
+    return report
@@ -8,15 +8,20 @@ from fastapi import (
     File,
     Form,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.params import (
     Body,
 )  # Keep Body for now, might be useful for other endpoints
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 import json
+import time
 
-# from sqlalchemy.orm import Session  # Removed
+from sqlalchemy.orm import Session
 
-# from app.db.database import get_db # Removed
+from app.db.database import get_db
+from app.db.history import list_executions, get_execution, agent_stats
+from app.db.jobs import JobStore, get_job_store
+from app.api.rate_limit import rate_limit
 from app.core.workflow_engine import WorkflowEngine, test_execute_workflow
 from app.core.input_adapter import InputAdapter
 
@@ -29,24 +34,16 @@ from app.models.execution import (
 )  # Keep
 
 from app.core.agent_registry import AgentRegistry
-from app.core.sample_data import load_sample_agents, load_sample_workflows
+from app.db.repository import AsyncCatalog, get_async_catalog
 from app.models.workflow import WorkflowCreate  # Import for TestWorkflowRequest
 
 router = APIRouter()
 
-# Dummy DB replacement
-dummy_agents_db = load_sample_agents()
-dummy_workflows_db = load_sample_workflows()
-
-
-def get_dummy_db():
-    """Provides a dictionary to simulate a database session."""
-    return {"agents": dummy_agents_db, "workflows": dummy_workflows_db}
-
 
 @router.post(
     "/execution/workflows/{workflow_id}/execute",
     response_model=WorkflowExecutionResponse,
+    dependencies=[Depends(rate_limit)],
 )
 async def execute_workflow(
     workflow_id: int,
@@ -54,8 +51,7 @@ async def execute_workflow(
     variables: str = Form("{}"),
     context: str = Form("{}"),
     file: Optional[UploadFile] = File(None),
-    # db: Session = Depends(get_db), # Removed
-    dummy_db=Depends(get_dummy_db),
+    catalog: AsyncCatalog = Depends(get_async_catalog),
 ):
     """Execute a workflow with form data and optional file upload."""
     try:
@@ -72,7 +68,7 @@ async def execute_workflow(
             workflow_id=workflow_id,
             workflow_input=workflow_input,
             file=file,
-            dummy_db=dummy_db,
+            catalog=catalog,
         )
     except HTTPException as e:
         raise e
@@ -88,14 +84,18 @@ async def execute_workflow(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/execution/test-workflow", response_model=WorkflowExecutionResponse)
+@router.post(
+    "/execution/test-workflow",
+    response_model=WorkflowExecutionResponse,
+    dependencies=[Depends(rate_limit)],
+)
 async def test_workflow(
     workflow_spec: str = Form(...),
     content: str = Form(...),
     variables: str = Form("{}"),
     context: str = Form("{}"),
     file: Optional[UploadFile] = File(None),
-    dummy_db=Depends(get_dummy_db),  # Use the dummy DB
+    catalog: AsyncCatalog = Depends(get_async_catalog),
 ):
     """Test a workflow without saving it."""
     try:
@@ -112,8 +112,11 @@ async def test_workflow(
         workflow_create = WorkflowCreate(**workflow_spec_dict)
 
         agents_data = []
+        agent_models = await catalog.get_agents(
+            [agent_data.agent_id for agent_data in workflow_create.agents]
+        )
         for agent_data in workflow_create.agents:
-            agent_model = dummy_db["agents"].get(agent_data.agent_id)
+            agent_model = agent_models.get(agent_data.agent_id)
             if not agent_model:
                 raise HTTPException(
                     status_code=400,
@@ -122,7 +125,7 @@ async def test_workflow(
             agents_data.append((agent_model, agent_data.config, agent_data.order))
 
         result = await test_execute_workflow(
-            dummy_db=dummy_db,
+            catalog=catalog,
             agents=agents_data,
             initial_input=workflow_input.dict(),
         )
@@ -140,14 +143,13 @@ async def _process_workflow_execution(
     workflow_id: int,
     workflow_input: WorkflowInput,
     file: Optional[UploadFile],
-    dummy_db,  # Pass the dummy DB
+    catalog: AsyncCatalog,
 ) -> Dict[str, Any]:
     """Process workflow execution with the provided input."""
-    # Create workflow engine - pass the dummy_db instead of db
-    engine = WorkflowEngine(dummy_db)
+    engine = WorkflowEngine(catalog.repository)
 
-    # Get the first agent - replace DB query with dictionary lookup
-    workflow = dummy_db["workflows"].get(workflow_id)
+    # Get the first agent
+    workflow = await catalog.get_workflow(workflow_id)
     if not workflow:
         raise HTTPException(
             status_code=404, detail=f"Workflow with ID {workflow_id} not found"
@@ -156,7 +158,10 @@ async def _process_workflow_execution(
     first_agent_record = workflow["agents"][
         0
     ]  # Assuming agents are ordered in the data
-    first_agent = dummy_db["agents"][first_agent_record["agent_id"]]
+    agent_models = await catalog.get_agents(
+        [workflow_agent["agent_id"] for workflow_agent in workflow["agents"]]
+    )
+    first_agent = agent_models[first_agent_record["agent_id"]]
 
     # Adapt the input for the first agent
     try:
@@ -171,28 +176,38 @@ async def _process_workflow_execution(
             detail=f"Failed to adapt input for agent: {str(e)}",
         )
 
-    # Execute workflow with adapted input  # Pass dummy_db to execute_workflow
-    result = engine.execute_workflow(workflow_id, adapted_input)
+    # Execute workflow with adapted input; agents block on LLM calls, so
+    # run them in a worker thread with the catalog entries already loaded
+    result = await run_in_threadpool(
+        engine.execute_workflow, workflow_id, adapted_input, workflow, agent_models
+    )
 
     return {"status": "success", "workflow_id": workflow_id, "result": result}
 
 
-@router.post("/execution/workflows/{workflow_id}/execute-async")
+@router.post(
+    "/execution/workflows/{workflow_id}/execute-async", dependencies=[Depends(rate_limit)]
+)
 async def execute_workflow_async(
     workflow_id: int,
     workflow_input: WorkflowInput = Body(...),
     file: Optional[UploadFile] = File(None),
     background_tasks: BackgroundTasks = BackgroundTasks(),
-    # db: Session = Depends(get_db),  # Removed
-    dummy_db=Depends(get_dummy_db),
+    catalog: AsyncCatalog = Depends(get_async_catalog),
+    jobs: JobStore = Depends(get_job_store),
 ):
-    """Execute a workflow asynchronously."""
+    """
+    Execute a workflow asynchronously.
+
+    Returns a job id; poll /execution/jobs/{job_id} (on any worker) for the
+    job's status and result.
+    """
     try:
         # Create workflow engine
-        engine = WorkflowEngine(dummy_db)
+        engine = WorkflowEngine(catalog.repository)
 
         # Get the first agent
-        workflow = dummy_db["workflows"].get(workflow_id)
+        workflow = await catalog.get_workflow(workflow_id)
         if not workflow:
             raise HTTPException(
                 status_code=404, detail=f"Workflow with ID {workflow_id} not found"
@@ -201,7 +216,10 @@ async def execute_workflow_async(
         first_agent_record = workflow["agents"][
             0
         ]  # Assuming agents are ordered in the data
-        first_agent = dummy_db["agents"][first_agent_record["agent_id"]]
+        agent_models = await catalog.get_agents(
+            [workflow_agent["agent_id"] for workflow_agent in workflow["agents"]]
+        )
+        first_agent = agent_models.get(first_agent_record["agent_id"])
 
         if not first_agent:
             raise HTTPException(
@@ -216,12 +234,22 @@ async def execute_workflow_async(
             file=file,
         )
 
-        # Add to background tasks
-        background_tasks.add_task(engine.execute_workflow, workflow_id, adapted_input)
+        # Record the job where every worker can see it, then run it in the background
+        job = await run_in_threadpool(jobs.create, workflow_id)
+        background_tasks.add_task(
+            jobs.run,
+            job["id"],
+            engine.execute_workflow,
+            workflow_id,
+            adapted_input,
+            workflow,
+            agent_models,
+        )
 
         return {
             "status": "accepted",
             "workflow_id": workflow_id,
+            "job_id": job["id"],
             "message": "Workflow execution started asynchronously",
         }
     except HTTPException as e:
@@ -236,21 +264,20 @@ async def execute_workflow_async(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/execution/preview/agent/{agent_id}")
+@router.post("/execution/preview/agent/{agent_id}", dependencies=[Depends(rate_limit)])
 async def preview_agent_output(
     agent_id: int,
     workflow_input: WorkflowInput = Body(...),
     file: Optional[UploadFile] = File(None),
     config: Optional[Dict[str, Any]] = Body(None),
-    # db: Session = Depends(get_db), # Removed
-    dummy_db=Depends(get_dummy_db),
+    catalog: AsyncCatalog = Depends(get_async_catalog),
 ):
     """Preview the output of a single agent."""
     # from app.core.agent_registry import AgentRegistry  # Already imported at the top
 
     try:
         # Get agent
-        agent_model = dummy_db["agents"].get(agent_id)
+        agent_model = await catalog.get_agent(agent_id)
         if not agent_model:
             raise HTTPException(
                 status_code=404, detail=f"Agent with id {agent_id} not found"
@@ -264,13 +291,15 @@ async def preview_agent_output(
         )
 
         # Get agent instance
-        agent_instance = AgentRegistry.get_agent_instance(agent_model, config or {})
+        agent_instance = await run_in_threadpool(
+            AgentRegistry.get_agent_instance, agent_model, config or {}
+        )
 
         # Create context for the agent
         context = {"agent_id": agent_id, "preview_mode": True}
 
         # Process with agent
-        output = agent_instance.process(adapted_input, context)
+        output = await run_in_threadpool(agent_instance.process, adapted_input, context)
 
         return {
             "status": "success",
@@ -285,3 +314,44 @@ async def preview_agent_output(
         raise HTTPException(
             status_code=500, detail=f"Error previewing agent output: {str(e)}"
         )
+
+
+@router.get("/execution/jobs/{job_id}", response_model=Dict[str, Any])
+def read_execution_job(job_id: str, jobs: JobStore = Depends(get_job_store)):
+    """Status of an asynchronous workflow run, with its result once it has finished."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/execution/history", response_model=List[Dict[str, Any]])
+def read_execution_history(
+    workflow_id: Optional[int] = None,
+    hours: Optional[float] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+):
+    """Most recent workflow runs, optionally for one workflow or the last few hours."""
+    since = time.time() - hours * 3600 if hours is not None else None
+    return list_executions(db, workflow_id, since, limit)
+
+
+@router.get("/execution/history/{execution_id}", response_model=Dict[str, Any])
+def read_execution(execution_id: int, db: Session = Depends(get_db)):
+    """A workflow run with its per-step timings, sizes and counters."""
+    execution = get_execution(db, execution_id)
+    if execution is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    return execution
+
+
+@router.get("/execution/stats/agents", response_model=List[Dict[str, Any]])
+def read_agent_stats(
+    hours: float = 24,
+    agent_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """Per-agent p50/p95 latency, error rate and usage over the last few hours, slowest first."""
+    now = time.time()
+    return agent_stats(db, since=now - hours * 3600, until=now, agent_id=agent_id)
@@ -1,116 +1,188 @@
 # --- app/api/marketplace.py ---
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from typing import List, Optional, Dict
 
-# from sqlalchemy.orm import Session # Removed
-# from app.db.database import get_db # Removed
-# from app.db.models import Agent, Workflow # Removed
 from app.models.agent import Agent as AgentSchema  # Keep
 from app.models.workflow import Workflow as WorkflowSchema  # Keep
-
-# Import sample data
-from app.core.sample_data import (
-    load_sample_agents,
-    load_sample_workflows,
-)  # Fixed import path
+from app.db.repository import (
+    CatalogRepository,
+    get_catalog,
+    decode_id_cursor,
+    next_cursor,
+    project_fields,
+)
+from app.api.response_cache import CatalogResponseCache, get_response_cache
+from app.core.catalog_search import CatalogSearch, get_catalog_search
+from app.core.compatibility import CompatibilityGraph, get_compatibility_graph
 
 router = APIRouter()
 
-# Dummy data stores (load from JSON files)
-dummy_agents = load_sample_agents()
-dummy_workflows = load_sample_workflows()
-
-
-# Dummy DB dependency
-def get_dummy_data():
-    return {"agents": dummy_agents, "workflows": dummy_workflows}
-
 
 @router.get("/marketplace/agents/", response_model=List[Dict])
 def list_marketplace_agents(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = None,
-    dummy_data=Depends(get_dummy_data),  # Use dummy data
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    catalog: CatalogRepository = Depends(get_catalog),
+    cache: CatalogResponseCache = Depends(get_response_cache),
+):
+    """
+    List all available agents in the marketplace, in id order.
+
+    Pass the X-Next-Cursor header of a response as ``cursor`` to get the
+    next page, and a comma-separated ``fields`` list to return only those fields.
+    Responses carry an ETag; send it back in If-None-Match to get a 304.
+    """
+
+    def build():
+        try:
+            after = decode_id_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        agents = catalog.list_agents(category, skip, limit, after)
+        next_page = next_cursor(agents, limit)
+        headers = {"X-Next-Cursor": next_page} if next_page else {}
+        return project_fields(agents, fields), headers
+
+    return cache.respond(request, catalog.version, build)
+
+
+@router.get("/marketplace/search", response_model=List[Dict])
+def search_marketplace(
+    request: Request,
+    q: str,
+    kind: str = "all",
+    mode: str = "keyword",
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    catalog: CatalogRepository = Depends(get_catalog),
+    search: CatalogSearch = Depends(get_catalog_search),
+    cache: CatalogResponseCache = Depends(get_response_cache),
 ):
-    """List all available agents in the marketplace."""
-    agents_list = list(dummy_data["agents"].values())
+    """
+    Search agents and workflows, best matches first.
+
+    ``mode=keyword`` ranks by full-text relevance of name, description,
+    category and tags; ``mode=semantic`` finds entries similar to a task
+    description. ``kind`` is one of all, agents, workflows or templates.
+    Results carry their "kind" and "score"; the next page's cursor is in
+    the X-Next-Cursor header.
+    """
 
-    if category:
-        agents_list = [a for a in agents_list if a["category"] == category]
+    def build():
+        try:
+            page = search.search(q, kind, mode, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {"X-Next-Cursor": page["next_cursor"]} if page["next_cursor"] else {}
+        return project_fields(page["results"], fields), headers
 
-    return agents_list[skip : skip + limit]
+    return cache.respond(request, catalog.version, build)
 
 
 @router.get("/marketplace/agents/{agent_id}", response_model=Dict)
-def get_marketplace_agent(agent_id: int, dummy_data=Depends(get_dummy_data)):
+def get_marketplace_agent(
+    agent_id: int,
+    request: Request,
+    catalog: CatalogRepository = Depends(get_catalog),
+    cache: CatalogResponseCache = Depends(get_response_cache),
+):
     """Get detailed information about a specific agent."""
-    agent = dummy_data["agents"].get(agent_id)
-    if agent is None:
-        raise HTTPException(status_code=404, detail="Agent not found")
-    return agent
+
+    def build():
+        agent = catalog.get_agent(agent_id)
+        if agent is None:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        return agent, {}
+
+    return cache.respond(request, catalog.version, build)
 
 
 @router.get("/marketplace/agents/compatibility/{agent1_id}/{agent2_id}")
 def check_agent_compatibility(
-    agent1_id: int, agent2_id: int, dummy_data=Depends(get_dummy_data)
+    agent1_id: int,
+    agent2_id: int,
+    graph: CompatibilityGraph = Depends(get_compatibility_graph),
 ):
-    """Check if two agents can be connected in a workflow."""
-    agent1 = dummy_data["agents"].get(agent1_id)
-    agent2 = dummy_data["agents"].get(agent2_id)
-
-    if agent1 is None or agent2 is None:
+    """Check if two agents can be connected in a workflow (agent1 feeding agent2)."""
+    result = graph.pair(agent1_id, agent2_id)
+    if result is None:
         raise HTTPException(status_code=404, detail="One or both agents not found")
 
-    compatible = True
-    compatibility_score = 0.8
-
-    for key in agent2["input_schema"].get("properties", {}):
-        if key in agent1["output_schema"].get("properties", {}):
-            compatibility_score += 0.1
-
-    compatibility_score = min(1.0, compatibility_score)
-
+    compatible = result["compatible"]
     return {
         "compatible": compatible,
-        "compatibility_score": compatibility_score,
+        "compatibility_score": result["score"],
+        "fields": result["fields"],
         "message": "These agents can work together"
         if compatible
         else "These agents may not work well together",
     }
 
 
+@router.get("/marketplace/agents/{agent_id}/next", response_model=List[Dict])
+def recommend_next_agents(
+    agent_id: int,
+    request: Request,
+    k: int = 5,
+    catalog: CatalogRepository = Depends(get_catalog),
+    graph: CompatibilityGraph = Depends(get_compatibility_graph),
+    cache: CatalogResponseCache = Depends(get_response_cache),
+):
+    """
+    The k agents that best take this agent's output, best first.
+
+    Each entry has the agent's id, name and category, its compatibility
+    "score", whether it is fully "compatible" and which of its input
+    "fields" are taken from which output fields.
+    """
+
+    def build():
+        recommendations = graph.next_agents(agent_id, k)
+        if recommendations is None:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        return recommendations, {}
+
+    return cache.respond(request, catalog.version, build)
+
+
 @router.get("/marketplace/templates/", response_model=List[Dict])
 def list_workflow_templates(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = None,
-    dummy_data=Depends(get_dummy_data),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    catalog: CatalogRepository = Depends(get_catalog),
+    cache: CatalogResponseCache = Depends(get_response_cache),
 ):
-    """List workflow templates available in the marketplace."""
-    workflows_list = [
-        w for w in dummy_data["workflows"].values() if w["is_template"]
-    ]  # Filter
+    """List workflow templates available in the marketplace, paginated and cached like agents."""
 
-    if category:
-        workflows_list = [w for w in workflows_list if w["category"] == category]
+    def build():
+        try:
+            after = decode_id_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        templates = catalog.list_workflows(
+            category, is_template=True, skip=skip, limit=limit, after=after
+        )
+        next_page = next_cursor(templates, limit)
+        headers = {"X-Next-Cursor": next_page} if next_page else {}
+        return project_fields(templates, fields), headers
 
-    return workflows_list[skip : skip + limit]
+    return cache.respond(request, catalog.version, build)
 
 
 @router.get("/marketplace/categories/")
-def list_categories(dummy_data=Depends(get_dummy_data)):
+def list_categories(
+    request: Request,
+    catalog: CatalogRepository = Depends(get_catalog),
+    cache: CatalogResponseCache = Depends(get_response_cache),
+):
     """List all categories used in the marketplace."""
-    agent_categories = list(
-        set(agent["category"] for agent in dummy_data["agents"].values())
-    )
-    workflow_categories = list(
-        set(workflow["category"] for workflow in dummy_data["workflows"].values())
-    )
-    all_categories = list(set(agent_categories + workflow_categories))
-
-    return {
-        "agent_categories": agent_categories,
-        "workflow_categories": workflow_categories,
-        "all_categories": all_categories,
-    }
+    return cache.respond(request, catalog.version, lambda: (catalog.list_categories(), {}))
@@ -0,0 +1,67 @@
+import math
+import os
+import time
+from typing import Optional
+import logging
+
+from fastapi import HTTPException, Request
+
+from app.db.shared_state import SharedState
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Requests per client per minute to the endpoints that run agents; 0 disables the limit
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", 0))
+
+
+class RateLimiter:
+    """
+    Fixed-window request limit per client, counted in the shared state.
+
+    Counters live in the database rather than in the process, so the limit
+    holds across all workers. Used as a FastAPI dependency.
+    """
+
+    def __init__(
+        self,
+        limit: int = RATE_LIMIT_PER_MINUTE,
+        window: float = 60.0,
+        shared_state: Optional[SharedState] = None,
+    ):
+        """
+        Args:
+            limit: Requests allowed per client per window (0 disables the limit)
+            window: Window length in seconds
+            shared_state: Store holding the counters (defaults to the shared one)
+        """
+        self.limit = limit
+        self.window = window
+        self._shared_state = shared_state
+
+    @property
+    def shared_state(self) -> SharedState:
+        if self._shared_state is None:
+            self._shared_state = SharedState.get_instance()
+        return self._shared_state
+
+    def __call__(self, request: Request):
+        if self.limit <= 0:
+            return
+        client = request.client.host if request.client else "unknown"
+        window_index = int(time.time() // self.window)
+        count = self.shared_state.incr(f"rate:{client}:{window_index}", ttl=self.window)
+        if count == 1:
+            # A client's first request in a window; clear the counters of past windows
+            self.shared_state.purge_expired()
+        if count > self.limit:
+            retry_after = math.ceil((window_index + 1) * self.window - time.time())
+            logger.warning(f"Rate limit exceeded for {client}: {count} requests in window")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(retry_after, 1))},
+            )
+
+
+rate_limit = RateLimiter()
@@ -0,0 +1,200 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Tuple
+import logging
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # Optional: responses are gzip-compressed without it
+    brotli = None
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 512
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q-value}; "*" is kept as a coding."""
+    accepted = {}
+    for token in header.split(","):
+        coding, *params = [part.strip() for part in token.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+class CachedBody:
+    """A serialized response: JSON bytes, their compressed forms, ETag and headers."""
+
+    def __init__(self, body: bytes, headers: Dict[str, str]):
+        self.body = body
+        self.headers = headers
+        self.digest = hashlib.sha1(body).hexdigest()[:20]
+        # Compressed forms in order of preference
+        self.encoded: Dict[str, bytes] = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            if brotli is not None:
+                self.encoded["br"] = brotli.compress(body)
+            self.encoded["gzip"] = gzip.compress(body, compresslevel=6)
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """The ETag of the body as sent with ``encoding``; each representation has its own."""
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """
+        The compressed form to send for an Accept-Encoding header, or None for the plain body.
+
+        Codings the client gives q=0 (directly or through "*;q=0") are never
+        chosen; among the others the highest q wins, ties going to the
+        preferred coding.
+        """
+        accepted = accepted_encodings(accept_encoding)
+        default = accepted.get("*", 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.encoded:
+            q = accepted.get(encoding, default)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+
+class CatalogResponseCache:
+    """
+    Serialized catalog responses, reused until the catalog changes.
+
+    Entries are keyed by path and query string and belong to one catalog
+    version; when CatalogRepository.version moves on (any write), the
+    cache starts over. Responses carry an ETag of their body (one per
+    content encoding, as the bytes sent differ), so clients
+    revalidating with If-None-Match get an empty 304 while nothing changed,
+    and everyone else gets the stored (compressed) bytes without the
+    handler running or JSON being encoded again.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "CatalogResponseCache":
+        """Singleton pattern to ensure a single response cache."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = CatalogResponseCache()
+            return cls._instance
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Args:
+            max_entries: Responses kept, least recently used evicted first
+        """
+        self.max_entries = max_entries
+        self.version: Optional[int] = None
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    @staticmethod
+    def _key(request: Request) -> str:
+        query = sorted(request.query_params.multi_items())
+        return request.url.path + "?" + "&".join(f"{name}={value}" for name, value in query)
+
+    def _get(self, key: str, version: int) -> Optional[CachedBody]:
+        with self._lock:
+            if self.version != version:
+                self.version = version
+                self._entries.clear()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses"] += 1
+            return entry
+
+    def _put(self, key: str, version: int, entry: CachedBody):
+        with self._lock:
+            # Don't keep a response built while the catalog was being written
+            if self.version != version:
+                return
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def respond(
+        self,
+        request: Request,
+        version: int,
+        build: Callable[[], Tuple[Any, Dict[str, str]]],
+    ) -> Response:
+        """
+        Serve a catalog GET from the cache, building and storing it on a miss.
+
+        Args:
+            request: The incoming request (its path and query form the key)
+            version: Current catalog version
+            build: Returns the response content and any extra headers
+
+        Returns:
+            A 304 if the client's If-None-Match matches, else the JSON body,
+            compressed when the client accepts it
+        """
+        key = self._key(request)
+        entry = self._get(key, version)
+        if entry is None:
+            content, headers = build()
+            body = json.dumps(content, separators=(",", ":"), default=str).encode("utf-8")
+            entry = CachedBody(body, headers)
+            self._put(key, version, entry)
+
+        encoding = entry.negotiate(request.headers.get("accept-encoding", ""))
+        etag = entry.etag(encoding)
+        headers = {
+            **entry.headers,
+            "ETag": etag,
+            # Let clients keep the body but revalidate before using it
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = [
+            tag.strip().removeprefix("W/")
+            for tag in request.headers.get("if-none-match", "").split(",")
+        ]
+        # "*" matches any current representation (RFC 9110, 13.1.2)
+        if etag in if_none_match or "*" in if_none_match:
+            with self._lock:
+                self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+
+        if encoding is not None:
+            return Response(
+                entry.encoded[encoding],
+                media_type="application/json",
+                headers={**headers, "Content-Encoding": encoding},
+            )
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+
+def get_response_cache() -> CatalogResponseCache:
+    """FastAPI dependency returning the shared catalog response cache."""
+    return CatalogResponseCache.get_instance()
@@ -1,68 +1,89 @@
 # --- app/api/workflows.py ---
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Optional, Dict
+from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import List, Optional, Dict, Any
 
-# from sqlalchemy.orm import Session # Removed
-# from app.db.database import get_db # Removed
-# from app.db.models import Workflow, WorkflowAgent, Agent # Removed
 from app.models.workflow import (
     WorkflowCreate,
     Workflow as WorkflowSchema,
     WorkflowUpdate,
-)  # Keep
-
-from app.core.sample_data import (
-    load_sample_agents,
-    load_sample_workflows,
-    add_workflow,
-    update_workflow_data,
-    delete_workflow_data,
+    WorkflowPlanRequest,
 )
+from app.db.repository import (
+    CatalogRepository,
+    get_catalog,
+    decode_id_cursor,
+    next_cursor,
+    project_fields,
+)
+from app.core.workflow_planner import WorkflowPlanner, get_workflow_planner
 
 router = APIRouter()
 
-# Use dummy data stores (dictionaries)
-dummy_agents = load_sample_agents()
-dummy_workflows = load_sample_workflows()
-
-
-# Dependency to get the dummy data stores
-def get_dummy_data():
-    return {"agents": dummy_agents, "workflows": dummy_workflows}
-
 
 @router.post("/workflows/", response_model=WorkflowSchema)
 def create_workflow(
-    workflow: WorkflowCreate, dummy_data=Depends(get_dummy_data)
-):  # Use dummy DB
+    workflow: WorkflowCreate, catalog: CatalogRepository = Depends(get_catalog)
+):
     """Create a new workflow with associated agents."""
-    return add_workflow(dummy_data, workflow)  # Delegate to function in sample_data.py
+    try:
+        return catalog.create_workflow(workflow)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/workflows/", response_model=List[WorkflowSchema])
+@router.post("/workflows/plan", response_model=Dict[str, List[Dict[str, Any]]])
+def plan_workflow(
+    request: WorkflowPlanRequest,
+    planner: WorkflowPlanner = Depends(get_workflow_planner),
+):
+    """
+    Compose workflows that turn ``start`` into ``goal``.
+
+    Returns the "cheapest" chains (fewest LLM calls and best schema fit)
+    and the "fastest" ones (lowest historical latency), each as a
+    WorkflowCreate spec ready to POST to /workflows/ along with per-step
+    fit and estimates. Lists are empty when no chain of compatible agents
+    reaches the goal.
+    """
+    try:
+        return planner.plan(request.start, request.goal, request.max_steps, request.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/workflows/", response_model=List[Dict[str, Any]])
 def read_workflows(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = None,
     is_template: Optional[bool] = None,
-    dummy_data=Depends(get_dummy_data),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    catalog: CatalogRepository = Depends(get_catalog),
 ):
-    """Get all workflows with optional filtering."""
-    workflows_list = list(dummy_data["workflows"].values())
-
-    if category:
-        workflows_list = [w for w in workflows_list if w["category"] == category]
-    if is_template is not None:
-        workflows_list = [w for w in workflows_list if w["is_template"] == is_template]
-
-    # Convert to WorkflowSchema for response
-    return [WorkflowSchema(**w) for w in workflows_list[skip : skip + limit]]
+    """
+    Get all workflows with optional filtering, in id order.
+
+    Pass the X-Next-Cursor header of a response as ``cursor`` to get the
+    next page, and a comma-separated ``fields`` list to return only those fields.
+    """
+    try:
+        after = decode_id_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Entries already have the Workflow schema's shape; they aren't re-validated per row
+    workflows_list = catalog.list_workflows(category, is_template, skip, limit, after)
+    cursor = next_cursor(workflows_list, limit)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return project_fields(workflows_list, fields)
 
 
 @router.get("/workflows/{workflow_id}", response_model=WorkflowSchema)
-def read_workflow(workflow_id: int, dummy_data=Depends(get_dummy_data)):
+def read_workflow(workflow_id: int, catalog: CatalogRepository = Depends(get_catalog)):
     """Get a specific workflow by ID."""
-    workflow = dummy_data["workflows"].get(workflow_id)
+    workflow = catalog.get_workflow(workflow_id)
     if workflow is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
 
@@ -73,13 +94,21 @@ def read_workflow(workflow_id: int, dummy_data=Depends(get_dummy_data)):
 def update_workflow(
     workflow_id: int,
     workflow_update: WorkflowUpdate,
-    dummy_data=Depends(get_dummy_data),
+    catalog: CatalogRepository = Depends(get_catalog),
 ):
     """Update a workflow and its agents."""
-    return update_workflow_data(dummy_data, workflow_id, workflow_update)
+    try:
+        workflow = catalog.update_workflow(workflow_id, workflow_update)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if workflow is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return workflow
 
 
 @router.delete("/workflows/{workflow_id}", response_model=dict)
-def delete_workflow(workflow_id: int, dummy_data=Depends(get_dummy_data)):
+def delete_workflow(workflow_id: int, catalog: CatalogRepository = Depends(get_catalog)):
     """Delete a workflow."""
-    return delete_workflow_data(dummy_data, workflow_id)
+    if not catalog.delete_workflow(workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return {"message": f"Workflow {workflow_id} deleted successfully"}
@@ -45,28 +45,28 @@ class AgentRegistry:
         return agent_class(**(config or {}))
 
     @staticmethod
-    def list_available_agents(dummy_db) -> List[Dict]:  # Changed return type
+    def list_available_agents(catalog) -> List[Dict]:
         """
         List all available agents in the system.
 
         Args:
-            dummy_db: Dummy database
+            catalog: CatalogRepository
 
         Returns:
             List of agent models (dictionaries)
         """
-        return list(dummy_db["agents"].values())
+        return catalog.list_agents()
 
     @staticmethod
-    def get_agent_by_id(dummy_db, agent_id: int) -> Optional[Dict]:  # Changed return
+    def get_agent_by_id(catalog, agent_id: int) -> Optional[Dict]:
         """
         Get agent model by ID.
 
         Args:
-            dummy_db: Dummy database.
+            catalog: CatalogRepository
             agent_id: ID of the agent
 
         Returns:
             Agent model (dictionary) or None if not found
         """
-        return dummy_db["agents"].get(agent_id)
+        return catalog.get_agent(agent_id)
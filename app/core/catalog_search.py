@@ -0,0 +1,395 @@
+"""
+Server-side search over the marketplace catalog.
+
+Keyword search runs against the SQLite FTS5 index that ensure_schema()
+keeps in sync with the agents and workflows tables. Semantic search embeds
+one short document per agent and workflow into the "marketplace_catalog"
+RAG collection. Catalog writes re-embed only the entries they touched
+(CatalogSearch.update, a repository listener); the whole catalog is only
+compared with the collection once per process, at startup.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from typing import List, Dict, Any, Optional, Set, Tuple
+import logging
+
+from sqlalchemy import text
+
+from app.db.repository import CatalogRepository, FULLTEXT_TABLE
+from app.rag.filters import encode_cursor, decode_cursor
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+CATALOG_COLLECTION = "marketplace_catalog"
+
+SEARCH_KINDS = ("all", "agents", "workflows", "templates")
+SEARCH_MODES = ("keyword", "semantic")
+
+# bm25() column weights for name, description, category and tags
+FULLTEXT_WEIGHTS = (5.0, 1.0, 2.0, 3.0)
+
+# Metadata filters selecting each kind in the semantic index
+_SEMANTIC_KIND_FILTERS = {
+    "all": None,
+    "agents": {"kind": "agent"},
+    "workflows": {"kind": {"$in": ["workflow", "template"]}},
+    "templates": {"kind": "template"},
+}
+
+
+def fulltext_query(query: str) -> Optional[str]:
+    """
+    FTS5 MATCH expression for free text: each word as a prefix term, OR-ed.
+
+    Entries matching more (and rarer) words rank higher under bm25, so
+    loose queries still find something. Returns None for a query without words.
+    """
+    terms = re.findall(r"\w+", query.lower())
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"*' for term in dict.fromkeys(terms))
+
+
+def entry_digest(document: str, metadata: Dict[str, Any]) -> str:
+    """Hash of an index entry, stored in its metadata to tell which entries changed."""
+    return hashlib.sha256(
+        json.dumps([document, metadata], sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def catalog_document(kind: str, entry: Dict[str, Any], agent_names: Dict[int, str]) -> str:
+    """Text embedded for a catalog entry."""
+    parts = [f"{entry.get('name') or ''}. {entry.get('description') or ''}"]
+    if entry.get("category"):
+        parts.append(f"Category: {entry['category']}.")
+    if kind == "agent" and entry.get("tags"):
+        parts.append(f"Tags: {', '.join(entry['tags'])}.")
+    if kind != "agent" and entry.get("agents"):
+        steps = [agent_names.get(step["agent_id"], "") for step in entry["agents"]]
+        parts.append(f"Steps: {', '.join(name for name in steps if name)}.")
+    return " ".join(parts)
+
+
+class CatalogSearch:
+    """Keyword and semantic search over agents and workflows, with pagination."""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "CatalogSearch":
+        """Singleton pattern to ensure a single catalog search index."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = CatalogSearch(CatalogRepository.get_instance())
+            return cls._instance
+
+    def __init__(self, catalog: CatalogRepository, rag_service=None):
+        """
+        Args:
+            catalog: Catalog to search
+            rag_service: Service holding the semantic index (defaults to the registry's)
+        """
+        self.catalog = catalog
+        self._rag_service = rag_service
+        self._synced = False
+        # Entries whose last write to the index failed
+        self._stale: Set[str] = set()
+        # Workflows naming each agent among their steps, and the reverse
+        self._workflows_using: Dict[int, Set[int]] = {}
+        self._workflow_steps: Dict[int, Set[int]] = {}
+        self._lock = threading.RLock()
+        catalog.add_listener(self.update)
+
+    @property
+    def rag_service(self):
+        if self._rag_service is None:
+            # Through the registry, so the collection gets its configured backend
+            from app.core.knowledge_registry import KnowledgeRegistry
+
+            self._rag_service = KnowledgeRegistry.get_instance().rag_service
+        return self._rag_service
+
+    # --- keyword search ---
+
+    def keyword_search(
+        self, query: str, kind: str = "all", limit: int = 20, offset: int = 0
+    ) -> List[Tuple[str, int, float]]:
+        """
+        Rank catalog entries by bm25 over name, description, category and tags.
+
+        Returns:
+            (kind, id, score) tuples, best first; kind is "agent" or "workflow"
+            and higher scores are better
+        """
+        match = fulltext_query(query)
+        if match is None:
+            return []
+
+        conditions = [f"{FULLTEXT_TABLE} MATCH :match"]
+        if kind == "agents":
+            conditions.append("rowid % 2 = 0")
+        elif kind == "workflows":
+            conditions.append("rowid % 2 = 1")
+        elif kind == "templates":
+            conditions.append(
+                "rowid % 2 = 1 AND rowid / 2 IN (SELECT id FROM workflows WHERE is_template = 1)"
+            )
+        weights = ", ".join(str(weight) for weight in FULLTEXT_WEIGHTS)
+        statement = text(
+            f"SELECT rowid, bm25({FULLTEXT_TABLE}, {weights}) AS rank FROM {FULLTEXT_TABLE} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY rank LIMIT :limit OFFSET :offset"
+        )
+        with self.catalog.session_factory() as session:
+            rows = session.execute(statement, {"match": match, "limit": limit, "offset": offset})
+            # bm25() is lower-is-better; flip it so scores read like similarities
+            return [
+                ("workflow" if rowid % 2 else "agent", rowid // 2, -rank) for rowid, rank in rows
+            ]
+
+    # --- semantic search ---
+
+    def _documents(
+        self, agents: List[Dict[str, Any]], workflows: List[Dict[str, Any]]
+    ) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Index document and metadata per entry, keyed by document id."""
+        agent_names = {agent["id"]: agent["name"] for agent in agents}
+        steps = {
+            step["agent_id"] for workflow in workflows for step in workflow.get("agents") or []
+        }
+        missing = steps - set(agent_names)
+        if missing:
+            for agent_id, agent in self.catalog.get_agents(sorted(missing)).items():
+                agent_names[agent_id] = agent["name"]
+        documents = {}
+        for agent in agents:
+            documents[f"agent_{agent['id']}"] = (
+                catalog_document("agent", agent, agent_names),
+                {"kind": "agent", "item_id": agent["id"]},
+            )
+        for workflow in workflows:
+            kind = "template" if workflow["is_template"] else "workflow"
+            documents[f"workflow_{workflow['id']}"] = (
+                catalog_document(kind, workflow, agent_names),
+                {"kind": kind, "item_id": workflow["id"]},
+            )
+        return documents
+
+    def _write(
+        self,
+        documents: Dict[str, Tuple[str, Dict[str, Any]]],
+        stored: Dict[str, str],
+        removed: List[str],
+    ) -> int:
+        """
+        Embed the entries of ``documents`` whose digest differs from ``stored``
+        and delete ``removed``; returns the number of entries written or removed.
+        """
+        digests = {
+            doc_id: entry_digest(document, metadata)
+            for doc_id, (document, metadata) in documents.items()
+        }
+        changed = [doc_id for doc_id, digest in digests.items() if stored.get(doc_id) != digest]
+        if changed or removed:
+            self.rag_service.delete_documents(CATALOG_COLLECTION, changed + removed)
+        if changed:
+            self.rag_service.add_documents(
+                collection_name=CATALOG_COLLECTION,
+                documents=[documents[doc_id][0] for doc_id in changed],
+                metadatas=[
+                    {**documents[doc_id][1], "digest": digests[doc_id]} for doc_id in changed
+                ],
+                ids=changed,
+            )
+            # add_documents logs and swallows embedding failures; remember
+            # the entries that weren't stored so the next search retries them
+            written = set(self._stored_digests(changed))
+            for doc_id in changed:
+                if doc_id not in written:
+                    self._stale.add(doc_id)
+            if len(written) < len(changed):
+                missed = len(changed) - len(written)
+                logger.warning(f"{missed} catalog search entries were not stored, will retry")
+        if changed or removed:
+            logger.info(
+                f"Catalog search index: {len(changed)} entries embedded, {len(removed)} removed"
+            )
+        return len(changed) + len(removed)
+
+    def _stored_digests(self, doc_ids: Optional[List[str]] = None) -> Dict[str, str]:
+        """Digest of each indexed entry (of ``doc_ids``, or all), read from its metadata."""
+        return {
+            doc["id"]: (doc.get("metadata") or {}).get("digest")
+            for doc in self.rag_service.get_collection(CATALOG_COLLECTION).get_documents(
+                ids=doc_ids, include_documents=False
+            )
+        }
+
+    def update(self, agent_ids: List[int] = (), workflow_ids: List[int] = ()) -> int:
+        """
+        Re-index the given catalog entries after a write.
+
+        Registered as a CatalogRepository listener, so each write embeds only
+        the entries it touched. Workflows whose steps include a changed agent
+        are re-indexed too, as their text names the agents. Before the first
+        sync() there is nothing to update; sync() scans the whole catalog.
+
+        Returns:
+            Number of entries re-embedded or removed
+        """
+        with self._lock:
+            if not self._synced:
+                return 0
+            agent_ids = set(agent_ids)
+            workflow_ids = set(workflow_ids)
+            for agent_id in agent_ids:
+                workflow_ids |= self._workflows_using.get(agent_id, set())
+
+            agents = self.catalog.get_agents(sorted(agent_ids))
+            workflows = self.catalog.get_workflows(sorted(workflow_ids))
+            for workflow_id in workflow_ids:
+                self._index_steps(workflow_id, workflows.get(workflow_id))
+
+            documents = self._documents(list(agents.values()), list(workflows.values()))
+            doc_ids = [f"agent_{agent_id}" for agent_id in agent_ids] + [
+                f"workflow_{workflow_id}" for workflow_id in workflow_ids
+            ]
+            stored = self._stored_digests(doc_ids)
+            removed = [
+                doc_id for doc_id in doc_ids if doc_id not in documents and doc_id in stored
+            ]
+            self._stale.difference_update(doc_ids)
+            return self._write(documents, stored, removed)
+
+    def _index_steps(self, workflow_id: int, workflow: Optional[Dict[str, Any]]):
+        for agent_id in self._workflow_steps.pop(workflow_id, set()):
+            self._workflows_using.get(agent_id, set()).discard(workflow_id)
+        steps = {step["agent_id"] for step in (workflow or {}).get("agents") or []}
+        if steps:
+            self._workflow_steps[workflow_id] = steps
+        for agent_id in steps:
+            self._workflows_using.setdefault(agent_id, set()).add(workflow_id)
+
+    def sync(self) -> int:
+        """
+        Bring the semantic index up to date with the whole catalog.
+
+        Runs once per process (at startup, or on the first search): entries
+        whose stored digest doesn't match their current text are re-embedded
+        and entries no longer in the catalog are removed. Afterwards writes
+        reach the index through update(), and sync() only retries entries
+        whose earlier write failed.
+
+        Returns:
+            Number of entries re-embedded or removed
+        """
+        with self._lock:
+            if self._synced:
+                if not self._stale:
+                    return 0
+                kinds = [doc_id.rsplit("_", 1) for doc_id in sorted(self._stale)]
+                return self.update(
+                    [int(item_id) for kind, item_id in kinds if kind == "agent"],
+                    [int(item_id) for kind, item_id in kinds if kind == "workflow"],
+                )
+
+            agents = self.catalog.list_agents()
+            workflows = self.catalog.list_workflows()
+            self._workflows_using, self._workflow_steps = {}, {}
+            for workflow in workflows:
+                self._index_steps(workflow["id"], workflow)
+            documents = self._documents(agents, workflows)
+            stored = self._stored_digests()
+            removed = [doc_id for doc_id in stored if doc_id not in documents]
+            written = self._write(documents, stored, removed)
+            self._synced = True
+            return written
+
+    def semantic_search(
+        self, query: str, kind: str = "all", limit: int = 20, offset: int = 0
+    ) -> List[Tuple[str, int, float]]:
+        """
+        Rank catalog entries by embedding similarity to a task description.
+
+        Returns:
+            (kind, id, score) tuples, best first; kind is "agent" or "workflow"
+        """
+        self.sync()
+        results = self.rag_service.search(
+            CATALOG_COLLECTION,
+            query,
+            n_results=limit,
+            mode="vector",
+            where=_SEMANTIC_KIND_FILTERS[kind],
+            cursor=encode_cursor(offset),
+            include_documents=False,
+        )
+        ranked = []
+        for result in results:
+            metadata = result.get("metadata") or {}
+            kind_found = "agent" if metadata.get("kind") == "agent" else "workflow"
+            distance = result.get("distance")
+            ranked.append(
+                (kind_found, metadata.get("item_id"), -distance if distance is not None else 0.0)
+            )
+        return ranked
+
+    # --- combined ---
+
+    def search(
+        self,
+        query: str,
+        kind: str = "all",
+        mode: str = "keyword",
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of ranked catalog entries.
+
+        Args:
+            query: Keywords, or a task description for semantic mode
+            kind: One of SEARCH_KINDS
+            mode: One of SEARCH_MODES
+            limit: Page size
+            cursor: Cursor from a previous page's "next_cursor"
+
+        Returns:
+            Dictionary with "results" (catalog entries with "kind" and
+            "score" added) and "next_cursor" (None on the last page)
+        """
+        if kind not in SEARCH_KINDS:
+            raise ValueError(f"Unknown search kind '{kind}', expected one of {SEARCH_KINDS}")
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+        offset = decode_cursor(cursor)
+
+        search = self.keyword_search if mode == "keyword" else self.semantic_search
+        # One extra hit tells whether another page exists
+        ranked = search(query, kind, limit + 1, offset)
+        has_more = len(ranked) > limit
+        ranked = ranked[:limit]
+
+        agents = self.catalog.get_agents([item_id for found, item_id, _ in ranked if found == "agent"])
+        workflows = self.catalog.get_workflows(
+            [item_id for found, item_id, _ in ranked if found == "workflow"]
+        )
+        results = []
+        for found, item_id, score in ranked:
+            entry = (agents if found == "agent" else workflows).get(item_id)
+            # The semantic index may briefly trail a deletion
+            if entry is not None:
+                results.append({**entry, "kind": found, "score": score})
+        return {
+            "results": results,
+            "next_cursor": encode_cursor(offset + limit) if has_more else None,
+        }
+
+
+def get_catalog_search() -> CatalogSearch:
+    """FastAPI dependency returning the shared catalog search."""
+    return CatalogSearch.get_instance()
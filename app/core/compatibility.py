@@ -0,0 +1,306 @@
+"""
+Precomputed compatibility between marketplace agents.
+
+A pair (source, target) is scored by how much of the target's input the
+source's output provides: fields with the same name match fully, and fields
+the adapters treat as interchangeable (a text output feeding a "content" or
+"transcript" input) match partially. Whatever is left is filled with schema
+defaults by the workflow engine, so every pair can run; the score says how
+useful the hand-off is.
+
+Only pairs sharing at least one field are stored. Each agent keeps its
+successors sorted by score, so the best next agents are a slice, and agents
+added or changed since the last build are re-scored against the others
+through an index of the fields they consume and produce.
+"""
+
+import bisect
+import hashlib
+import json
+import threading
+from typing import List, Dict, Any, Optional, Set, Tuple
+import logging
+
+from app.db.repository import CatalogRepository
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Score of a pair sharing no fields: the engine still adapts the input
+BASE_SCORE = 0.5
+
+# Contribution of a matched input field, by how it was matched
+EXACT_MATCH = 1.0
+ALIAS_MATCH = 0.8
+# Applied on top when both sides declare different types
+TYPE_MISMATCH_FACTOR = 0.5
+
+# Fields carrying free text, interchangeable in the way InputAdapter swaps
+# "content" and "transcript"
+TEXT_FIELDS = frozenset(
+    {"content", "transcript", "text", "body", "corrected_text", "summary", "message"}
+)
+
+
+def field_key(name: str) -> str:
+    """The key a field is matched on: its alias group, or its own name."""
+    return "text" if name in TEXT_FIELDS else name
+
+
+def _properties(schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return (schema or {}).get("properties", {}) or {}
+
+
+def wanted_fields(agent: Dict[str, Any]) -> List[str]:
+    """Input fields a predecessor should provide: the required ones, else all."""
+    schema = agent.get("input_schema") or {}
+    properties = _properties(schema)
+    required = [field for field in schema.get("required", []) if field in properties]
+    return required or list(properties)
+
+
+def compatibility(source: Dict[str, Any], target: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Score feeding ``source``'s output into ``target``'s input.
+
+    Returns:
+        Dictionary with "score" (BASE_SCORE to 1.0), "compatible" (every
+        wanted input field is provided) and "fields" (target input field
+        -> source output field it would be taken from)
+    """
+    outputs = _properties(source.get("output_schema"))
+    inputs = _properties(target.get("input_schema"))
+    wanted = wanted_fields(target)
+    if not wanted:
+        # Takes no input, so any predecessor will do
+        return {"score": BASE_SCORE, "compatible": True, "fields": {}}
+
+    by_key: Dict[str, List[str]] = {}
+    for name in outputs:
+        by_key.setdefault(field_key(name), []).append(name)
+
+    fields = {}
+    total = 0.0
+    for name in wanted:
+        best, best_weight = None, 0.0
+        for candidate in by_key.get(field_key(name), []):
+            weight = EXACT_MATCH if candidate == name else ALIAS_MATCH
+            expected = inputs[name].get("type") if isinstance(inputs[name], dict) else None
+            provided = outputs[candidate].get("type") if isinstance(outputs[candidate], dict) else None
+            if expected and provided and expected != provided:
+                weight *= TYPE_MISMATCH_FACTOR
+            if weight > best_weight:
+                best, best_weight = candidate, weight
+        if best is not None:
+            fields[name] = best
+            total += best_weight
+
+    return {
+        "score": round(BASE_SCORE + (1.0 - BASE_SCORE) * total / len(wanted), 4),
+        "compatible": len(fields) == len(wanted),
+        "fields": fields,
+    }
+
+
+def _fingerprint(agent: Dict[str, Any]) -> str:
+    return hashlib.sha256(
+        json.dumps([agent.get("input_schema"), agent.get("output_schema")], sort_keys=True).encode(
+            "utf-8"
+        )
+    ).hexdigest()[:16]
+
+
+class CompatibilityGraph:
+    """Compatibility scores between all agents, kept in step with the catalog."""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "CompatibilityGraph":
+        """Singleton pattern to ensure a single compatibility graph."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = CompatibilityGraph(CatalogRepository.get_instance())
+            return cls._instance
+
+    def __init__(self, catalog: CatalogRepository):
+        """
+        Args:
+            catalog: Catalog whose agents are scored
+        """
+        self.catalog = catalog
+        self._agents: Dict[int, Dict[str, Any]] = {}
+        self._fingerprints: Dict[int, str] = {}
+        # source id -> target id -> compatibility(), for pairs sharing a field
+        self._edges: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        # source id -> [(-score, target id)], best first
+        self._ranked: Dict[int, List[Tuple[float, int]]] = {}
+        # field key -> agents consuming / producing it
+        self._consumers: Dict[str, Set[int]] = {}
+        self._producers: Dict[str, Set[int]] = {}
+        self._synced_version: Optional[int] = None
+        self._lock = threading.RLock()
+
+    # --- maintenance ---
+
+    def _link(self, source_id: int, target_id: int):
+        if source_id == target_id:
+            return
+        result = compatibility(self._agents[source_id], self._agents[target_id])
+        if not result["fields"]:
+            return
+        self._edges.setdefault(source_id, {})[target_id] = result
+        bisect.insort(self._ranked.setdefault(source_id, []), (-result["score"], target_id))
+
+    def _unlink(self, source_id: int, target_id: int):
+        result = self._edges.get(source_id, {}).pop(target_id, None)
+        if result is not None:
+            self._ranked[source_id].remove((-result["score"], target_id))
+
+    def remove_agent(self, agent_id: int):
+        """Drop an agent and every pair it is part of."""
+        with self._lock:
+            agent = self._agents.pop(agent_id, None)
+            if agent is None:
+                return
+            for target_id in list(self._edges.get(agent_id, {})):
+                self._unlink(agent_id, target_id)
+            for name in wanted_fields(agent):
+                for source_id in self._producers.get(field_key(name), set()):
+                    self._unlink(source_id, agent_id)
+                self._consumers.get(field_key(name), set()).discard(agent_id)
+            for name in _properties(agent.get("output_schema")):
+                self._producers.get(field_key(name), set()).discard(agent_id)
+            self._edges.pop(agent_id, None)
+            self._ranked.pop(agent_id, None)
+            self._fingerprints.pop(agent_id, None)
+
+    def add_agent(self, agent: Dict[str, Any]):
+        """
+        Score a new (or changed) agent against the others, in both directions.
+
+        Only agents sharing a field key with it are visited, so adding one
+        agent costs its neighbours rather than the whole catalog.
+        """
+        with self._lock:
+            agent_id = agent["id"]
+            self.remove_agent(agent_id)
+            self._agents[agent_id] = agent
+            self._fingerprints[agent_id] = _fingerprint(agent)
+
+            consumes = {field_key(name) for name in wanted_fields(agent)}
+            produces = {field_key(name) for name in _properties(agent.get("output_schema"))}
+            for key in consumes:
+                self._consumers.setdefault(key, set()).add(agent_id)
+            for key in produces:
+                self._producers.setdefault(key, set()).add(agent_id)
+
+            targets = set().union(*(self._consumers.get(key, set()) for key in produces))
+            sources = set().union(*(self._producers.get(key, set()) for key in consumes))
+            for target_id in targets:
+                self._link(agent_id, target_id)
+            for source_id in sources - {agent_id}:
+                self._link(source_id, agent_id)
+
+    def sync(self) -> int:
+        """
+        Bring the graph up to date with the catalog's agents.
+
+        Returns:
+            Number of agents added, re-scored or removed
+        """
+        with self._lock:
+            version = self.catalog.version
+            if self._synced_version == version:
+                return 0
+            agents = {agent["id"]: agent for agent in self.catalog.list_agents()}
+            removed = [agent_id for agent_id in self._agents if agent_id not in agents]
+            changed = [
+                agent
+                for agent_id, agent in agents.items()
+                if self._fingerprints.get(agent_id) != _fingerprint(agent)
+            ]
+            for agent_id in removed:
+                self.remove_agent(agent_id)
+            for agent in changed:
+                self.add_agent(agent)
+            # Names and descriptions may have changed without the schemas
+            for agent_id, agent in agents.items():
+                self._agents[agent_id] = agent
+            if changed or removed:
+                logger.info(
+                    f"Compatibility graph: {len(changed)} agents scored, {len(removed)} removed"
+                )
+            self._synced_version = version
+            return len(changed) + len(removed)
+
+    # --- queries ---
+
+    def get_agent(self, agent_id: int) -> Optional[Dict[str, Any]]:
+        """Catalog entry of an agent in the graph, or None."""
+        self.sync()
+        return self._agents.get(agent_id)
+
+    def entry_agents(self, field: str) -> List[Dict[str, Any]]:
+        """
+        Agents that can start from a single input field, best first.
+
+        Returns:
+            compatibility() of a source providing only ``field`` to each
+            agent consuming it, with "agent_id" added
+        """
+        self.sync()
+        source = {"output_schema": {"properties": {field: {}}}}
+        with self._lock:
+            entries = [
+                {"agent_id": agent_id, **compatibility(source, self._agents[agent_id])}
+                for agent_id in self._consumers.get(field_key(field), set())
+            ]
+        return sorted(entries, key=lambda entry: (-entry["score"], entry["agent_id"]))
+
+    def pair(self, source_id: int, target_id: int) -> Optional[Dict[str, Any]]:
+        """compatibility() of two agents, or None if either is unknown."""
+        self.sync()
+        with self._lock:
+            if source_id not in self._agents or target_id not in self._agents:
+                return None
+            stored = self._edges.get(source_id, {}).get(target_id)
+            if stored is not None:
+                return stored
+            if source_id == target_id:
+                return compatibility(self._agents[source_id], self._agents[target_id])
+            # Shares no field: only targets without inputs are compatible
+            return {
+                "score": BASE_SCORE,
+                "compatible": not wanted_fields(self._agents[target_id]),
+                "fields": {},
+            }
+
+    def next_agents(self, agent_id: int, k: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """
+        The k agents that best continue from ``agent_id``, best first.
+
+        Returns:
+            List of {"agent_id", "name", "category", "score", "compatible",
+            "fields"}, or None if the agent is unknown
+        """
+        self.sync()
+        with self._lock:
+            if agent_id not in self._agents:
+                return None
+            edges = self._edges.get(agent_id, {})
+            return [
+                {
+                    "agent_id": target_id,
+                    "name": self._agents[target_id].get("name"),
+                    "category": self._agents[target_id].get("category"),
+                    **edges[target_id],
+                }
+                for _, target_id in self._ranked.get(agent_id, [])[: max(k, 0)]
+            ]
+
+
+def get_compatibility_graph() -> CompatibilityGraph:
+    """FastAPI dependency returning the shared compatibility graph."""
+    return CompatibilityGraph.get_instance()
@@ -0,0 +1,69 @@
+"""
+Per-step execution counters, collected without threading state through agents.
+
+The workflow engine opens a step with track_step(); while it is open, code
+running in the same context (the agent, its LLM calls, catalog lookups)
+reports into it with record_llm_call() and record_cache_hit(). Outside a
+step these calls do nothing, so agents run unchanged in previews and tests.
+"""
+
+import contextvars
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+_current_step: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "execution_step_metrics", default=None
+)
+
+
+def new_metrics() -> Dict[str, Any]:
+    return {"llm_calls": 0, "tokens": 0, "cache_hits": 0}
+
+
+@contextmanager
+def track_step() -> Iterator[Dict[str, Any]]:
+    """
+    Collect counters for one workflow step.
+
+    Yields a dict with "llm_calls", "tokens" and "cache_hits", plus
+    "started_at"/"finished_at" (epoch seconds) and "duration_ms" once the
+    block exits.
+    """
+    metrics = new_metrics()
+    metrics["started_at"] = time.time()
+    start = time.perf_counter()
+    token = _current_step.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_step.reset(token)
+        metrics["duration_ms"] = (time.perf_counter() - start) * 1000
+        metrics["finished_at"] = metrics["started_at"] + metrics["duration_ms"] / 1000
+
+
+def current_metrics() -> Optional[Dict[str, Any]]:
+    """Counters of the step running in this context, if any."""
+    return _current_step.get()
+
+
+def record_llm_call(tokens: int = 0):
+    metrics = _current_step.get()
+    if metrics is not None:
+        metrics["llm_calls"] += 1
+        metrics["tokens"] += tokens
+
+
+def record_cache_hit(count: int = 1):
+    metrics = _current_step.get()
+    if metrics is not None:
+        metrics["cache_hits"] += count
+
+
+def payload_size(data: Any) -> int:
+    """Size in bytes of a step input or output, as JSON."""
+    try:
+        return len(json.dumps(data, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(str(data).encode("utf-8"))
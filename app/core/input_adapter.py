@@ -6,7 +6,6 @@ import json
 import logging
 
 from app.models.execution import WorkflowInput
-from app.db.models import Agent
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -19,7 +18,7 @@ class InputAdapter:
     @staticmethod
     async def adapt_input(
         workflow_input: WorkflowInput,
-        first_agent: Agent,
+        first_agent: Dict[str, Any],
         file: Optional[UploadFile] = None,
     ) -> Dict[str, Any]:
         """
@@ -27,7 +26,7 @@ class InputAdapter:
 
         Args:
             workflow_input: Standardized workflow input
-            first_agent: The first agent in the workflow
+            first_agent: The first agent in the workflow (catalog entry)
             file: Optional file uploaded by the user
 
         Returns:
@@ -35,12 +34,12 @@ class InputAdapter:
         """
         try:
             # Log input for debugging
-            logger.info(f"Adapting input for agent: {first_agent.name}")
+            logger.info(f"Adapting input for agent: {first_agent['name']}")
             logger.info(f"Input content type: {type(workflow_input.content)}")
             logger.info(f"File provided: {file is not None}")
 
             # Get agent's input schema
-            agent_input_schema = first_agent.input_schema
+            agent_input_schema = first_agent["input_schema"]
 
             # Start with a base transformed input
             transformed_input = {}
@@ -1,5 +1,16 @@
+import importlib
+import logging
+import os
 from typing import Dict, List, Any, Optional, Set
+from app.db.shared_state import MULTI_WORKER, LeaderLease
 from app.rag.rag_service import RAGService
+from app.rag.retention import RetentionCompactor
+from app.rag.seeding import KnowledgeSeeder
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 60 * 60
 
 
 class KnowledgeRegistry:
@@ -7,6 +18,71 @@ class KnowledgeRegistry:
 
     _instance = None
 
+    # HNSW settings for Chroma collections. Chroma's default search_ef of 10
+    # is below the candidate counts hybrid search and reranking request.
+    # These only take effect when a collection is first created.
+    CHROMA_HNSW: Dict[str, Any] = {
+        "space": "l2",
+        "construction_ef": 200,
+        "search_ef": 64,
+        "M": 16,
+    }
+
+    # Storage backend per collection (see RAGService.configure_collection).
+    # Small, frequently searched collections skip Chroma's round trip.
+    COLLECTION_CONFIGS: Dict[str, Dict[str, Any]] = {
+        "seo_knowledge": {"backend": "numpy"},
+        "productivity_tips": {"backend": "numpy"},
+        "email_templates": {"backend": "numpy"},
+        # Agent and workflow descriptions for marketplace search
+        "marketplace_catalog": {"backend": "numpy"},
+        "marketing_knowledge": {"backend": "chroma", "hnsw": CHROMA_HNSW},
+        "meeting_knowledge": {"backend": "chroma", "hnsw": CHROMA_HNSW},
+        "communication_best_practices": {"backend": "chroma", "hnsw": CHROMA_HNSW},
+        "general_knowledge": {"backend": "chroma", "hnsw": CHROMA_HNSW},
+    }
+
+    # Retention for collections that agents write to on every run (see
+    # app/rag/retention.py); "where" limits a policy to generated documents
+    RETENTION_POLICIES: Dict[str, Dict[str, Any]] = {
+        "meeting_knowledge": {
+            "ttl_seconds": 90 * DAY_SECONDS,
+            "max_documents": 20000,
+            "merge_duplicates": True,
+        },
+        "email_templates": {
+            "ttl_seconds": 30 * DAY_SECONDS,
+            "max_documents": 5000,
+            "merge_duplicates": True,
+            "where": {"type": "email_response"},
+        },
+    }
+
+    # Near-duplicate checks on ingest (see RAGService.configure_deduplication).
+    # Repeated meeting summaries refresh the stored copy; boilerplate email
+    # responses are simply skipped.
+    DEDUP_CONFIGS: Dict[str, Dict[str, Any]] = {
+        "meeting_knowledge": {"threshold": 0.85, "policy": "merge"},
+        "email_templates": {"threshold": 0.9, "policy": "skip"},
+    }
+
+    # Seconds between background compaction passes
+    COMPACTION_INTERVAL = float(os.getenv("RAG_COMPACTION_INTERVAL", 3600))
+
+    # Collections loaded at startup, before the app reports ready
+    HOT_COLLECTIONS = [
+        "seo_knowledge",
+        "productivity_tips",
+        "email_templates",
+        "marketing_knowledge",
+        "meeting_knowledge",
+    ]
+
+    # Modules that register seed corpora (see app/rag/seeding.py) when imported
+    SEED_MODULES = [
+        "app.agents.seo_optimizer",
+    ]
+
     @classmethod
     def get_instance(cls) -> "KnowledgeRegistry":
         """Singleton pattern to ensure a single registry instance."""
@@ -24,6 +100,26 @@ class KnowledgeRegistry:
             "general": {"general_knowledge"},
         }
 
+        for collection, config in self.COLLECTION_CONFIGS.items():
+            self.rag_service.configure_collection(collection, **config)
+
+        for collection, config in self.DEDUP_CONFIGS.items():
+            self.rag_service.configure_deduplication(collection, **config)
+
+        self.seeder = KnowledgeSeeder.get_instance()
+
+        # With several worker processes, one of them seeds, compacts and
+        # writes agent-generated knowledge (see app/db/shared_state.py)
+        self.leader = LeaderLease("rag") if MULTI_WORKER else None
+        self.seeder.leader = self.leader
+
+        self.compactor = RetentionCompactor(
+            self.rag_service,
+            self.RETENTION_POLICIES,
+            self.COMPACTION_INTERVAL,
+            leader=self.leader,
+        )
+
         # Register shared collections
         for domain, collections in self.knowledge_domains.items():
             for collection in collections:
@@ -41,12 +137,64 @@ class KnowledgeRegistry:
         self.knowledge_domains[domain].add(collection)
         self.rag_service.mark_collection_as_shared(collection)
 
+    def configure_collection(self, collection: str, backend: str = "chroma", **options):
+        """Select the storage backend ("chroma" or "numpy") and its options, e.g. hnsw, for a collection."""
+        self.rag_service.configure_collection(collection, backend, **options)
+
+    def warm_up(self) -> Dict[str, float]:
+        """Load the hot collections' indexes; returns seconds spent per collection."""
+        return self.rag_service.warm_up(self.HOT_COLLECTIONS)
+
+    def register_seed(
+        self,
+        name: str,
+        collection: str,
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> str:
+        """Register reference documents a collection should always contain; returns the seed version."""
+        return self.seeder.register(name, collection, documents, metadatas, ids)
+
+    def is_leader(self) -> bool:
+        """Whether this process does the shared RAG maintenance (always, with one worker)."""
+        return self.leader is None or self.leader.is_leader()
+
+    def seed_knowledge(self, force: bool = False) -> Dict[str, bool]:
+        """Write missing or outdated seeds once (at deploy or startup); returns which were written."""
+        for module in self.SEED_MODULES:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                logger.error(f"Error loading seeds from {module}: {str(e)}")
+        return self.seeder.seed_all(force)
+
+    def set_retention_policy(self, collection: str, **policy):
+        """Set TTL, size and duplicate-merging retention for a collection."""
+        self.compactor.set_policy(collection, **policy)
+
+    def compact_knowledge(self) -> List[Dict[str, Any]]:
+        """Apply all retention policies now and return what was removed per collection."""
+        return self.compactor.compact_all()
+
     def search_domain_knowledge(
-        self, domain: str, query: str, n_results: int = 5
+        self,
+        domain: str,
+        query: str,
+        n_results: int = 5,
+        route: bool = True,
+        **search_kwargs,
     ) -> Dict[str, List[Dict[str, Any]]]:
-        """Search for knowledge within a specific domain."""
+        """
+        Search for knowledge within a specific domain (search_kwargs go to RAGService.search).
+
+        With route, only the domain's collections closest to the query are
+        searched (see RAGService.route_query); pass route=False to search all.
+        """
         collections = list(self.get_domain_collections(domain))
-        return self.rag_service.search_across_collections(query, n_results, collections)
+        return self.rag_service.search_across_collections(
+            query, n_results, collections, route=route, **search_kwargs
+        )
 
     def list_domains(self) -> List[str]:
         """List all available knowledge domains."""
@@ -1,9 +1,6 @@
 # --- app/data/sample_data.py ---
 import json
 from typing import Dict, Any
-from app.models.workflow import WorkflowCreate, WorkflowUpdate
-from fastapi import HTTPException
-from app.core.agent_registry import AgentRegistry
 import os
 
 
@@ -43,75 +40,6 @@ def load_sample_workflows() -> Dict[int, Dict]:
         return {}
 
 
-def add_workflow(dummy_data: Dict, workflow: WorkflowCreate) -> Dict:
-    """Adds a new workflow to the dummy data."""
-
-    # Basic validation (ensure agent IDs exist)
-    for agent_data in workflow.agents:
-        if agent_data.agent_id not in dummy_data["agents"]:
-            raise HTTPException(
-                status_code=400, detail=f"Agent with id {agent_data.agent_id} not found"
-            )
-
-    new_id = max(dummy_data["workflows"].keys(), default=0) + 1
-    new_workflow = workflow.dict()
-    new_workflow["id"] = new_id
-
-    # Convert WorkflowAgentCreate to a simple dict for storage
-    new_workflow["agents"] = [agent.dict() for agent in new_workflow["agents"]]
-    for agent_data in new_workflow["agents"]:
-        agent_data["id"] = agent_data["agent_id"]  # Assign agent id for dummy_db
-        agent_data["workflow_id"] = new_id
-
-    dummy_data["workflows"][new_id] = new_workflow
-    return new_workflow
-
-
-def update_workflow_data(
-    dummy_data, workflow_id: int, workflow_update: WorkflowUpdate
-) -> Dict:
-    """Updates a workflow to the dummy data."""
-    if workflow_id not in dummy_data["workflows"]:
-        raise HTTPException(status_code=404, detail="Workflow not found")
-
-    existing_workflow = dummy_data["workflows"][workflow_id]
-
-    if workflow_update.name is not None:
-        existing_workflow["name"] = workflow_update.name
-    if workflow_update.description is not None:
-        existing_workflow["description"] = workflow_update.description
-    if workflow_update.category is not None:
-        existing_workflow["category"] = workflow_update.category
-    if workflow_update.is_template is not None:
-        existing_workflow["is_template"] = workflow_update.is_template
-
-    if workflow_update.agents is not None:
-        # Clear the agents list
-        existing_workflow["agents"] = []
-
-        for agent_data in workflow_update.agents:
-            if agent_data.agent_id not in dummy_data["agents"]:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Agent with id {agent_data.agent_id} not found",
-                )
-            agent_entry = agent_data.dict()
-            agent_entry["id"] = agent_data.agent_id
-            agent_entry["workflow_id"] = workflow_id
-            existing_workflow["agents"].append(agent_entry)
-
-    return existing_workflow
-
-
-def delete_workflow_data(dummy_data, workflow_id: int) -> Dict:
-    """Deletes a workflow from dummy data."""
-    if workflow_id not in dummy_data["workflows"]:
-        raise HTTPException(status_code=404, detail="Workflow not found")
-
-    del dummy_data["workflows"][workflow_id]
-    return {"message": f"Workflow {workflow_id} deleted successfully"}
-
-
 # Create the sample JSON files (if they don't exist)
 # This part will only execute when sample_data.py is run directly.
 if __name__ == "__main__":
@@ -7,20 +7,35 @@ from typing import Dict, Any, List, Optional
 from app.core.agent_registry import AgentRegistry
 from app.rag.rag_service import RAGService
 from app.core.knowledge_registry import KnowledgeRegistry
+from app.rag.ingestion_queue import KnowledgeIngestionQueue
+from app.core.execution_metrics import track_step, payload_size
+from app.db.history import ExecutionHistoryWriter
 import jsonschema
+import time
+import logging
+from fastapi.concurrency import run_in_threadpool
 from jsonschema.exceptions import ValidationError
 
+# Setup logging
+logger = logging.getLogger(__name__)
+
 
 class WorkflowEngine:
     """Engine for executing agent workflows."""
 
-    def __init__(self, dummy_db):  # Changed db to dummy_db
-        self.dummy_db = dummy_db  # Store the dummy DB
+    def __init__(self, catalog, history: Optional[ExecutionHistoryWriter] = None):
+        self.catalog = catalog  # CatalogRepository
+        self.history = history or ExecutionHistoryWriter.get_instance()
         self.rag_service = RAGService.get_instance()
         self.knowledge_registry = KnowledgeRegistry.get_instance()
+        self.ingestion_queue = KnowledgeIngestionQueue.get_instance()
 
     def execute_workflow(
-        self, workflow_id: int, initial_input: Dict[str, Any]
+        self,
+        workflow_id: int,
+        initial_input: Dict[str, Any],
+        workflow: Optional[Dict[str, Any]] = None,
+        agent_models: Optional[Dict[int, Dict[str, Any]]] = None,
     ) -> Dict[str, Any]:
         """
         Execute a workflow by running each agent in sequence.
@@ -28,18 +43,24 @@ class WorkflowEngine:
         Args:
             workflow_id: ID of the workflow to execute
             initial_input: Initial input data for the workflow
+            workflow: The workflow, if the caller already loaded it
+            agent_models: Its agents by id, if the caller already loaded them
 
         Returns:
             Final output from the workflow
         """
-        # Get workflow - use dictionary lookup instead of DB query
-        workflow = self.dummy_db["workflows"].get(workflow_id)
+        if workflow is None:
+            workflow = self.catalog.get_workflow(workflow_id)
 
         if not workflow:
             raise ValueError(f"Workflow with ID {workflow_id} not found")
 
-        # Get ordered workflow agents - use list directly from data
+        # Get ordered workflow agents, with all their agent models in one lookup
         workflow_agents = workflow["agents"]
+        if agent_models is None:
+            agent_models = self.catalog.get_agents(
+                [workflow_agent["agent_id"] for workflow_agent in workflow_agents]
+            )
 
         # Initialize workflow context
         context = {
@@ -60,77 +81,187 @@ class WorkflowEngine:
                 self.knowledge_registry.get_domain_collections(workflow["category"])
             )
 
+        started_at = time.time()
+        steps = []
+        try:
+            final_output = self._run_steps(
+                workflow_id, workflow_agents, agent_models, initial_input, context, steps
+            )
+        except Exception:
+            # Runs that fail outright are recorded too, with the steps that finished
+            self._record_execution(
+                workflow_id, workflow, initial_input, None, started_at, steps, context, True
+            )
+            raise
+
+        self._record_execution(
+            workflow_id, workflow, initial_input, final_output, started_at, steps, context
+        )
+        return {"final_output": final_output, "context": context}
+
+    def _run_steps(
+        self,
+        workflow_id: int,
+        workflow_agents: List[Dict[str, Any]],
+        agent_models: Dict[int, Dict[str, Any]],
+        initial_input: Dict[str, Any],
+        context: Dict[str, Any],
+        steps: List[Dict[str, Any]],
+    ) -> Any:
+        """Run each agent in turn, appending a history row per step to steps."""
         current_input = initial_input
 
         for i, workflow_agent in enumerate(workflow_agents):
-            # Get agent model and instance using dummy data
-            agent_model = self.dummy_db["agents"][workflow_agent["agent_id"]]
-            agent_instance = AgentRegistry.get_agent_instance(
-                agent_model, workflow_agent["config"]
-            )
-
-            try:
-                self._validate_agent_input(agent_instance, current_input)
-            except ValidationError as e:
-                context["errors"] = context.get("errors", []) + [
-                    {
-                        "step": i,
-                        "agent_id": agent_model["id"],
-                        "agent_name": agent_model["name"],
-                        "error": f"Input validation failed: {str(e)}",
-                        "input": current_input,
-                    }
-                ]
+            agent_model = agent_models[workflow_agent["agent_id"]]
+            errors_before = len(context.get("errors", []))
+            with track_step() as metrics:
+                metrics["status"] = "success"
+                metrics["input_size"] = payload_size(current_input)
+                agent_instance = AgentRegistry.get_agent_instance(
+                    agent_model, workflow_agent["config"]
+                )
+                # Knowledge is stored after the step finishes, off the agent's path
+                agent_instance.defer_knowledge_writes = True
 
                 try:
-                    current_input = self._adapt_input_for_agent(
-                        agent_instance, current_input
-                    )
-                    context["adaptations"] = context.get("adaptations", []) + [
+                    self._validate_agent_input(agent_instance, current_input)
+                except ValidationError as e:
+                    context["errors"] = context.get("errors", []) + [
                         {
                             "step": i,
                             "agent_id": agent_model["id"],
                             "agent_name": agent_model["name"],
-                            "message": "Input was adapted to match expected schema",
+                            "error": f"Input validation failed: {str(e)}",
+                            "input": current_input,
                         }
                     ]
-                except Exception as adapt_err:
+
+                    try:
+                        current_input = self._adapt_input_for_agent(
+                            agent_instance, current_input
+                        )
+                        context["adaptations"] = context.get("adaptations", []) + [
+                            {
+                                "step": i,
+                                "agent_id": agent_model["id"],
+                                "agent_name": agent_model["name"],
+                                "message": "Input was adapted to match expected schema",
+                            }
+                        ]
+                    except Exception as adapt_err:
+                        context["errors"] = context.get("errors", []) + [
+                            {
+                                "step": i,
+                                "agent_id": agent_model["id"],
+                                "agent_name": agent_model["name"],
+                                "error": f"Input adaptation failed: {str(adapt_err)}",
+                            }
+                        ]
+
+                try:
+                    agent_output = agent_instance.process(current_input, context)
+
+                    context["intermediate_results"][workflow_agent["id"]] = agent_output
+
+                    if hasattr(agent_instance, "get_generated_knowledge"):
+                        knowledge = agent_instance.get_generated_knowledge()
+                        if knowledge:
+                            context["rag_context"]["generated_knowledge"][
+                                agent_model["name"]
+                            ] = knowledge
+                            self.ingestion_queue.submit_many(
+                                [
+                                    {
+                                        **item,
+                                        "metadata": {
+                                            **item.get("metadata", {}),
+                                            "source_agent": agent_model["name"],
+                                            "workflow_id": workflow_id,
+                                        },
+                                    }
+                                    for item in knowledge
+                                ]
+                            )
+
+                    current_input = agent_output
+
+                except Exception as e:
+                    metrics["status"] = "error"
+                    error_msg = f"Agent processing failed: {str(e)}"
                     context["errors"] = context.get("errors", []) + [
                         {
                             "step": i,
                             "agent_id": agent_model["id"],
                             "agent_name": agent_model["name"],
-                            "error": f"Input adaptation failed: {str(adapt_err)}",
+                            "error": error_msg,
                         }
                     ]
+                    current_input = {"error": error_msg, "agent_id": agent_model["id"]}
+
+            steps.append(
+                self._step_record(
+                    i,
+                    agent_model,
+                    metrics,
+                    current_input,
+                    context.get("errors", [])[errors_before:],
+                )
+            )
 
-            try:
-                agent_output = agent_instance.process(current_input, context)
-
-                context["intermediate_results"][workflow_agent["id"]] = agent_output
-
-                if hasattr(agent_instance, "get_generated_knowledge"):
-                    knowledge = agent_instance.get_generated_knowledge()
-                    if knowledge:
-                        context["rag_context"]["generated_knowledge"][
-                            agent_model["name"]
-                        ] = knowledge
-
-                current_input = agent_output
+        return current_input
 
-            except Exception as e:
-                error_msg = f"Agent processing failed: {str(e)}"
-                context["errors"] = context.get("errors", []) + [
-                    {
-                        "step": i,
-                        "agent_id": agent_model["id"],
-                        "agent_name": agent_model["name"],
-                        "error": error_msg,
-                    }
-                ]
-                current_input = {"error": error_msg, "agent_id": agent_model["id"]}
+    @staticmethod
+    def _step_record(
+        step: int,
+        agent_model: Dict[str, Any],
+        metrics: Dict[str, Any],
+        output: Any,
+        errors: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Execution history row for a finished step."""
+        return {
+            **metrics,
+            "step": step,
+            "agent_id": agent_model["id"],
+            "agent_name": agent_model["name"],
+            "output_size": payload_size(output),
+            "error": "; ".join(error["error"] for error in errors) or None,
+        }
 
-        return {"final_output": current_input, "context": context}
+    def _record_execution(
+        self,
+        workflow_id: int,
+        workflow: Dict[str, Any],
+        initial_input: Dict[str, Any],
+        final_output: Any,
+        started_at: float,
+        steps: List[Dict[str, Any]],
+        context: Dict[str, Any],
+        failed: bool = False,
+    ):
+        """Queue the run's execution record; history problems never fail a run."""
+        try:
+            failed = failed or any(step["status"] == "error" for step in steps)
+            finished_at = time.time()
+            self.history.submit(
+                {
+                    "workflow_id": workflow_id,
+                    "workflow_name": workflow["name"],
+                    "status": "error" if failed else "success",
+                    "started_at": started_at,
+                    "finished_at": finished_at,
+                    "duration_ms": (finished_at - started_at) * 1000,
+                    "input_size": payload_size(initial_input),
+                    "output_size": payload_size(final_output),
+                    "llm_calls": sum(step["llm_calls"] for step in steps),
+                    "tokens": sum(step["tokens"] for step in steps),
+                    "cache_hits": sum(step["cache_hits"] for step in steps),
+                    "error_count": len(context.get("errors", [])),
+                    "steps": steps,
+                }
+            )
+        except Exception as e:
+            logger.error(f"Error recording execution of workflow {workflow_id}: {str(e)}")
 
     def _validate_agent_input(self, agent_instance, input_data):
         """Validate input data against agent's input schema"""
@@ -162,13 +293,13 @@ class WorkflowEngine:
 
 
 async def test_execute_workflow(
-    dummy_db, agents: List[tuple], initial_input: Dict[str, Any]
+    catalog, agents: List[tuple], initial_input: Dict[str, Any]
 ) -> Dict[str, Any]:
     """
     Execute a temporary workflow without saving it to the database.
 
     Args:
-        dummy_db: The dummy database.
+        catalog: The catalog repository.
         agents: List of tuples: (agent_model_dict, config, order).
         initial_input: Initial input.
 
@@ -183,10 +314,15 @@ async def test_execute_workflow(
     current_input = initial_input
 
     for i, (agent_model, config, order) in enumerate(agents):
-        agent_instance = AgentRegistry.get_agent_instance(agent_model, config)
+        # Agents load models and call LLMs synchronously; keep them off the event loop
+        agent_instance = await run_in_threadpool(
+            AgentRegistry.get_agent_instance, agent_model, config
+        )
 
         try:
-            agent_output = agent_instance.process(current_input, context)
+            agent_output = await run_in_threadpool(
+                agent_instance.process, current_input, context
+            )
             context["intermediate_results"][f"step_{i}"] = agent_output
             current_input = agent_output
         except Exception as e:
@@ -0,0 +1,248 @@
+"""
+Automatic workflow composition.
+
+Given the field a workflow starts from (e.g. "transcript") and the field it
+should produce (e.g. "seo_score"), the planner runs a uniform-cost search
+over the compatibility graph: each step into an agent costs a weighted sum
+of how poorly it fits its predecessor's output, the agent's median latency
+and its average LLM calls from execution history. Successors are taken
+from each agent's top-ranked next agents (a beam), and every agent may
+settle a bounded number of times, so the search yields several distinct
+low-cost chains rather than only the single best one.
+"""
+
+import heapq
+import threading
+import time
+from typing import List, Dict, Any, Callable, Tuple
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.core.compatibility import CompatibilityGraph
+from app.db.database import SessionLocal
+from app.db.history import agent_stats
+from app.models.workflow import WorkflowCreate, WorkflowAgentCreate
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Edge cost weights per objective: misfit is 1 - compatibility score,
+# latency is the agent's p50 in seconds, llm_calls its average per step
+OBJECTIVES = {
+    "cheapest": {"misfit": 4.0, "latency": 0.2, "llm_calls": 1.0},
+    "fastest": {"misfit": 4.0, "latency": 1.0, "llm_calls": 0.1},
+}
+
+# Added to every step, so shorter chains win ties
+STEP_COST = 0.1
+
+# Assumed for agents without execution history
+DEFAULT_LATENCY_MS = 3000.0
+DEFAULT_LLM_CALLS = 1.0
+
+# Execution history window the step estimates are taken from
+STATS_WINDOW_HOURS = 7 * 24
+# Seconds the step estimates are reused before being read again
+STATS_TTL = 60.0
+
+MAX_STEPS = 6
+
+
+def produces(agent: Dict[str, Any], goal: str) -> bool:
+    """Whether ``agent``'s output schema declares the ``goal`` field."""
+    return goal in ((agent.get("output_schema") or {}).get("properties", {}) or {})
+
+
+class WorkflowPlanner:
+    """Finds low-cost agent chains from a start field to a goal field."""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "WorkflowPlanner":
+        """Singleton pattern to ensure a single workflow planner."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = WorkflowPlanner(CompatibilityGraph.get_instance())
+            return cls._instance
+
+    def __init__(
+        self,
+        graph: CompatibilityGraph,
+        session_factory: Callable[[], Session] = SessionLocal,
+        beam_width: int = 8,
+        max_expansions: int = 2000,
+    ):
+        """
+        Args:
+            graph: Compatibility graph the chains are searched in
+            session_factory: Creates the sessions execution history is read with
+            beam_width: Best next agents considered from each agent
+            max_expansions: Upper bound on search steps per objective
+        """
+        self.graph = graph
+        self.session_factory = session_factory
+        self.beam_width = beam_width
+        self.max_expansions = max_expansions
+        self._stats: Dict[int, Dict[str, float]] = {}
+        self._stats_loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def step_estimates(self) -> Dict[int, Dict[str, float]]:
+        """Per-agent "latency_ms" (p50) and "llm_calls" from recent execution history."""
+        with self._lock:
+            if time.time() - self._stats_loaded_at > STATS_TTL:
+                now = time.time()
+                try:
+                    with self.session_factory() as db:
+                        rows = agent_stats(db, since=now - STATS_WINDOW_HOURS * 3600, until=now)
+                    self._stats = {
+                        row["agent_id"]: {
+                            "latency_ms": DEFAULT_LATENCY_MS
+                            if row["p50_ms"] is None
+                            else row["p50_ms"],
+                            "llm_calls": DEFAULT_LLM_CALLS
+                            if row["avg_llm_calls"] is None
+                            else row["avg_llm_calls"],
+                        }
+                        for row in rows
+                    }
+                except Exception as e:
+                    # Plans fall back to the defaults rather than failing
+                    logger.error(f"Error reading agent stats for planning: {str(e)}")
+                self._stats_loaded_at = now
+            return self._stats
+
+    @staticmethod
+    def _edge_cost(score: float, estimate: Dict[str, float], weights: Dict[str, float]) -> float:
+        return (
+            STEP_COST
+            + weights["misfit"] * (1.0 - score)
+            + weights["latency"] * estimate["latency_ms"] / 1000
+            + weights["llm_calls"] * estimate["llm_calls"]
+        )
+
+    def _search(
+        self,
+        start: str,
+        goal: str,
+        weights: Dict[str, float],
+        max_steps: int,
+        limit: int,
+        estimates: Dict[int, Dict[str, float]],
+    ) -> List[Tuple[float, List[Tuple[int, Dict[str, Any]]]]]:
+        default = {"latency_ms": DEFAULT_LATENCY_MS, "llm_calls": DEFAULT_LLM_CALLS}
+        # (cost, tie-breaker, [(agent id, edge into it)])
+        frontier: List[Tuple[float, int, List[Tuple[int, Dict[str, Any]]]]] = []
+        counter = 0
+        for entry in self.graph.entry_agents(start)[: self.beam_width]:
+            if entry["compatible"]:
+                cost = self._edge_cost(
+                    entry["score"], estimates.get(entry["agent_id"], default), weights
+                )
+                frontier.append((cost, counter, [(entry["agent_id"], entry)]))
+                counter += 1
+        heapq.heapify(frontier)
+
+        found = []
+        settled: Dict[int, int] = {}
+        expansions = 0
+        while frontier and len(found) < limit and expansions < self.max_expansions:
+            cost, _, path = heapq.heappop(frontier)
+            expansions += 1
+            agent_id = path[-1][0]
+            # Each agent ends at most ``limit`` of the cheapest partial chains
+            if settled.get(agent_id, 0) >= limit:
+                continue
+            settled[agent_id] = settled.get(agent_id, 0) + 1
+
+            if produces(self.graph.get_agent(agent_id), goal):
+                found.append((cost, path))
+                continue
+            if len(path) >= max_steps:
+                continue
+            visited = {step_id for step_id, _ in path}
+            for edge in self.graph.next_agents(agent_id, self.beam_width) or []:
+                if not edge["compatible"] or edge["agent_id"] in visited:
+                    continue
+                step_cost = self._edge_cost(
+                    edge["score"], estimates.get(edge["agent_id"], default), weights
+                )
+                heapq.heappush(
+                    frontier, (cost + step_cost, counter, path + [(edge["agent_id"], edge)])
+                )
+                counter += 1
+        return found
+
+    def _plan(
+        self, start: str, goal: str, cost: float, path: List[Tuple[int, Dict[str, Any]]], estimates
+    ) -> Dict[str, Any]:
+        agents = [self.graph.get_agent(agent_id) for agent_id, _ in path]
+        steps = []
+        for agent, (agent_id, edge) in zip(agents, path):
+            estimate = estimates.get(agent_id)
+            steps.append(
+                {
+                    "agent_id": agent_id,
+                    "name": agent["name"],
+                    "score": edge["score"],
+                    "fields": edge["fields"],
+                    "latency_ms": estimate["latency_ms"] if estimate else DEFAULT_LATENCY_MS,
+                    "llm_calls": estimate["llm_calls"] if estimate else DEFAULT_LLM_CALLS,
+                    "measured": estimate is not None,
+                }
+            )
+        workflow = WorkflowCreate(
+            name=" → ".join(agent["name"] for agent in agents),
+            description=f"Generated plan from {start} to {goal}",
+            category=agents[-1].get("category") or "general",
+            is_template=False,
+            agents=[
+                WorkflowAgentCreate(agent_id=agent_id, order=order, config={})
+                for order, (agent_id, _) in enumerate(path, start=1)
+            ],
+        )
+        return {
+            "workflow": workflow.model_dump(),
+            "steps": steps,
+            "fit": min(step["score"] for step in steps),
+            "estimated_latency_ms": sum(step["latency_ms"] for step in steps),
+            "estimated_llm_calls": sum(step["llm_calls"] for step in steps),
+            "cost": round(cost, 4),
+        }
+
+    def plan(self, start: str, goal: str, max_steps: int = 4, limit: int = 3) -> Dict[str, Any]:
+        """
+        Cheapest and fastest agent chains turning ``start`` into ``goal``.
+
+        Args:
+            start: Input field the workflow starts from, e.g. "transcript"
+            goal: Output field the last agent must produce, e.g. "seo_score"
+            max_steps: Longest chain considered
+            limit: Chains returned per objective
+
+        Returns:
+            Dictionary with one list of plans per OBJECTIVES key, best first.
+            Each plan has a "workflow" (a WorkflowCreate spec), its "steps"
+            with their fit and estimates, and the chain's totals
+        """
+        if not 1 <= max_steps <= MAX_STEPS:
+            raise ValueError(f"max_steps must be between 1 and {MAX_STEPS}")
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+
+        estimates = self.step_estimates()
+        plans = {}
+        for objective, weights in OBJECTIVES.items():
+            found = self._search(start, goal, weights, max_steps, limit, estimates)
+            plans[objective] = [
+                self._plan(start, goal, cost, path, estimates) for cost, path in found
+            ]
+        return plans
+
+
+def get_workflow_planner() -> WorkflowPlanner:
+    """FastAPI dependency returning the shared workflow planner."""
+    return WorkflowPlanner.get_instance()
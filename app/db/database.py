@@ -1,22 +1,156 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 import os
+import threading
+from typing import Optional
+import logging
 from dotenv import load_dotenv
 
+# Setup logging
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Async drivers for the synchronous URLs above
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+# Connection pool sizing; SQLite in WAL mode serves concurrent readers
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+
+# Applied to every new SQLite connection: WAL lets reads proceed during a
+# write, NORMAL sync is durable in WAL mode, and busy_timeout makes writers
+# wait for the lock instead of failing with "database is locked"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,
+    "cache_size": -16000,  # KiB
+    "temp_store": "MEMORY",
+}
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return _is_sqlite(url) and (url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url)
+
+
+def _set_sqlite_pragmas_on(sqlite_engine, url: str):
+    @event.listens_for(sqlite_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            if pragma == "journal_mode" and _is_memory_sqlite(url):
+                continue
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+
+def make_engine(url: str = DATABASE_URL):
+    """Create a pooled engine, configuring SQLite connections with SQLITE_PRAGMAS."""
+    if not _is_sqlite(url):
+        return create_engine(
+            url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True
+        )
+
+    if _is_memory_sqlite(url):
+        # Each connection to ":memory:" is a separate database; share one
+        sqlite_engine = create_engine(
+            url, connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+    else:
+        sqlite_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+        )
+
+    _set_sqlite_pragmas_on(sqlite_engine, url)
+    return sqlite_engine
+
+
+def async_url(url: str = DATABASE_URL) -> str:
+    """The async-driver form of a database URL, e.g. sqlite:// -> sqlite+aiosqlite://."""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def make_async_engine(url: str = DATABASE_URL):
+    """
+    Create a pooled async engine for the same database as make_engine().
+
+    Raises:
+        ImportError: If the async driver (aiosqlite, asyncpg) isn't installed
+    """
+    url = os.getenv("ASYNC_DATABASE_URL") or async_url(url)
+    if not _is_sqlite(url):
+        return create_async_engine(
+            url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True
+        )
+    if _is_memory_sqlite(url):
+        async_engine = create_async_engine(url, poolclass=StaticPool)
+    else:
+        async_engine = create_async_engine(
+            url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW
+        )
+    _set_sqlite_pragmas_on(async_engine.sync_engine, url)
+    return async_engine
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+_async_sessionmaker: Optional[async_sessionmaker] = None
+_async_lock = threading.Lock()
+_async_unavailable = False
+
+
+def get_async_sessionmaker() -> Optional[async_sessionmaker]:
+    """
+    Session factory for the async engine, created on first use.
+
+    Returns None when the async driver isn't installed; callers then run
+    the synchronous session in a worker thread instead.
+    """
+    global _async_sessionmaker, _async_unavailable
+    with _async_lock:
+        if _async_sessionmaker is None and not _async_unavailable:
+            try:
+                _async_sessionmaker = async_sessionmaker(
+                    make_async_engine(), class_=AsyncSession, expire_on_commit=False
+                )
+            except ImportError as e:
+                _async_unavailable = True
+                logger.warning(f"Async database driver not available, using threads: {str(e)}")
+        return _async_sessionmaker
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Request-scoped AsyncSession (None without an async driver)."""
+    factory = get_async_sessionmaker()
+    if factory is None:
+        yield None
+        return
+    async with factory() as session:
+        yield session
@@ -0,0 +1,311 @@
+import atexit
+import math
+import queue
+import threading
+import time
+from typing import Dict, List, Any, Optional, Callable
+import logging
+
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Session, selectinload
+
+from app.db.database import SessionLocal
+from app.db.models import ExecutionRecord, ExecutionStep
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+RECORD_FIELDS = (
+    "workflow_id",
+    "workflow_name",
+    "status",
+    "started_at",
+    "finished_at",
+    "duration_ms",
+    "input_size",
+    "output_size",
+    "llm_calls",
+    "tokens",
+    "cache_hits",
+    "error_count",
+)
+
+STEP_FIELDS = (
+    "step",
+    "agent_id",
+    "agent_name",
+    "status",
+    "started_at",
+    "finished_at",
+    "duration_ms",
+    "input_size",
+    "output_size",
+    "llm_calls",
+    "tokens",
+    "cache_hits",
+    "error",
+)
+
+
+class ExecutionHistoryWriter:
+    """
+    Write-behind queue for execution records.
+
+    The workflow engine submits a record when a run finishes and returns
+    immediately; a worker thread inserts records in batches, one
+    transaction per batch, so history writes never add latency to a run.
+    When the buffer is full, submit() writes in the caller's thread rather
+    than dropping the record, and pending records are written on shutdown.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "ExecutionHistoryWriter":
+        """Singleton pattern to ensure a single history writer."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = ExecutionHistoryWriter()
+                atexit.register(cls._instance.shutdown)
+            return cls._instance
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_pending: int = 1000,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        put_timeout: float = 0.5,
+    ):
+        """
+        Args:
+            session_factory: Creates the sessions records are written with
+            max_pending: Maximum records buffered before submit() applies backpressure
+            batch_size: Maximum records written per transaction
+            flush_interval: Seconds to wait for a batch to fill before writing it
+            put_timeout: Seconds submit() waits for space in a full buffer
+        """
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stopped = False
+        self.stats = {"submitted": 0, "written": 0, "failed": 0, "inline": 0}
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="execution-history", daemon=True
+                )
+                self._worker.start()
+
+    def submit(self, record: Dict[str, Any]):
+        """
+        Queue an execution record for writing.
+
+        Args:
+            record: RECORD_FIELDS of the run, plus "steps": a list of dicts
+                with the STEP_FIELDS of each step
+        """
+        self.stats["submitted"] += 1
+        if self._stopped:
+            self._write([record])
+            return
+
+        self._ensure_worker()
+        try:
+            self._queue.put(record, timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure: the writer is behind, so pay the write here
+            logger.warning("Execution history queue full, writing inline")
+            self.stats["inline"] += 1
+            self._write([record])
+
+    def pending(self) -> int:
+        """Number of records waiting to be written."""
+        return self._queue.unfinished_tasks
+
+    def _run(self):
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch: List[Optional[Dict[str, Any]]] = [record]
+            while record is not None and len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    break
+                batch.append(record)
+
+            stop = batch[-1] is None
+            records = [entry for entry in batch if entry is not None]
+            try:
+                if records:
+                    self._write(records)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, records: List[Dict[str, Any]]):
+        db = self.session_factory()
+        try:
+            db.add_all(
+                ExecutionRecord(
+                    **{field: record.get(field) for field in RECORD_FIELDS},
+                    steps=[
+                        ExecutionStep(**{field: step.get(field) for field in STEP_FIELDS})
+                        for step in record.get("steps", [])
+                    ],
+                )
+                for record in records
+            )
+            db.commit()
+            self.stats["written"] += len(records)
+        except Exception as e:
+            db.rollback()
+            self.stats["failed"] += len(records)
+            logger.error(f"Error writing {len(records)} execution records: {str(e)}", exc_info=True)
+        finally:
+            db.close()
+
+    def flush(self):
+        """Block until everything submitted so far has been written."""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.join()
+
+    def shutdown(self, timeout: Optional[float] = 30.0):
+        """Write out pending records and stop the worker; later submits write inline."""
+        if self._stopped:
+            return
+        self._stopped = True
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            self._queue.put(None)
+            worker.join(timeout)
+        logger.info(f"Execution history writer stopped: {self.stats}")
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list (None when empty)."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _to_dict(row, fields) -> Dict[str, Any]:
+    return {"id": row.id, **{field: getattr(row, field) for field in fields}}
+
+
+def list_executions(
+    db: Session,
+    workflow_id: Optional[int] = None,
+    since: Optional[float] = None,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """Most recent execution records first, without their steps."""
+    query = select(ExecutionRecord)
+    if workflow_id is not None:
+        query = query.where(ExecutionRecord.workflow_id == workflow_id)
+    if since is not None:
+        query = query.where(ExecutionRecord.started_at >= since)
+    query = query.order_by(ExecutionRecord.started_at.desc()).limit(limit)
+    return [_to_dict(record, RECORD_FIELDS) for record in db.scalars(query)]
+
+
+def get_execution(db: Session, execution_id: int) -> Optional[Dict[str, Any]]:
+    """An execution record with its steps in order, or None."""
+    record = db.get(
+        ExecutionRecord, execution_id, options=[selectinload(ExecutionRecord.steps)]
+    )
+    if record is None:
+        return None
+    data = _to_dict(record, RECORD_FIELDS)
+    data["steps"] = [_to_dict(step, STEP_FIELDS) for step in record.steps]
+    return data
+
+
+def agent_stats(
+    db: Session,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    agent_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Per-agent step aggregates over a time window.
+
+    Args:
+        db: Database session
+        since: Window start in epoch seconds (default: 24 hours ago)
+        until: Window end in epoch seconds (default: now)
+        agent_id: Only this agent
+
+    Returns:
+        One dict per agent with step and error counts, error rate, p50/p95/max
+        duration in milliseconds and average LLM calls, tokens and payload sizes
+    """
+    until = until if until is not None else time.time()
+    since = since if since is not None else until - 24 * 3600
+    window = [ExecutionStep.started_at >= since, ExecutionStep.started_at < until]
+    if agent_id is not None:
+        window.append(ExecutionStep.agent_id == agent_id)
+
+    totals = db.execute(
+        select(
+            ExecutionStep.agent_id,
+            func.max(ExecutionStep.agent_name),
+            func.count(),
+            func.sum(case((ExecutionStep.status == "error", 1), else_=0)),
+            func.avg(ExecutionStep.llm_calls),
+            func.avg(ExecutionStep.tokens),
+            func.sum(ExecutionStep.cache_hits),
+            func.avg(ExecutionStep.input_size),
+            func.avg(ExecutionStep.output_size),
+        )
+        .where(*window)
+        .group_by(ExecutionStep.agent_id)
+    ).all()
+
+    # SQLite has no percentile aggregate; read each agent's durations in
+    # order through the (agent_id, started_at) index instead
+    durations: Dict[int, List[float]] = {}
+    for step_agent_id, duration_ms in db.execute(
+        select(ExecutionStep.agent_id, ExecutionStep.duration_ms)
+        .where(*window, ExecutionStep.duration_ms.is_not(None))
+        .order_by(ExecutionStep.agent_id, ExecutionStep.duration_ms)
+    ):
+        durations.setdefault(step_agent_id, []).append(duration_ms)
+
+    stats = []
+    for row in totals:
+        (step_agent_id, name, steps, errors, llm_calls, tokens, cache_hits, input_size, output_size) = row
+        agent_durations = durations.get(step_agent_id, [])
+        stats.append(
+            {
+                "agent_id": step_agent_id,
+                "agent_name": name,
+                "steps": steps,
+                "errors": errors or 0,
+                "error_rate": (errors or 0) / steps if steps else 0.0,
+                "p50_ms": percentile(agent_durations, 50),
+                "p95_ms": percentile(agent_durations, 95),
+                "max_ms": agent_durations[-1] if agent_durations else None,
+                "avg_llm_calls": llm_calls,
+                "avg_tokens": tokens,
+                "cache_hits": cache_hits or 0,
+                "avg_input_size": input_size,
+                "avg_output_size": output_size,
+            }
+        )
+    return sorted(stats, key=lambda entry: entry["p95_ms"] or 0.0, reverse=True)
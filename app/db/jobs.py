@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Any, Callable, Optional
+import logging
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.db.models import ExecutionJob
+from app.db.shared_state import worker_name
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+JOB_FIELDS = (
+    "id",
+    "workflow_id",
+    "status",
+    "created_at",
+    "started_at",
+    "finished_at",
+    "worker",
+    "result",
+    "error",
+)
+
+
+class JobStore:
+    """
+    Status and results of asynchronous workflow runs, kept in the database.
+
+    The worker that accepts an execute-async request runs the job, but its
+    status and result are readable from any worker, so clients can poll a
+    load-balanced deployment.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "JobStore":
+        """Singleton pattern to ensure a single job store."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = JobStore()
+            return cls._instance
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        """
+        Args:
+            session_factory: Creates the sessions jobs are read and written with
+        """
+        self.session_factory = session_factory
+
+    def _update(self, job_id: str, **fields):
+        with self.session_factory() as session, session.begin():
+            job = session.get(ExecutionJob, job_id)
+            if job is None:
+                logger.warning(f"Execution job {job_id} disappeared before it was updated")
+                return
+            for field, value in fields.items():
+                setattr(job, field, value)
+
+    def create(self, workflow_id: int) -> Dict[str, Any]:
+        """Record a queued job and return it."""
+        job = ExecutionJob(
+            id=uuid.uuid4().hex, workflow_id=workflow_id, status="queued", created_at=time.time()
+        )
+        with self.session_factory() as session, session.begin():
+            session.add(job)
+            created = {field: getattr(job, field) for field in JOB_FIELDS}
+        return created
+
+    def run(self, job_id: str, function: Callable[..., Any], *args) -> Optional[Any]:
+        """
+        Run ``function(*args)`` as the job, storing its result or error.
+
+        Errors are recorded on the job rather than raised, as there is no
+        caller left to handle them.
+        """
+        self._update(job_id, status="running", started_at=time.time(), worker=worker_name())
+        try:
+            result = function(*args)
+        except Exception as e:
+            logger.error(f"Execution job {job_id} failed: {str(e)}", exc_info=True)
+            self._update(job_id, status="error", finished_at=time.time(), error=str(e))
+            return None
+        # Stored as JSON; values without a JSON form are stored as strings
+        stored = json.loads(json.dumps(result, default=str))
+        self._update(job_id, status="success", finished_at=time.time(), result=stored)
+        return result
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job's status, timings and (once finished) result, or None."""
+        with self.session_factory() as session:
+            job = session.get(ExecutionJob, job_id)
+            if job is None:
+                return None
+            return {field: getattr(job, field) for field in JOB_FIELDS}
+
+    def fail_stale(self, timeout: float) -> int:
+        """
+        Mark jobs that will never finish as failed.
+
+        A queued or running job is stale once it has waited or run for more
+        than ``timeout`` seconds, or when the worker process running it (on
+        this host) has exited, e.g. restarted mid-run.
+
+        Returns:
+            Number of jobs marked as failed
+        """
+        now = time.time()
+        marked = 0
+        with self.session_factory() as session, session.begin():
+            active = session.scalars(
+                select(ExecutionJob).where(ExecutionJob.status.in_(["queued", "running"]))
+            ).all()
+            for job in active:
+                if (job.started_at or job.created_at) < now - timeout:
+                    job.error = f"Timed out after {timeout:.0f} seconds"
+                elif job.status == "running" and job.worker and _worker_exited(job.worker):
+                    job.error = f"Worker {job.worker} exited before the job finished"
+                else:
+                    continue
+                job.status = "error"
+                job.finished_at = now
+                marked += 1
+        if marked:
+            logger.warning(f"Marked {marked} stale execution jobs as failed")
+        return marked
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs created more than ``older_than`` seconds ago."""
+        with self.session_factory() as session, session.begin():
+            result = session.execute(
+                delete(ExecutionJob).where(
+                    ExecutionJob.status.in_(["success", "error"]),
+                    ExecutionJob.created_at < time.time() - older_than,
+                )
+            )
+        return result.rowcount
+
+
+def _worker_exited(worker: str) -> bool:
+    """Whether a worker (host:pid) on this host is gone; workers elsewhere can't be checked."""
+    host, _, pid = worker.rpartition(":")
+    if host != worker_name().rpartition(":")[0] or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def get_job_store() -> JobStore:
+    """FastAPI dependency returning the shared job store."""
+    return JobStore.get_instance()
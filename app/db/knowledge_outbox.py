@@ -0,0 +1,68 @@
+import time
+from typing import List, Dict, Any, Callable, Tuple
+import logging
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.db.models import PendingKnowledge
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeOutbox:
+    """
+    Agent-generated knowledge handed from worker processes to the RAG leader.
+
+    With MULTI_WORKER=true only the leader writes to the vector stores.
+    The other workers' ingestion queues put their batches here, and the
+    leader's queue takes them out in submission order and writes them.
+    Items are deleted once written, so a leader that dies mid-batch leaves
+    them for the next one.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        """
+        Args:
+            session_factory: Creates the sessions items are read and written with
+        """
+        self.session_factory = session_factory
+
+    def put(self, items: List[Dict[str, Any]]):
+        """Store {"collection", "document", "metadata"} items for the leader."""
+        now = time.time()
+        with self.session_factory() as session, session.begin():
+            session.add_all(
+                PendingKnowledge(
+                    collection=item["collection"],
+                    document=item["document"],
+                    document_metadata=item.get("metadata") or {},
+                    created_at=now,
+                )
+                for item in items
+            )
+
+    def take(self, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """The oldest ``limit`` items as (id, item); pass the ids to done() once written."""
+        with self.session_factory() as session:
+            rows = session.scalars(
+                select(PendingKnowledge).order_by(PendingKnowledge.id).limit(limit)
+            ).all()
+            return [
+                (
+                    row.id,
+                    {
+                        "collection": row.collection,
+                        "document": row.document,
+                        "metadata": row.document_metadata or {},
+                    },
+                )
+                for row in rows
+            ]
+
+    def done(self, ids: List[int]):
+        """Delete items that have been written."""
+        with self.session_factory() as session, session.begin():
+            session.execute(delete(PendingKnowledge).where(PendingKnowledge.id.in_(ids)))
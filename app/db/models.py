@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, JSON, ForeignKey, Boolean, Text, Index, Float
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -14,6 +14,8 @@ class Agent(Base):
     output_schema = Column(JSON)
     config_schema = Column(JSON)
     implementation_path = Column(String)  # Path to implementation class
+    # Marketplace listing fields (title, price, tags, seller, ...)
+    attributes = Column(JSON)
 
     # Relationships
     workflows = relationship("WorkflowAgent", back_populates="agent")
@@ -26,17 +28,28 @@ class Workflow(Base):
     name = Column(String, index=True)
     description = Column(Text)
     category = Column(String, index=True)
-    is_template = Column(Boolean, default=False)
+    is_template = Column(Boolean, default=False, index=True)
 
     # Relationships
-    agents = relationship("WorkflowAgent", back_populates="workflow")
+    agents = relationship(
+        "WorkflowAgent",
+        back_populates="workflow",
+        order_by="WorkflowAgent.order",
+        cascade="all, delete-orphan",
+    )
+
+    __table_args__ = (
+        # Template listings filtered by category; with is_template and category
+        # both fixed, index order is id order, so cursor pages need no sort
+        Index("ix_workflows_is_template_category", "is_template", "category"),
+    )
 
 
 class WorkflowAgent(Base):
     __tablename__ = "workflow_agents"
 
     id = Column(Integer, primary_key=True, index=True)
-    workflow_id = Column(Integer, ForeignKey("workflows.id"))
+    workflow_id = Column(Integer, ForeignKey("workflows.id", ondelete="CASCADE"))
     agent_id = Column(Integer, ForeignKey("agents.id"))
     order = Column(Integer)  # Position in workflow
     config = Column(JSON)  # Agent-specific configuration
@@ -44,3 +57,112 @@ class WorkflowAgent(Base):
     # Relationships
     workflow = relationship("Workflow", back_populates="agents")
     agent = relationship("Agent", back_populates="workflows")
+
+    __table_args__ = (
+        # Loading a workflow's steps in order
+        Index("ix_workflow_agents_workflow_id_order", "workflow_id", "order"),
+        # Finding the workflows that use an agent
+        Index("ix_workflow_agents_agent_id", "agent_id"),
+    )
+
+
+class ExecutionRecord(Base):
+    __tablename__ = "executions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer)  # Not a foreign key: history outlives workflows
+    workflow_name = Column(String)
+    status = Column(String)  # "success" or "error"
+    started_at = Column(Float)  # Epoch seconds
+    finished_at = Column(Float)
+    duration_ms = Column(Float)
+    input_size = Column(Integer)  # Bytes, as JSON
+    output_size = Column(Integer)
+    llm_calls = Column(Integer)
+    tokens = Column(Integer)
+    cache_hits = Column(Integer)
+    error_count = Column(Integer)
+
+    # Relationships
+    steps = relationship(
+        "ExecutionStep",
+        back_populates="execution",
+        order_by="ExecutionStep.step",
+        cascade="all, delete-orphan",
+    )
+
+    __table_args__ = (
+        # Recent runs, overall and per workflow
+        Index("ix_executions_started_at", "started_at"),
+        Index("ix_executions_workflow_id_started_at", "workflow_id", "started_at"),
+    )
+
+
+class ExecutionStep(Base):
+    __tablename__ = "execution_steps"
+
+    id = Column(Integer, primary_key=True, index=True)
+    execution_id = Column(Integer, ForeignKey("executions.id", ondelete="CASCADE"))
+    step = Column(Integer)  # Position in the run
+    agent_id = Column(Integer)
+    agent_name = Column(String)
+    status = Column(String)
+    started_at = Column(Float)
+    finished_at = Column(Float)
+    duration_ms = Column(Float)
+    input_size = Column(Integer)
+    output_size = Column(Integer)
+    llm_calls = Column(Integer)
+    tokens = Column(Integer)
+    cache_hits = Column(Integer)
+    error = Column(Text)
+
+    # Relationships
+    execution = relationship("ExecutionRecord", back_populates="steps")
+
+    __table_args__ = (
+        Index("ix_execution_steps_execution_id_step", "execution_id", "step"),
+        # Per-agent aggregates over a time window
+        Index("ix_execution_steps_agent_id_started_at", "agent_id", "started_at"),
+        Index("ix_execution_steps_started_at", "started_at"),
+    )
+
+
+# State shared by all worker processes (catalog version, rate-limit counters)
+class SharedValue(Base):
+    __tablename__ = "shared_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(Text)  # JSON
+    expires_at = Column(Float)  # Epoch seconds; None never expires
+
+    __table_args__ = (Index("ix_shared_state_expires_at", "expires_at"),)
+
+
+# Workflow runs started with execute-async, visible to every worker
+class ExecutionJob(Base):
+    __tablename__ = "execution_jobs"
+
+    id = Column(String, primary_key=True)
+    workflow_id = Column(Integer)
+    status = Column(String)  # "queued", "running", "success" or "error"
+    created_at = Column(Float)  # Epoch seconds
+    started_at = Column(Float)
+    finished_at = Column(Float)
+    worker = Column(String)  # Host and pid of the process running it
+    result = Column(JSON)
+    error = Column(Text)
+
+    __table_args__ = (Index("ix_execution_jobs_created_at", "created_at"),)
+
+
+# Agent-generated knowledge submitted by workers other than the RAG leader,
+# waiting for the leader to write it (see KnowledgeIngestionQueue)
+class PendingKnowledge(Base):
+    __tablename__ = "pending_knowledge"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    collection = Column(String)
+    document = Column(Text)
+    document_metadata = Column("metadata", JSON)
+    created_at = Column(Float)  # Epoch seconds
@@ -0,0 +1,867 @@
+import base64
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, Iterator
+import logging
+
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import inspect, select, func, text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.execution_metrics import record_cache_hit
+from app.db.database import Base, SessionLocal, engine as default_engine, get_async_db
+from app.db.models import Agent, Workflow, WorkflowAgent
+from app.db.shared_state import MULTI_WORKER, SharedState
+from app.models.workflow import WorkflowCreate, WorkflowUpdate
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Shared state key of the catalog version when several workers share the database
+CATALOG_VERSION_KEY = "catalog_version"
+
+# Agent columns; every other field of a catalog entry lives in Agent.attributes
+AGENT_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "category",
+    "input_schema",
+    "output_schema",
+    "config_schema",
+    "implementation_path",
+)
+
+
+def ensure_schema(bind=default_engine):
+    """
+    Create missing tables, columns and indexes.
+
+    create_all() only creates whole tables, so columns and indexes added to
+    the models since a database was created are added here (new columns
+    are nullable, which SQLite can add in place).
+    """
+    Base.metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    connection.execute(
+                        text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+                    )
+                    logger.info(f"Added column {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+        if bind.dialect.name == "sqlite":
+            ensure_fulltext_index(connection)
+
+
+# Full-text index over the catalog, kept in sync by triggers. Agents and
+# workflows share it: an agent's rowid is 2 * id and a workflow's 2 * id + 1,
+# so an entry is found (and replaced) by rowid and results of both kinds are
+# ranked together.
+FULLTEXT_TABLE = "catalog_fts"
+
+_FULLTEXT_SOURCES = {
+    # table: (rowid parity, column expressions for name, description, category, tags)
+    "agents": (0, "{row}.name, {row}.description, {row}.category, json_extract({row}.attributes, '$.tags')"),
+    "workflows": (1, "{row}.name, {row}.description, {row}.category, NULL"),
+}
+
+
+def ensure_fulltext_index(connection):
+    """Create the SQLite FTS5 catalog index and its triggers, filling it when new."""
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FULLTEXT_TABLE}
+    ).first()
+    connection.execute(
+        text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FULLTEXT_TABLE} USING fts5("
+            "name, description, category, tags, tokenize = 'porter unicode61')"
+        )
+    )
+    for table, (parity, columns) in _FULLTEXT_SOURCES.items():
+        insert = (
+            f"INSERT INTO {FULLTEXT_TABLE} (rowid, name, description, category, tags) "
+            f"VALUES (new.id * 2 + {parity}, {columns.format(row='new')});"
+        )
+        delete = f"DELETE FROM {FULLTEXT_TABLE} WHERE rowid = old.id * 2 + {parity};"
+        for event, body in (("INSERT", insert), ("DELETE", delete), ("UPDATE", delete + " " + insert)):
+            connection.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_fts_{event.lower()} "
+                    f"AFTER {event} ON {table} BEGIN {body} END"
+                )
+            )
+        if not exists:
+            connection.execute(
+                text(
+                    f"INSERT INTO {FULLTEXT_TABLE} (rowid, name, description, category, tags) "
+                    f"SELECT {table}.id * 2 + {parity}, {columns.format(row=table)} FROM {table}"
+                )
+            )
+
+
+def agent_to_dict(agent: Agent) -> Dict[str, Any]:
+    """Catalog entry for an agent: its listing attributes plus the agent columns."""
+    data = dict(agent.attributes or {})
+    data.update({column: getattr(agent, column) for column in AGENT_COLUMNS})
+    return data
+
+
+def workflow_to_dict(workflow: Workflow) -> Dict[str, Any]:
+    return {
+        "id": workflow.id,
+        "name": workflow.name,
+        "description": workflow.description,
+        "category": workflow.category,
+        "is_template": bool(workflow.is_template),
+        "agents": [
+            {
+                "id": step.id,
+                "workflow_id": step.workflow_id,
+                "agent_id": step.agent_id,
+                "order": step.order,
+                "config": step.config or {},
+            }
+            for step in workflow.agents
+        ],
+    }
+
+
+def encode_id_cursor(last_id: int) -> str:
+    """Opaque cursor for the page after the row with id ``last_id``."""
+    payload = json.dumps({"after": last_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Decode a listing cursor back into the last id seen (None for no cursor)."""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(payload["after"])
+    except Exception:
+        raise ValueError(f"Invalid pagination cursor: {cursor}")
+
+
+def next_cursor(items: List[Dict[str, Any]], limit: Optional[int]) -> Optional[str]:
+    """Cursor for the page after ``items``, or None when this was the last page."""
+    if not items or limit is None or len(items) < limit:
+        return None
+    return encode_id_cursor(items[-1]["id"])
+
+
+def project_fields(items: List[Dict[str, Any]], fields: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Keep only the requested fields of each listing entry.
+
+    Args:
+        items: Catalog entries
+        fields: Comma-separated field names; "id" is always kept. None keeps everything.
+    """
+    if not fields:
+        return items
+    wanted = {"id"} | {field.strip() for field in fields.split(",") if field.strip()}
+    return [{key: value for key, value in item.items() if key in wanted} for item in items]
+
+
+# Listings are keyset-paginated in id order: each filter below is served by
+# an index whose entries are ordered by (filter columns, id), so a page costs
+# the same however deep into the listing it is.
+
+
+def agents_query(
+    category: Optional[str] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    after: Optional[int] = None,
+):
+    query = select(Agent).order_by(Agent.id)
+    if category:
+        query = query.where(Agent.category == category)
+    if after is not None:
+        query = query.where(Agent.id > after)
+    return query.offset(skip).limit(limit)
+
+
+def workflows_query(
+    category: Optional[str] = None,
+    is_template: Optional[bool] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    after: Optional[int] = None,
+):
+    query = select(Workflow).options(selectinload(Workflow.agents)).order_by(Workflow.id)
+    if category:
+        query = query.where(Workflow.category == category)
+    if is_template is not None:
+        query = query.where(Workflow.is_template == is_template)
+    if after is not None:
+        query = query.where(Workflow.id > after)
+    return query.offset(skip).limit(limit)
+
+
+class CatalogRepository:
+    """
+    Agents and workflows, stored through SQLAlchemy and shared by all routers.
+
+    Reads go through an in-process cache keyed by query; every write bumps
+    ``version`` and clears the cache, so readers never see stale entries
+    from this process. Cached values are copied on the way out, so callers
+    may modify what they get back. Each listing page is its own entry, so
+    the cache keeps the most recently used max_cache_entries.
+
+    With a SharedState (MULTI_WORKER=true), the version is a counter in the
+    database: writes bump it, and every worker checks it at most once per
+    version_check_interval, dropping its cache when another worker wrote.
+
+    Indexes derived from the catalog subscribe with add_listener() and are
+    told which agent and workflow ids each write touched, so they can update
+    those entries instead of rescanning the catalog.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "CatalogRepository":
+        """Singleton pattern; the first call creates the schema and loads the sample catalog."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                repository = CatalogRepository(
+                    shared_state=SharedState.get_instance() if MULTI_WORKER else None
+                )
+                repository.ensure_schema()
+                repository.bootstrap()
+                cls._instance = repository
+            return cls._instance
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        bind=None,
+        max_cache_entries: int = 4096,
+        shared_state: Optional[SharedState] = None,
+        version_check_interval: float = 1.0,
+    ):
+        """
+        Args:
+            session_factory: Creates SQLAlchemy sessions
+            bind: Engine for schema management (defaults to the session factory's)
+            max_cache_entries: Cached reads kept, least recently used evicted first
+            shared_state: Store holding the catalog version shared by all workers
+            version_check_interval: Seconds between checks of the shared version
+        """
+        self.session_factory = session_factory
+        self.bind = bind or getattr(session_factory, "kw", {}).get("bind") or default_engine
+        self.max_cache_entries = max_cache_entries
+        self.shared_state = shared_state
+        self.version_check_interval = version_check_interval
+        self._version = 0
+        self._version_checked_at = 0.0
+        self._cache: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[List[int], List[int]], None]] = []
+
+    @property
+    def version(self) -> int:
+        """Catalog version; changes on every write, from any worker when shared."""
+        return self.refresh_version()
+
+    def version_check_due(self) -> bool:
+        """Whether the next version read queries the shared state."""
+        return (
+            self.shared_state is not None
+            and time.monotonic() - self._version_checked_at >= self.version_check_interval
+        )
+
+    def refresh_version(self) -> int:
+        """
+        Pick up writes of other workers, dropping cached reads they made stale.
+
+        Queries the shared state at most once per version_check_interval;
+        async callers run this in a worker thread (see AsyncCatalog).
+
+        Returns:
+            Current catalog version
+        """
+        if self.version_check_due():
+            self._version_checked_at = time.monotonic()
+            shared = self.shared_state.get(CATALOG_VERSION_KEY, 0)
+            with self._lock:
+                if shared != self._version:
+                    self._version = shared
+                    self._cache.clear()
+        return self._version
+
+    def ensure_schema(self):
+        ensure_schema(self.bind)
+
+    # --- cache ---
+
+    def cache_lookup(self, key, refresh: bool = True):
+        """
+        (hit, value, version) for a cache key; pass the version to cache_store().
+
+        The version is refreshed first, so a read made stale by another
+        worker's write is never returned. Pass refresh=False when
+        refresh_version() was just called off the event loop.
+        """
+        version = self.refresh_version() if refresh else self._version
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                record_cache_hit()
+                return True, copy.deepcopy(self._cache[key]), version
+            return False, None, version
+
+    def cache_store(self, key, value, version: int) -> Any:
+        """Cache a value read at ``version`` and return a copy of it."""
+        with self._lock:
+            # Don't cache a read that raced with a write
+            if self._version == version:
+                self._cache[key] = value
+                if len(self._cache) > self.max_cache_entries:
+                    self._cache.popitem(last=False)
+        return copy.deepcopy(value)
+
+    def _cached(self, key, load: Callable[[], Any]):
+        hit, value, version = self.cache_lookup(key)
+        if hit:
+            return value
+        return self.cache_store(key, load(), version)
+
+    def invalidate(self):
+        """Drop cached reads, e.g. after writing to the database directly."""
+        with self._lock:
+            if self.shared_state is not None:
+                self._version = self.shared_state.incr(CATALOG_VERSION_KEY)
+            else:
+                self._version += 1
+            self._cache.clear()
+
+    def add_listener(self, listener: Callable[[List[int], List[int]], None]):
+        """Call ``listener(agent_ids, workflow_ids)`` after every write, with the ids it touched."""
+        self._listeners.append(listener)
+
+    def _changed(self, agent_ids: List[int] = (), workflow_ids: List[int] = ()):
+        self.invalidate()
+        for listener in list(self._listeners):
+            try:
+                listener(list(agent_ids), list(workflow_ids))
+            except Exception as e:
+                # The write is stored; a lagging index must not fail it
+                logger.error(f"Error in catalog change listener: {str(e)}", exc_info=True)
+
+    # --- bootstrap ---
+
+    def is_empty(self) -> bool:
+        with self.session_factory() as session:
+            return not session.scalar(select(func.count()).select_from(Agent))
+
+    def bootstrap(
+        self,
+        agents: Optional[Dict[int, Dict[str, Any]]] = None,
+        workflows: Optional[Dict[int, Dict[str, Any]]] = None,
+    ) -> bool:
+        """
+        Load the catalog into an empty database, keeping agent and workflow ids.
+
+        Args:
+            agents: Agents keyed by id (defaults to app/data/sample_agents.json)
+            workflows: Workflows keyed by id (defaults to app/data/sample_workflows.json)
+
+        Returns:
+            True if the catalog was loaded, False if the database already had agents
+        """
+        if not self.is_empty():
+            return False
+        from app.core.sample_data import load_sample_agents, load_sample_workflows
+
+        agents = load_sample_agents() if agents is None else agents
+        workflows = load_sample_workflows() if workflows is None else workflows
+
+        try:
+            with self.session_factory() as session, session.begin():
+                for data in agents.values():
+                    session.add(
+                        Agent(
+                            **{column: data.get(column) for column in AGENT_COLUMNS},
+                            attributes={
+                                key: value
+                                for key, value in data.items()
+                                if key not in AGENT_COLUMNS
+                            },
+                        )
+                    )
+                session.flush()
+                for data in workflows.values():
+                    session.add(
+                        Workflow(
+                            id=data["id"],
+                            name=data["name"],
+                            description=data.get("description"),
+                            category=data.get("category"),
+                            is_template=data.get("is_template", False),
+                            agents=[
+                                WorkflowAgent(
+                                    agent_id=step["agent_id"],
+                                    order=step.get("order"),
+                                    config=step.get("config") or {},
+                                )
+                                for step in data.get("agents", [])
+                            ],
+                        )
+                    )
+        except IntegrityError:
+            # Another worker loaded the catalog between the check and the insert
+            logger.info("Catalog was loaded by another process")
+            return False
+        self._changed(
+            [data["id"] for data in agents.values()], [data["id"] for data in workflows.values()]
+        )
+        logger.info(f"Loaded {len(agents)} agents and {len(workflows)} workflows into the catalog")
+        return True
+
+    # --- agents ---
+
+    def list_agents(
+        self,
+        category: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Agents in id order; ``after`` continues from the last id of the previous page."""
+
+        def load():
+            with self.session_factory() as session:
+                query = agents_query(category, skip, limit, after)
+                return [agent_to_dict(agent) for agent in session.scalars(query)]
+
+        return self._cached(("agents", category, skip, limit, after), load)
+
+    def get_agent(self, agent_id: int) -> Optional[Dict[str, Any]]:
+        def load():
+            with self.session_factory() as session:
+                agent = session.get(Agent, agent_id)
+                return agent_to_dict(agent) if agent is not None else None
+
+        return self._cached(("agent", agent_id), load)
+
+    def get_agents(self, agent_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Agents by id in one query; unknown ids are left out."""
+        ids = tuple(sorted(set(agent_ids)))
+
+        def load():
+            with self.session_factory() as session:
+                agents = session.scalars(select(Agent).where(Agent.id.in_(ids)))
+                return {agent.id: agent_to_dict(agent) for agent in agents}
+
+        return self._cached(("agents_by_id", ids), load)
+
+    # --- workflows ---
+
+    def list_workflows(
+        self,
+        category: Optional[str] = None,
+        is_template: Optional[bool] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Workflows in id order; ``after`` continues from the last id of the previous page."""
+
+        def load():
+            with self.session_factory() as session:
+                query = workflows_query(category, is_template, skip, limit, after)
+                return [workflow_to_dict(workflow) for workflow in session.scalars(query)]
+
+        return self._cached(("workflows", category, is_template, skip, limit, after), load)
+
+    def get_workflow(self, workflow_id: int) -> Optional[Dict[str, Any]]:
+        def load():
+            with self.session_factory() as session:
+                workflow = session.get(
+                    Workflow, workflow_id, options=[selectinload(Workflow.agents)]
+                )
+                return workflow_to_dict(workflow) if workflow is not None else None
+
+        return self._cached(("workflow", workflow_id), load)
+
+    def get_workflows(self, workflow_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Workflows by id in one query; unknown ids are left out."""
+        ids = tuple(sorted(set(workflow_ids)))
+
+        def load():
+            with self.session_factory() as session:
+                workflows = session.scalars(
+                    select(Workflow)
+                    .options(selectinload(Workflow.agents))
+                    .where(Workflow.id.in_(ids))
+                )
+                return {workflow.id: workflow_to_dict(workflow) for workflow in workflows}
+
+        return self._cached(("workflows_by_id", ids), load)
+
+    def list_categories(self) -> Dict[str, List[str]]:
+        def load():
+            with self.session_factory() as session:
+                agent_categories = list(session.scalars(select(Agent.category).distinct()))
+                workflow_categories = list(session.scalars(select(Workflow.category).distinct()))
+            return {
+                "agent_categories": agent_categories,
+                "workflow_categories": workflow_categories,
+                "all_categories": list(set(agent_categories + workflow_categories)),
+            }
+
+        return self._cached(("categories",), load)
+
+    def _check_agents(self, session, agent_ids: List[int]):
+        known = set(session.scalars(select(Agent.id).where(Agent.id.in_(set(agent_ids)))))
+        for agent_id in agent_ids:
+            if agent_id not in known:
+                raise ValueError(f"Agent with id {agent_id} not found")
+
+    def create_workflow(self, workflow: WorkflowCreate) -> Dict[str, Any]:
+        """
+        Store a new workflow and its steps.
+
+        Raises:
+            ValueError: If a step references an unknown agent
+        """
+        with self.session_factory() as session:
+            with session.begin():
+                self._check_agents(session, [step.agent_id for step in workflow.agents])
+                record = Workflow(
+                    name=workflow.name,
+                    description=workflow.description,
+                    category=workflow.category,
+                    is_template=workflow.is_template,
+                    agents=[
+                        WorkflowAgent(agent_id=step.agent_id, order=step.order, config=step.config)
+                        for step in workflow.agents
+                    ],
+                )
+                session.add(record)
+            created = workflow_to_dict(record)
+        self._changed(workflow_ids=[created["id"]])
+        return created
+
+    def update_workflow(
+        self, workflow_id: int, workflow_update: WorkflowUpdate
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Update a workflow's fields and, if given, replace its steps.
+
+        Returns:
+            The updated workflow, or None if it doesn't exist
+
+        Raises:
+            ValueError: If a step references an unknown agent
+        """
+        with self.session_factory() as session:
+            with session.begin():
+                record = session.get(Workflow, workflow_id)
+                if record is None:
+                    return None
+                for field in ("name", "description", "category", "is_template"):
+                    value = getattr(workflow_update, field)
+                    if value is not None:
+                        setattr(record, field, value)
+                if workflow_update.agents is not None:
+                    self._check_agents(session, [step.agent_id for step in workflow_update.agents])
+                    record.agents = [
+                        WorkflowAgent(agent_id=step.agent_id, order=step.order, config=step.config)
+                        for step in workflow_update.agents
+                    ]
+            updated = workflow_to_dict(record)
+        self._changed(workflow_ids=[workflow_id])
+        return updated
+
+    def delete_workflow(self, workflow_id: int) -> bool:
+        """Delete a workflow and its steps; returns False if it doesn't exist."""
+        with self.session_factory() as session:
+            with session.begin():
+                record = session.get(Workflow, workflow_id)
+                if record is None:
+                    return False
+                session.delete(record)
+        self._changed(workflow_ids=[workflow_id])
+        return True
+
+    # --- bulk import / export ---
+
+    def iter_agents(self, batch_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """Every agent in id order, a page at a time, read past the cache."""
+        after = None
+        while True:
+            with self.session_factory() as session:
+                query = agents_query(limit=batch_size, after=after)
+                page = [agent_to_dict(agent) for agent in session.scalars(query)]
+            if page:
+                yield page
+            if len(page) < batch_size:
+                return
+            after = page[-1]["id"]
+
+    def iter_workflows(self, batch_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """Every workflow with its steps in id order, a page at a time, read past the cache."""
+        after = None
+        while True:
+            with self.session_factory() as session:
+                query = workflows_query(limit=batch_size, after=after)
+                page = [workflow_to_dict(workflow) for workflow in session.scalars(query)]
+            if page:
+                yield page
+            if len(page) < batch_size:
+                return
+            after = page[-1]["id"]
+
+    def _import_agent(self, session, data: Dict[str, Any], known: set, replace: bool) -> int:
+        columns = {column: data.get(column) for column in AGENT_COLUMNS if column != "id"}
+        attributes = {key: value for key, value in data.items() if key not in AGENT_COLUMNS}
+        agent_id = data.get("id")
+        if agent_id is not None and agent_id in known:
+            if not replace:
+                raise ValueError(f"Agent with id {agent_id} already exists")
+            record = session.get(Agent, agent_id)
+            for column, value in columns.items():
+                setattr(record, column, value)
+            record.attributes = attributes
+        else:
+            record = Agent(id=agent_id, **columns, attributes=attributes)
+            session.add(record)
+        session.flush()
+        return record.id
+
+    def _import_workflow(
+        self, session, data: Dict[str, Any], known_agents: set, known: set, replace: bool
+    ) -> int:
+        for step in data["agents"]:
+            if step["agent_id"] not in known_agents:
+                raise ValueError(f"Agent with id {step['agent_id']} not found")
+        steps = [
+            WorkflowAgent(agent_id=step["agent_id"], order=step["order"], config=step["config"])
+            for step in data["agents"]
+        ]
+        fields = {
+            field: data[field] for field in ("name", "description", "category", "is_template")
+        }
+        workflow_id = data.get("id")
+        if workflow_id is not None and workflow_id in known:
+            if not replace:
+                raise ValueError(f"Workflow with id {workflow_id} already exists")
+            record = session.get(Workflow, workflow_id)
+            for field, value in fields.items():
+                setattr(record, field, value)
+            record.agents = steps
+        else:
+            record = Workflow(id=workflow_id, **fields, agents=steps)
+            session.add(record)
+        session.flush()
+        return record.id
+
+    def import_batch(
+        self, entries: List[Dict[str, Any]], replace: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Store a batch of validated catalog records in one transaction.
+
+        Each record is written in its own savepoint, so a record that fails
+        (an existing id, a step referencing an unknown agent) is reported and
+        the rest of the batch is still stored. Records without an id get the
+        next one from the database.
+
+        Args:
+            entries: Dicts with "line", "kind" ("agent" or "workflow") and
+                "data" (the record's fields, optionally with its "id")
+            replace: Overwrite records whose id already exists instead of
+                reporting them
+
+        Returns:
+            {"line", "error"} for each record that was not stored
+        """
+        errors = []
+        stored_agents, stored_workflows = [], []
+        with self.session_factory() as session:
+            with session.begin():
+                agent_ids = {
+                    entry["data"]["id"]
+                    for entry in entries
+                    if entry["kind"] == "agent" and entry["data"].get("id") is not None
+                }
+                referenced = {
+                    step["agent_id"]
+                    for entry in entries
+                    if entry["kind"] == "workflow"
+                    for step in entry["data"]["agents"]
+                }
+                workflow_ids = {
+                    entry["data"]["id"]
+                    for entry in entries
+                    if entry["kind"] == "workflow" and entry["data"].get("id") is not None
+                }
+                # One lookup per batch for every id the records mention
+                known_agents = set(
+                    session.scalars(select(Agent.id).where(Agent.id.in_(agent_ids | referenced)))
+                )
+                known_workflows = set(
+                    session.scalars(select(Workflow.id).where(Workflow.id.in_(workflow_ids)))
+                )
+
+                for entry in entries:
+                    data = entry["data"]
+                    try:
+                        with session.begin_nested():
+                            if entry["kind"] == "agent":
+                                stored = self._import_agent(session, data, known_agents, replace)
+                            else:
+                                stored = self._import_workflow(
+                                    session, data, known_agents, known_workflows, replace
+                                )
+                        # Only ids whose savepoint committed count as known
+                        if entry["kind"] == "agent":
+                            known_agents.add(stored)
+                            stored_agents.append(stored)
+                        else:
+                            known_workflows.add(stored)
+                            stored_workflows.append(stored)
+                    except (ValueError, SQLAlchemyError) as e:
+                        errors.append({"line": entry["line"], "error": str(e).split("\n")[0]})
+
+                if self.bind.dialect.name == "postgresql":
+                    # Explicit ids don't advance the sequences new rows draw from
+                    for table in ("agents", "workflows"):
+                        session.execute(
+                            text(
+                                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+                            )
+                        )
+        self._changed(stored_agents, stored_workflows)
+        return errors
+
+
+def get_catalog() -> CatalogRepository:
+    """FastAPI dependency returning the shared catalog repository."""
+    return CatalogRepository.get_instance()
+
+
+class AsyncCatalog:
+    """
+    Catalog reads for ``async def`` handlers, without blocking the event loop.
+
+    Shares the CatalogRepository's cache (and its invalidation on writes).
+    Cache misses are read through a request-scoped AsyncSession, or, when
+    no async driver is installed, through the synchronous repository in a
+    worker thread.
+    """
+
+    def __init__(self, repository: CatalogRepository, session: Optional[AsyncSession] = None):
+        self.repository = repository
+        self.session = session
+
+    async def _cached(self, key, load, fallback: Callable, *args):
+        # The shared version is read synchronously, so not on the event loop
+        if self.repository.version_check_due():
+            await run_in_threadpool(self.repository.refresh_version)
+        hit, value, version = self.repository.cache_lookup(key, refresh=False)
+        if hit:
+            return value
+        if self.session is None:
+            return await run_in_threadpool(fallback, *args)
+        return self.repository.cache_store(key, await load(), version)
+
+    async def get_agent(self, agent_id: int) -> Optional[Dict[str, Any]]:
+        async def load():
+            agent = await self.session.get(Agent, agent_id)
+            return agent_to_dict(agent) if agent is not None else None
+
+        return await self._cached(("agent", agent_id), load, self.repository.get_agent, agent_id)
+
+    async def get_agents(self, agent_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Agents by id in one query; unknown ids are left out."""
+        ids = tuple(sorted(set(agent_ids)))
+
+        async def load():
+            agents = await self.session.scalars(select(Agent).where(Agent.id.in_(ids)))
+            return {agent.id: agent_to_dict(agent) for agent in agents}
+
+        return await self._cached(
+            ("agents_by_id", ids), load, self.repository.get_agents, list(ids)
+        )
+
+    async def list_agents(
+        self,
+        category: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        async def load():
+            agents = await self.session.scalars(agents_query(category, skip, limit, after))
+            return [agent_to_dict(agent) for agent in agents]
+
+        return await self._cached(
+            ("agents", category, skip, limit, after),
+            load,
+            self.repository.list_agents,
+            category,
+            skip,
+            limit,
+            after,
+        )
+
+    async def get_workflow(self, workflow_id: int) -> Optional[Dict[str, Any]]:
+        async def load():
+            workflow = await self.session.get(
+                Workflow, workflow_id, options=[selectinload(Workflow.agents)]
+            )
+            return workflow_to_dict(workflow) if workflow is not None else None
+
+        return await self._cached(
+            ("workflow", workflow_id), load, self.repository.get_workflow, workflow_id
+        )
+
+    async def list_workflows(
+        self,
+        category: Optional[str] = None,
+        is_template: Optional[bool] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        async def load():
+            workflows = await self.session.scalars(
+                workflows_query(category, is_template, skip, limit, after)
+            )
+            return [workflow_to_dict(workflow) for workflow in workflows]
+
+        return await self._cached(
+            ("workflows", category, is_template, skip, limit, after),
+            load,
+            self.repository.list_workflows,
+            category,
+            is_template,
+            skip,
+            limit,
+            after,
+        )
+
+
+async def get_async_catalog(session: Optional[AsyncSession] = Depends(get_async_db)) -> AsyncCatalog:
+    """FastAPI dependency returning request-scoped async catalog reads."""
+    repository = await run_in_threadpool(CatalogRepository.get_instance)
+    return AsyncCatalog(repository, session)
@@ -0,0 +1,229 @@
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Optional
+import logging
+
+from sqlalchemy import Integer, Text, case, cast, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.db.models import SharedValue
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Set MULTI_WORKER=true when running several processes (uvicorn --workers N)
+# against one database and RAG directory. Caches then follow writes made by
+# the other workers, and one elected worker (see LeaderLease) alone seeds
+# knowledge, runs retention and writes agent-generated knowledge, which the
+# others hand over through the database. Numpy collections are safe to share
+# between processes; Chroma collections are only written by the leader, and
+# the other workers read the state Chroma loaded when they opened it.
+MULTI_WORKER = os.getenv("MULTI_WORKER", "false").lower() in ("1", "true", "yes")
+
+
+def worker_name() -> str:
+    """This process among the workers: host and pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SharedState:
+    """
+    Small key/value store in the database, shared by every worker process.
+
+    Values are JSON; keys may expire. incr() is a single upsert, so
+    counters stay exact when several workers bump them at once. With SQLite
+    in WAL mode this is a local, Redis-like store without another service.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "SharedState":
+        """Singleton pattern to ensure a single shared state store."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = SharedState()
+            return cls._instance
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        """
+        Args:
+            session_factory: Creates the sessions values are read and written with
+        """
+        self.session_factory = session_factory
+
+    def _insert(self, session: Session):
+        dialect = session.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(SharedValue)
+        if dialect == "sqlite":
+            return sqlite.insert(SharedValue)
+        raise ValueError(f"Shared state needs SQLite or PostgreSQL, not {dialect}")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """The value of a key, or ``default`` if it is missing or expired."""
+        with self.session_factory() as session:
+            row = session.execute(
+                select(SharedValue.value, SharedValue.expires_at).where(SharedValue.key == key)
+            ).first()
+        if row is None or (row.expires_at is not None and row.expires_at <= time.time()):
+            return default
+        return json.loads(row.value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a JSON-serializable value, expiring after ``ttl`` seconds if given."""
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self.session_factory() as session, session.begin():
+            statement = self._insert(session).values(
+                key=key, value=json.dumps(value), expires_at=expires_at
+            )
+            session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[SharedValue.key],
+                    set_={"value": statement.excluded.value, "expires_at": expires_at},
+                )
+            )
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """
+        Atomically add to an integer counter and return the new value.
+
+        A missing or expired counter starts from zero; ``ttl`` is applied
+        when the counter (re)starts and kept while it lives.
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self.session_factory() as session, session.begin():
+            statement = self._insert(session).values(
+                key=key, value=str(amount), expires_at=expires_at
+            )
+            expired = (SharedValue.expires_at.is_not(None)) & (SharedValue.expires_at <= now)
+            value = session.scalar(
+                statement.on_conflict_do_update(
+                    index_elements=[SharedValue.key],
+                    set_={
+                        "value": case(
+                            (expired, str(amount)),
+                            else_=cast(cast(SharedValue.value, Integer) + amount, Text),
+                        ),
+                        "expires_at": case((expired, expires_at), else_=SharedValue.expires_at),
+                    },
+                ).returning(SharedValue.value)
+            )
+        return int(value)
+
+    def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        """
+        Take or renew a lease: set ``key`` to ``owner`` for ``ttl`` seconds
+        unless another owner holds it unexpired.
+
+        Returns:
+            True if ``owner`` holds the lease
+        """
+        now = time.time()
+        with self.session_factory() as session, session.begin():
+            statement = self._insert(session).values(
+                key=key, value=json.dumps(owner), expires_at=now + ttl
+            )
+            held = session.scalar(
+                statement.on_conflict_do_update(
+                    index_elements=[SharedValue.key],
+                    set_={"value": statement.excluded.value, "expires_at": now + ttl},
+                    where=(SharedValue.value == statement.excluded.value)
+                    | (SharedValue.expires_at <= now),
+                ).returning(SharedValue.value)
+            )
+        return held is not None
+
+    def release(self, key: str, owner: str):
+        """Give up a lease if ``owner`` holds it."""
+        with self.session_factory() as session, session.begin():
+            session.execute(
+                delete(SharedValue).where(
+                    SharedValue.key == key, SharedValue.value == json.dumps(owner)
+                )
+            )
+
+    def delete(self, key: str):
+        with self.session_factory() as session, session.begin():
+            session.execute(delete(SharedValue).where(SharedValue.key == key))
+
+    def purge_expired(self) -> int:
+        """Delete expired keys; returns how many were removed."""
+        with self.session_factory() as session, session.begin():
+            result = session.execute(
+                delete(SharedValue).where(
+                    SharedValue.expires_at.is_not(None), SharedValue.expires_at <= time.time()
+                )
+            )
+        if result.rowcount:
+            logger.info(f"Purged {result.rowcount} expired shared state keys")
+        return result.rowcount
+
+
+class LeaderLease:
+    """
+    Leadership among worker processes, for background work that must run once.
+
+    The leader holds a lease key in the shared state that expires after
+    ``ttl`` seconds. is_leader() renews it once half the ttl has passed, so
+    a worker that keeps asking stays leader, and another one takes over
+    within ``ttl`` after the leader stops or dies.
+    """
+
+    def __init__(self, name: str, ttl: float = 30.0, shared_state: Optional[SharedState] = None):
+        """
+        Args:
+            name: What the leader is elected for; workers compete per name
+            ttl: Seconds the lease lasts without renewal
+            shared_state: Store holding the lease (defaults to the shared one)
+        """
+        self.key = f"leader:{name}"
+        self.ttl = ttl
+        self.owner = worker_name()
+        self._shared_state = shared_state
+        self._renew_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def shared_state(self) -> SharedState:
+        if self._shared_state is None:
+            self._shared_state = SharedState.get_instance()
+        return self._shared_state
+
+    def is_leader(self) -> bool:
+        """Whether this process leads, taking or renewing the lease as needed."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._renew_at:
+                return True
+            try:
+                held = self.shared_state.acquire(self.key, self.owner, self.ttl)
+            except Exception as e:
+                logger.error(f"Error renewing lease {self.key}: {str(e)}")
+                held = False
+            if held != (self._renew_at > 0):
+                logger.info(f"{self.owner} {'took' if held else 'lost'} lease {self.key}")
+            self._renew_at = now + self.ttl / 2 if held else 0.0
+            return held
+
+    def release(self):
+        """Step down, so another worker can lead without waiting for the lease to expire."""
+        with self._lock:
+            if self._renew_at:
+                self._renew_at = 0.0
+                try:
+                    self.shared_state.release(self.key, self.owner)
+                except Exception as e:
+                    logger.error(f"Error releasing lease {self.key}: {str(e)}")
+
+
+def get_shared_state() -> SharedState:
+    """FastAPI dependency returning the shared state store."""
+    return SharedState.get_instance()
@@ -1,18 +1,107 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import logging
 
-from app.api import workflows, marketplace, execution
-from app.db.database import engine
-from app.db.models import Base
+from app.api import workflows, marketplace, execution, catalog
+from app.core.knowledge_registry import KnowledgeRegistry
+from app.rag.ingestion_queue import KnowledgeIngestionQueue
+from app.db.history import ExecutionHistoryWriter
+from app.db.jobs import JobStore
+from app.db.knowledge_outbox import KnowledgeOutbox
+from app.db.shared_state import SharedState
+from app.db.repository import ensure_schema
+from app.core.catalog_search import CatalogSearch
+from app.core.compatibility import CompatibilityGraph
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Create database tables (and columns/indexes added since the database was created)
+ensure_schema()
+
+# Set RAG_WARM_UP=false to skip loading knowledge indexes at startup
+RAG_WARM_UP = os.getenv("RAG_WARM_UP", "true").lower() not in ("0", "false", "no")
+
+# Directory of collection snapshots to load into empty collections at startup
+RAG_SNAPSHOT_DIR = os.getenv("RAG_SNAPSHOT_DIR")
+
+# Finished async jobs older than this are deleted
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", 7 * 24))
+
+# Async jobs queued or running longer than this are marked as failed
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", 3600))
+
+# Seconds between job and shared state maintenance passes
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", 600))
+
+
+def run_maintenance():
+    """Fail stale async jobs and drop old job results and expired shared state."""
+    jobs = JobStore.get_instance()
+    jobs.fail_stale(JOB_TIMEOUT_SECONDS)
+    jobs.purge(JOB_RETENTION_HOURS * 3600)
+    SharedState.get_instance().purge_expired()
+
+
+async def maintain():
+    while True:
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
+        try:
+            await run_in_threadpool(run_maintenance)
+        except Exception as e:
+            logger.error(f"Error in maintenance pass: {str(e)}", exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the hot knowledge collections before the app starts serving, so
+    # the first agent query doesn't pay the index and model load cost
+    registry = KnowledgeRegistry.get_instance()
+    # Fail jobs left behind by exited workers, drop old job results and expired
+    # counters from the state shared by workers, now and then periodically
+    await run_in_threadpool(run_maintenance)
+    maintenance = asyncio.create_task(maintain())
+    # With several workers (MULTI_WORKER=true), only the elected RAG leader
+    # writes to the knowledge collections; the others pass their writes on
+    ingestion_queue = KnowledgeIngestionQueue.get_instance()
+    ingestion_queue.start(registry.leader, KnowledgeOutbox() if registry.leader else None)
+    if await run_in_threadpool(registry.is_leader):
+        if RAG_SNAPSHOT_DIR:
+            # New nodes boot from snapshots instead of re-embedding everything
+            await run_in_threadpool(
+                registry.rag_service.import_snapshots, RAG_SNAPSHOT_DIR, None, True
+            )
+        # Reference knowledge is written once per version, not by agent constructors
+        await run_in_threadpool(registry.seed_knowledge)
+    # Embed catalog entries added or changed since the last run, for marketplace search
+    await run_in_threadpool(CatalogSearch.get_instance().sync)
+    # Score agent pairs once, so the workflow builder's lookups are reads
+    await run_in_threadpool(CompatibilityGraph.get_instance().sync)
+    if RAG_WARM_UP:
+        await run_in_threadpool(registry.warm_up)
+    # Apply retention policies periodically so collections stay bounded
+    registry.compactor.start()
+    yield
+    maintenance.cancel()
+    registry.compactor.stop()
+    # Write out knowledge still buffered from finished workflow steps
+    await run_in_threadpool(ingestion_queue.shutdown)
+    if registry.leader is not None:
+        # Let another worker take over without waiting for the lease to expire
+        await run_in_threadpool(registry.leader.release)
+    # Write out execution records not yet stored
+    await run_in_threadpool(ExecutionHistoryWriter.get_instance().shutdown)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="AI Agent Marketplace",
     description="API for creating and executing AI agent workflows",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS for frontend
@@ -22,12 +111,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Listing endpoints return the next page's cursor in a header
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
 app.include_router(workflows.router, prefix="/api", tags=["workflows"])
 app.include_router(marketplace.router, prefix="/api", tags=["marketplace"])
 app.include_router(execution.router, prefix="/api", tags=["execution"])
+app.include_router(catalog.router, prefix="/api", tags=["catalog"])
 
 
 @app.get("/")
@@ -44,6 +44,13 @@ class WorkflowUpdate(BaseModel):
     agents: Optional[List[WorkflowAgentUpdate]] = None
 
 
+class WorkflowPlanRequest(BaseModel):
+    start: str  # Input field the workflow starts from, e.g. "transcript"
+    goal: str  # Output field it should produce, e.g. "seo_score"
+    max_steps: int = 4
+    limit: int = 3
+
+
 class Workflow(WorkflowBase):
     id: int
     agents: List[WorkflowAgentInDB] = []
@@ -0,0 +1,204 @@
+"""
+Benchmark HNSW settings against exact search on our own embeddings.
+
+Usage:
+    python -m app.rag.benchmark --collection meeting_knowledge --k 5 \
+        --construction-ef 100 200 --search-ef 10 64 128 --m 16 32
+
+Each parameter combination is built into a throwaway in-memory Chroma
+collection; recall@k is measured against exact (brute-force) neighbours and
+latency over single-query calls.
+"""
+
+import argparse
+import itertools
+import time
+import uuid
+from typing import List, Dict, Any, Iterable, Optional
+import numpy as np
+import chromadb
+import logging
+
+from .vector_store import hnsw_metadata
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Rows per Chroma add call while building benchmark collections
+ADD_BATCH_SIZE = 5000
+
+
+def param_grid(
+    construction_ef: Iterable[int] = (100, 200),
+    search_ef: Iterable[int] = (10, 64, 128),
+    M: Iterable[int] = (16, 32),
+    space: str = "l2",
+) -> List[Dict[str, Any]]:
+    """All combinations of the given HNSW settings, as dicts for VectorStore(hnsw=...)."""
+    return [
+        {"space": space, "construction_ef": ef_c, "search_ef": ef_s, "M": m}
+        for ef_c, ef_s, m in itertools.product(construction_ef, search_ef, M)
+    ]
+
+
+def exact_neighbors(
+    corpus: np.ndarray, queries: np.ndarray, k: int, space: str = "l2"
+) -> np.ndarray:
+    """Indices of the true k nearest corpus rows for every query."""
+    if space == "cosine":
+        corpus = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    scores = queries @ corpus.T
+    if space == "l2":
+        # Smaller is better: ||c||^2 - 2 q.c (||q||^2 is constant per query)
+        distances = np.einsum("ij,ij->i", corpus, corpus)[None, :] - 2.0 * scores
+    else:
+        distances = -scores
+    return np.argsort(distances, axis=1, kind="stable")[:, :k]
+
+
+def benchmark_hnsw(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    params: List[Dict[str, Any]],
+    k: int = 5,
+    client=None,
+) -> List[Dict[str, Any]]:
+    """
+    Measure recall@k and query latency for each HNSW configuration.
+
+    Args:
+        corpus: Embeddings to index, shape (n, dim)
+        queries: Query embeddings, shape (q, dim)
+        params: HNSW settings to try (see param_grid)
+        k: Neighbours per query
+        client: Chroma client for the throwaway collections (in-memory by default)
+
+    Returns:
+        One row per configuration with build time, recall and latency percentiles
+    """
+    client = client or chromadb.EphemeralClient()
+    corpus = np.asarray(corpus, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    ids = [str(i) for i in range(len(corpus))]
+    truth_by_space: Dict[str, np.ndarray] = {}
+
+    rows = []
+    for hnsw in params:
+        space = hnsw.get("space", "l2")
+        if space not in truth_by_space:
+            truth_by_space[space] = exact_neighbors(corpus, queries, k, space)
+        truth = truth_by_space[space]
+
+        name = f"bench_{uuid.uuid4().hex[:12]}"
+        collection = client.create_collection(
+            name=name, metadata=hnsw_metadata(hnsw), embedding_function=None
+        )
+        try:
+            started = time.perf_counter()
+            for begin in range(0, len(corpus), ADD_BATCH_SIZE):
+                collection.add(
+                    ids=ids[begin : begin + ADD_BATCH_SIZE],
+                    embeddings=corpus[begin : begin + ADD_BATCH_SIZE].tolist(),
+                )
+            build_seconds = time.perf_counter() - started
+
+            latencies, hits = [], 0
+            for query, expected in zip(queries, truth):
+                started = time.perf_counter()
+                result = collection.query(
+                    query_embeddings=[query.tolist()], n_results=k, include=[]
+                )
+                latencies.append(time.perf_counter() - started)
+                hits += len({int(i) for i in result["ids"][0]} & set(expected.tolist()))
+        finally:
+            client.delete_collection(name)
+
+        latencies_ms = np.array(latencies) * 1000.0
+        rows.append(
+            {
+                **hnsw,
+                "build_seconds": build_seconds,
+                f"recall@{k}": hits / (len(queries) * k) if len(queries) else 0.0,
+                "p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies) else 0.0,
+                "p95_ms": float(np.percentile(latencies_ms, 95)) if len(latencies) else 0.0,
+            }
+        )
+        logger.info(f"HNSW benchmark {rows[-1]}")
+    return rows
+
+
+def load_embeddings(
+    collection_name: str,
+    persist_directory: str = "./chroma_db",
+    backend: str = "chroma",
+    limit: Optional[int] = None,
+) -> np.ndarray:
+    """Read stored embeddings from a collection without re-embedding anything."""
+    if backend == "numpy":
+        from .numpy_store import NumpyVectorStore
+
+        store = NumpyVectorStore(collection_name, persist_directory)
+        count = store.count() if limit is None else min(limit, store.count())
+        return np.array(store.vectors[:count]) if count else np.zeros((0, 0), np.float32)
+
+    client = chromadb.PersistentClient(path=persist_directory)
+    collection = client.get_collection(collection_name, embedding_function=None)
+    stored = collection.get(include=["embeddings"], limit=limit)
+    return np.asarray(stored["embeddings"] or [], dtype=np.float32)
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    if not rows:
+        return "(no results)"
+    columns = list(rows[0])
+    lines = ["  ".join(f"{column:>14}" for column in columns)]
+    for row in rows:
+        lines.append(
+            "  ".join(
+                f"{row[column]:>14.3f}" if isinstance(row[column], float) else f"{row[column]:>14}"
+                for column in columns
+            )
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Sweep HNSW settings on a stored collection")
+    parser.add_argument("--collection", required=True)
+    parser.add_argument("--persist-directory", default="./chroma_db")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--limit", type=int, default=None, help="Embeddings to load")
+    parser.add_argument("--queries", type=int, default=200, help="Held-out query vectors")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"], default="l2")
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 64, 128])
+    parser.add_argument("--m", type=int, nargs="+", default=[16, 32])
+    args = parser.parse_args(argv)
+
+    embeddings = load_embeddings(
+        args.collection, args.persist_directory, args.backend, args.limit
+    )
+    if len(embeddings) <= args.queries:
+        print(f"Collection {args.collection} has too few embeddings ({len(embeddings)})")
+        return
+
+    # Hold out a random sample as queries so they are not in the index themselves
+    order = np.random.default_rng(0).permutation(len(embeddings))
+    queries, corpus = embeddings[order[: args.queries]], embeddings[order[args.queries :]]
+    print(
+        f"Benchmarking {args.collection}: {len(corpus)} vectors, "
+        f"{len(queries)} queries, k={args.k}"
+    )
+    rows = benchmark_hnsw(
+        corpus,
+        queries,
+        param_grid(args.construction_ef, args.search_ef, args.m, args.space),
+        k=args.k,
+    )
+    print(format_table(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice, repeat
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Tuple
+import logging
+
+from .document_processor import DocumentProcessor
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Per-process processor, created once by the pool initializer
+_worker_processor: Optional[DocumentProcessor] = None
+
+
+def _init_worker(chunk_size: int, chunk_overlap: int):
+    global _worker_processor
+    _worker_processor = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def _chunk_batch(
+    batch: List[Tuple[int, str, Dict[str, Any]]]
+) -> List[Tuple[int, List[str], Dict[str, Any]]]:
+    """Chunk a batch of (doc_index, document, metadata) in a worker process."""
+    return [
+        (doc_index, _worker_processor.chunker.split_text(document), metadata)
+        for doc_index, document, metadata in batch
+    ]
+
+
+class BulkIngestor:
+    """
+    Bulk ingestion pipeline that chunks documents across a process pool.
+
+    Documents are read lazily and submitted in batches; at most
+    max_pending_tasks batches are in flight, so memory stays bounded however
+    large the input is. Chunks are written to the vector store in batches of
+    embed_batch_size so embedding happens in large calls. An optional
+    chunk_filter sees every batch before it is stored and returns the chunks
+    to keep, e.g. to drop near-duplicates.
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        max_workers: Optional[int] = None,
+        docs_per_task: int = 32,
+        embed_batch_size: int = 256,
+        max_pending_tasks: Optional[int] = None,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        chunk_filter: Optional[Callable[[List[Tuple[str, str, Dict[str, Any]]]], List]] = None,
+    ):
+        self.vector_store = vector_store
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.docs_per_task = docs_per_task
+        self.embed_batch_size = embed_batch_size
+        self.max_pending_tasks = max_pending_tasks or self.max_workers * 2
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chunk_filter = chunk_filter
+
+    def ingest(
+        self,
+        documents: Iterable[str],
+        metadatas: Optional[Iterable[Dict[str, Any]]] = None,
+        id_prefix: Optional[str] = None,
+        total_documents: Optional[int] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Chunk and store a (possibly very large, lazily produced) set of documents.
+
+        Args:
+            documents: Iterable of raw documents
+            metadatas: Optional iterable of metadata, parallel to documents
+            id_prefix: Prefix for chunk ids ("<prefix>_<doc>_<chunk>"); random by default
+            total_documents: Known document count, reported in progress updates
+            progress_callback: Called with a stats dict after every stored batch
+
+        Returns:
+            Final stats: documents processed, chunks written and filtered out,
+            elapsed seconds
+        """
+        id_prefix = id_prefix or f"bulk_{uuid.uuid4().hex[:8]}"
+        if total_documents is None and hasattr(documents, "__len__"):
+            total_documents = len(documents)
+
+        stats = {
+            "documents_processed": 0,
+            "documents_total": total_documents,
+            "chunks_written": 0,
+            "chunks_skipped": 0,
+            "elapsed_seconds": 0.0,
+        }
+        started = time.monotonic()
+        ingested_at = time.time()
+        pending_chunks: List[Tuple[str, str, Dict[str, Any]]] = []
+
+        def handle(results: List[Tuple[int, List[str], Dict[str, Any]]]):
+            for doc_index, chunks, metadata in results:
+                chunk_metadata = {"ingested_at": ingested_at, **(metadata or {})}
+                for chunk_index, chunk in enumerate(chunks):
+                    pending_chunks.append(
+                        (f"{id_prefix}_{doc_index}_{chunk_index}", chunk, chunk_metadata)
+                    )
+                stats["documents_processed"] += 1
+
+            while len(pending_chunks) >= self.embed_batch_size:
+                self._write(pending_chunks[: self.embed_batch_size], stats)
+                del pending_chunks[: self.embed_batch_size]
+                self._report(stats, started, progress_callback)
+
+        batches = self._batches(documents, metadatas)
+        if self.max_workers <= 1:
+            _init_worker(self.chunk_size, self.chunk_overlap)
+            for batch in batches:
+                handle(_chunk_batch(batch))
+        else:
+            self._run_pool(batches, handle)
+
+        if pending_chunks:
+            self._write(pending_chunks, stats)
+        self._report(stats, started, progress_callback)
+
+        logger.info(
+            f"Bulk ingestion finished: {stats['documents_processed']} documents, "
+            f"{stats['chunks_written']} chunks in {stats['elapsed_seconds']:.1f}s"
+        )
+        return stats
+
+    def _run_pool(self, batches: Iterator[List], handle: Callable):
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self.chunk_size, self.chunk_overlap),
+        ) as pool:
+            in_flight = set()
+            for batch in batches:
+                # Backpressure: don't read more input while the pool is saturated
+                if len(in_flight) >= self.max_pending_tasks:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        handle(future.result())
+                in_flight.add(pool.submit(_chunk_batch, batch))
+
+            for future in wait(in_flight).done:
+                handle(future.result())
+
+    def _batches(
+        self,
+        documents: Iterable[str],
+        metadatas: Optional[Iterable[Dict[str, Any]]],
+    ) -> Iterator[List[Tuple[int, str, Dict[str, Any]]]]:
+        items = zip(enumerate(documents), metadatas if metadatas is not None else repeat({}))
+        items = ((doc_index, document, meta) for (doc_index, document), meta in items)
+        while True:
+            batch = list(islice(items, self.docs_per_task))
+            if not batch:
+                return
+            yield batch
+
+    def _write(self, chunks: List[Tuple[str, str, Dict[str, Any]]], stats: Dict[str, Any]):
+        if self.chunk_filter is not None:
+            kept = self.chunk_filter(chunks)
+            stats["chunks_skipped"] += len(chunks) - len(kept)
+            chunks = kept
+            if not chunks:
+                return
+        self.vector_store.add_documents(
+            documents=[chunk for _, chunk, _ in chunks],
+            metadatas=[metadata for _, _, metadata in chunks],
+            ids=[chunk_id for chunk_id, _, _ in chunks],
+        )
+        stats["chunks_written"] += len(chunks)
+
+    @staticmethod
+    def _report(
+        stats: Dict[str, Any],
+        started: float,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]],
+    ):
+        stats["elapsed_seconds"] = time.monotonic() - started
+        logger.info(
+            f"Bulk ingestion progress: {stats['documents_processed']}"
+            f"/{stats['documents_total'] or '?'} documents, "
+            f"{stats['chunks_written']} chunks written"
+        )
+        if progress_callback:
+            progress_callback(dict(stats))
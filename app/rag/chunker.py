@@ -0,0 +1,209 @@
+import re
+import threading
+from typing import List, Iterable, Iterator, Optional, Tuple
+import tiktoken
+import logging
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODING = "cl100k_base"  # GPT-4 encoding
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+# Fallback "tokens" when no tiktoken encoding is available: runs of up to four
+# characters (matching the 1 token ≈ 4 chars estimate) that never straddle
+# whitespace, so pieces still concatenate back to the original text
+_FALLBACK_PIECE = re.compile(r"\s+|\S{1,4}\s*")
+
+# Boundary strengths between two adjacent tokens, strongest first; INSIDE_CHAR
+# marks a position inside a multibyte UTF-8 character, which is never cut
+PARAGRAPH, SENTENCE, WORD, NONE, INSIDE_CHAR = 3, 2, 1, 0, -1
+
+_SENTENCE_END = (b".", b"!", b"?", b'."', b".'", b".)")
+
+
+def get_encoding(name: str = DEFAULT_ENCODING):
+    """
+    Return a cached tiktoken encoding, or None if it cannot be loaded.
+
+    Loading is attempted once per process; failures are cached too so callers
+    don't retry a network fetch for every document.
+    """
+    with _encodings_lock:
+        if name not in _encodings:
+            try:
+                _encodings[name] = tiktoken.get_encoding(name)
+            except Exception as e:
+                logger.warning(
+                    f"Could not load tiktoken encoding {name}: {str(e)}. "
+                    "Falling back to approximate token counts."
+                )
+                _encodings[name] = None
+        return _encodings[name]
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    """Count tokens with tiktoken, approximating 1 token ≈ 4 chars without it."""
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _boundary_strength(previous: bytes, current: bytes) -> int:
+    """How good a split point the position between two tokens is."""
+    if b"\n\n" in previous or (previous.endswith(b"\n") and current.startswith(b"\n")):
+        return PARAGRAPH
+    if previous.endswith(b"\n"):
+        return SENTENCE
+    if previous.rstrip().endswith(_SENTENCE_END) and (
+        current[:1].isspace() or previous[-1:].isspace()
+    ):
+        return SENTENCE
+    if current[:1].isspace() or previous[-1:].isspace():
+        return WORD
+    return NONE
+
+
+class TokenChunker:
+    """
+    Split text into token-bounded chunks using a single encoding pass.
+
+    Each document is encoded once; chunk ends are chosen on token offsets,
+    preferring paragraph, then sentence, then word boundaries, and consecutive
+    chunks overlap by up to chunk_overlap tokens starting on a word boundary.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        encoding_name: str = DEFAULT_ENCODING,
+    ):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(
+                f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.encoding_name = encoding_name
+        # Don't cut a chunk shorter than this just to land on a nicer boundary
+        self.min_chunk_size = max(1, chunk_size // 2)
+
+    def _pieces(self, text: str) -> List[bytes]:
+        """Encode text once and return the raw bytes of every token."""
+        encoding = get_encoding(self.encoding_name)
+        if encoding is None:
+            return [piece.encode("utf-8") for piece in _FALLBACK_PIECE.findall(text)]
+        tokens = encoding.encode(text, disallowed_special=())
+        return encoding.decode_tokens_bytes(tokens)
+
+    def _plan(self, pieces: List[bytes], final: bool = True) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Choose chunk spans over token pieces.
+
+        Returns:
+            The (start, end) token spans, and the token index from which a
+            streaming caller must carry text over (len(pieces) when final)
+        """
+        n = len(pieces)
+        strengths = [PARAGRAPH] * (n + 1)
+        for i in range(1, n):
+            if 0x80 <= pieces[i][0] < 0xC0:
+                # Token starts with a UTF-8 continuation byte (CJK, emoji, ...)
+                strengths[i] = INSIDE_CHAR
+            else:
+                strengths[i] = _boundary_strength(pieces[i - 1], pieces[i])
+
+        spans = []
+        start = 0
+        while start < n:
+            if not final and start + self.chunk_size >= n:
+                # More text may still arrive and change where this chunk ends
+                return spans, start
+
+            hard_end = min(start + self.chunk_size, n)
+            end = hard_end
+            if hard_end < n:
+                best_strength = NONE
+                for position in range(hard_end, start + self.min_chunk_size - 1, -1):
+                    if strengths[position] > best_strength:
+                        best_strength, end = strengths[position], position
+                        if best_strength == PARAGRAPH:
+                            break
+                # No word boundary (unspaced text): hard cut, but between characters
+                while end > start + 1 and strengths[end] == INSIDE_CHAR:
+                    end -= 1
+
+            spans.append((start, end))
+            if end >= n:
+                break
+
+            overlap_start = max(end - self.chunk_overlap, start + 1)
+            next_start = overlap_start
+            while next_start < end and strengths[next_start] < WORD:
+                next_start += 1
+            if next_start >= end:
+                # No word boundary in the overlap: keep the token-offset
+                # overlap, moved forward to the next character boundary
+                next_start = overlap_start
+                while next_start < end and strengths[next_start] == INSIDE_CHAR:
+                    next_start += 1
+            start = next_start
+
+        return spans, n
+
+    @staticmethod
+    def _text(pieces: List[bytes], start: int, end: int) -> str:
+        # Spans start and end between characters, so this decodes losslessly
+        return b"".join(pieces[start:end]).decode("utf-8")
+
+    def split_text(self, text: str) -> List[str]:
+        """Split a document into chunks."""
+        return list(self.iter_chunks(text))
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        """Yield the chunks of a document."""
+        if not text:
+            return
+        pieces = self._pieces(text)
+        spans, _ = self._plan(pieces)
+        for start, end in spans:
+            chunk = self._text(pieces, start, end).strip()
+            if chunk:
+                yield chunk
+
+    def chunk_stream(
+        self, parts: Iterable[str], buffer_chars: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Chunk a very large input that arrives in parts (e.g. lines of a file).
+
+        Only a bounded window of text is held and encoded at a time: finished
+        chunks are yielded as soon as more input can no longer change them, and
+        the unfinished tail is carried into the next window.
+
+        Args:
+            parts: Iterable of text fragments, concatenated in order
+            buffer_chars: Characters to buffer before chunking a window
+        """
+        buffer_chars = buffer_chars or self.chunk_size * 4 * 8
+        buffer = ""
+
+        for part in parts:
+            buffer += part
+            if len(buffer) < buffer_chars:
+                continue
+
+            pieces = self._pieces(buffer)
+            spans, carry = self._plan(pieces, final=False)
+            for start, end in spans:
+                chunk = self._text(pieces, start, end).strip()
+                if chunk:
+                    yield chunk
+            buffer = self._text(pieces, carry, len(pieces))
+
+        if buffer:
+            yield from self.iter_chunks(buffer)
@@ -0,0 +1,155 @@
+import re
+import threading
+import zlib
+from collections import defaultdict
+from typing import List, Dict, Optional, Set, Tuple
+import numpy as np
+
+# Mersenne prime for the (a * x + b) mod p hash family; with 32-bit shingle
+# hashes and 31-bit coefficients the products fit in uint64
+_PRIME = np.uint64((1 << 31) - 1)
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_text(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form used to spot duplicates."""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """Overlapping word n-grams of the normalized text (the whole text if it is shorter)."""
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def lsh_bands(num_perm: int, threshold: float, recall: float = 0.95) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) for LSH over signatures of length ``num_perm``.
+
+    Two signatures with similarity s share a bucket in some band with
+    probability 1 - (1 - s^r)^b. Candidates are verified afterwards, so
+    missed pairs cost more than extra candidates: take the most selective
+    banding that still finds pairs at ``threshold`` with probability ``recall``.
+    """
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold**rows) ** bands >= recall:
+            return bands, rows
+    return num_perm, 1
+
+
+class MinHasher:
+    """MinHash signatures of word shingles; matching slots estimate Jaccard similarity."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Signature of a text, or None if it has no words."""
+        grams = shingles(text, self.shingle_size)
+        if not grams:
+            return None
+        hashed = np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams)
+        )
+        values = (np.outer(hashed, self.a) + self.b) % _PRIME
+        return values.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the texts behind two signatures."""
+        return float(np.mean(first == second))
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index for finding near-duplicate texts.
+
+    Signatures are split into bands and each band is hashed into a bucket;
+    texts sharing any bucket are candidates, confirmed by their estimated
+    Jaccard similarity. Lookups touch only the candidates, not the whole
+    collection.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128, shingle_size: int = 3):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity at or above which texts are duplicates
+            num_perm: Signature length; longer is more accurate and slower
+            shingle_size: Words per shingle
+        """
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self.buckets: List[Dict[bytes, Set[str]]] = [defaultdict(set) for _ in range(self.bands)]
+        self.signatures: Dict[str, np.ndarray] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.signatures
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        return self.hasher.signature(text)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self.rows : (band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def add(self, key: str, text: str, signature: Optional[np.ndarray] = None):
+        """Index a text under ``key`` (texts without words are not indexed)."""
+        signature = signature if signature is not None else self.signature(text)
+        if signature is None:
+            return
+        with self._lock:
+            self.remove([key])
+            self.signatures[key] = signature
+            for buckets, band_key in zip(self.buckets, self._band_keys(signature)):
+                buckets[band_key].add(key)
+
+    def remove(self, keys: List[str]):
+        with self._lock:
+            for key in keys:
+                signature = self.signatures.pop(key, None)
+                if signature is None:
+                    continue
+                for buckets, band_key in zip(self.buckets, self._band_keys(signature)):
+                    bucket = buckets.get(band_key)
+                    if bucket is not None:
+                        bucket.discard(key)
+                        if not bucket:
+                            del buckets[band_key]
+
+    def find(
+        self, text: str, signature: Optional[np.ndarray] = None
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Most similar indexed text at or above the threshold.
+
+        Returns:
+            (key, estimated similarity), or None if there is no near-duplicate
+        """
+        signature = signature if signature is not None else self.signature(text)
+        if signature is None:
+            return None
+        with self._lock:
+            candidates = set()
+            for buckets, band_key in zip(self.buckets, self._band_keys(signature)):
+                candidates.update(buckets.get(band_key, ()))
+            best = None
+            for key in candidates:
+                similarity = MinHasher.similarity(signature, self.signatures[key])
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity)
+        return best
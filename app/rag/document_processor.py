@@ -1,8 +1,8 @@
-from typing import List, Dict, Any, Optional
-import tiktoken
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
 import logging
 
+from .chunker import TokenChunker, count_tokens
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -12,27 +12,18 @@ class DocumentProcessor:
         logger.info(
             f"Initializing DocumentProcessor with chunk_size={chunk_size}, chunk_overlap={chunk_overlap}"
         )
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=self._num_tokens,
-        )
+        self.chunker = TokenChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
 
     @staticmethod
     def _num_tokens(text: str) -> int:
         """Count tokens using tiktoken for compatibility with OpenAI models."""
-        try:
-            encoding = tiktoken.get_encoding("cl100k_base")  # GPT-4 encoding
-            return len(encoding.encode(text))
-        except Exception as e:
-            logger.warning(
-                f"Error counting tokens: {str(e)}. Falling back to character count."
-            )
-            # Fallback to approximate token count (1 token ≈ 4 chars)
-            return len(text) // 4
+        return count_tokens(text)
 
     def process_documents(
-        self, documents: List[str], metadatas: Optional[List[Dict[str, Any]]] = None
+        self,
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
     ) -> Dict[str, List]:
         """
         Process and split documents for RAG.
@@ -40,34 +31,58 @@ class DocumentProcessor:
         Args:
             documents: List of raw documents
             metadatas: Optional metadata for each document
+            ids: Optional id for each document; a document split into several
+                chunks gets ids "<id>_0", "<id>_1", ...
 
         Returns:
-            Dictionary with chunks and corresponding metadatas
+            Dictionary with chunks and corresponding metadatas (and ids, if given)
         """
         if not documents:
             logger.warning("No documents provided for processing")
-            return {"chunks": [], "metadatas": []}
+            return {"chunks": [], "metadatas": [], "ids": []}
 
         if not metadatas:
             metadatas = [{} for _ in documents]
 
         chunks = []
         chunk_metadatas = []
+        chunk_ids = []
 
         logger.info(f"Processing {len(documents)} documents")
 
         try:
-            for doc, meta in zip(documents, metadatas):
-                doc_chunks = self.text_splitter.split_text(doc)
+            for i, (doc, meta) in enumerate(zip(documents, metadatas)):
+                doc_chunks = self.chunker.split_text(doc)
                 logger.info(f"Split document into {len(doc_chunks)} chunks")
 
                 chunks.extend(doc_chunks)
                 chunk_metadatas.extend([meta for _ in doc_chunks])
+                if ids:
+                    if len(doc_chunks) == 1:
+                        chunk_ids.append(ids[i])
+                    else:
+                        chunk_ids.extend(f"{ids[i]}_{n}" for n in range(len(doc_chunks)))
 
-            return {"chunks": chunks, "metadatas": chunk_metadatas}
+            return {"chunks": chunks, "metadatas": chunk_metadatas, "ids": chunk_ids}
         except Exception as e:
             logger.error(f"Error processing documents: {str(e)}", exc_info=True)
             # Return what we have so far or empty lists
             if not chunks:
-                return {"chunks": documents, "metadatas": metadatas}
-            return {"chunks": chunks, "metadatas": chunk_metadatas}
+                return {"chunks": documents, "metadatas": metadatas, "ids": list(ids or [])}
+            return {"chunks": chunks, "metadatas": chunk_metadatas, "ids": chunk_ids}
+
+    def iter_document_chunks(
+        self, parts: Iterable[str], metadata: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream chunks of a single very large document that arrives in parts.
+
+        Args:
+            parts: Text fragments of the document (e.g. lines of an open file)
+            metadata: Metadata attached to every chunk
+
+        Yields:
+            (chunk, metadata) pairs
+        """
+        for chunk in self.chunker.chunk_stream(parts):
+            yield chunk, dict(metadata or {})
@@ -0,0 +1,38 @@
+import threading
+from typing import List
+import numpy as np
+from chromadb.utils import embedding_functions
+import logging
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+_default_embedding_function = None
+_default_lock = threading.Lock()
+
+
+def get_default_embedding_function():
+    """
+    Return the process-wide embedding function shared by every vector backend.
+
+    This is Chroma's default (all-MiniLM-L6-v2), so collections stored in
+    Chroma and in the in-process backends embed text identically.
+    """
+    global _default_embedding_function
+    with _default_lock:
+        if _default_embedding_function is None:
+            _default_embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        return _default_embedding_function
+
+
+def embed_texts(texts: List[str], embedding_function=None) -> np.ndarray:
+    """Embed texts into a contiguous float32 matrix of shape (len(texts), dim)."""
+    embedding_function = embedding_function or get_default_embedding_function()
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.ascontiguousarray(embedding_function(list(texts)), dtype=np.float32)
+
+
+def embed_query(query: str, embedding_function=None) -> np.ndarray:
+    """Embed a single query into a float32 vector."""
+    return embed_texts([query], embedding_function)[0]
@@ -0,0 +1,41 @@
+"""
+Advisory locks on files that several worker processes write.
+
+With MULTI_WORKER=true every app process opens the same numpy stores and
+seed manifest. Writers hold an exclusive lock for the whole write, and a
+process reloading a store another one changed holds a shared lock, so
+nobody reads a half-written store. Locks are flock()-based and released
+when the process exits; on platforms without fcntl they do nothing.
+"""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks are no-ops, run a single worker
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False):
+    """
+    Hold a lock on ``path`` (created if missing) for the duration of the block.
+
+    Locks aren't reentrant across file handles: a process holding the lock
+    must not take it again.
+
+    Args:
+        path: Lock file
+        shared: Take a shared (reader) lock instead of an exclusive one
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,110 @@
+import base64
+import json
+from typing import Dict, Any, Optional
+
+# Chroma-compatible metadata filters evaluated in-process, used by the indexes
+# that live next to the vector store so they filter the same way Chroma does.
+
+_COMPARATORS = {
+    "$eq": lambda value, target: value == target,
+    "$ne": lambda value, target: value != target,
+    "$gt": lambda value, target: value is not None and value > target,
+    "$gte": lambda value, target: value is not None and value >= target,
+    "$lt": lambda value, target: value is not None and value < target,
+    "$lte": lambda value, target: value is not None and value <= target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value not in target,
+}
+
+
+def matches_where(metadata: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check whether metadata satisfies a Chroma-style ``where`` filter.
+
+    Supports field equality, the comparison operators in _COMPARATORS and
+    the logical ``$and`` / ``$or`` operators.
+    """
+    if not where:
+        return True
+    metadata = metadata or {}
+
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, target in condition.items():
+                comparator = _COMPARATORS.get(operator)
+                if comparator is None:
+                    raise ValueError(f"Unsupported where operator: {operator}")
+                try:
+                    if not comparator(value, target):
+                        return False
+                except TypeError:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+
+    return True
+
+
+def matches_where_document(
+    document: Optional[str], where_document: Optional[Dict[str, Any]]
+) -> bool:
+    """Check whether a document satisfies a Chroma-style ``where_document`` filter."""
+    if not where_document:
+        return True
+    document = document or ""
+
+    for key, condition in where_document.items():
+        if key == "$contains":
+            if condition not in document:
+                return False
+        elif key == "$not_contains":
+            if condition in document:
+                return False
+        elif key == "$and":
+            if not all(matches_where_document(document, c) for c in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where_document(document, c) for c in condition):
+                return False
+        else:
+            raise ValueError(f"Unsupported where_document operator: {key}")
+
+    return True
+
+
+def encode_cursor(offset: int, **state) -> str:
+    """Encode a result offset, and any state pages must share, as an opaque cursor."""
+    payload = json.dumps({"offset": offset, **state}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def _cursor_payload(cursor: str) -> Dict[str, Any]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        int(payload["offset"])
+        return payload
+    except Exception:
+        raise ValueError(f"Invalid pagination cursor: {cursor}")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Decode a pagination cursor back into a result offset (0 for no cursor)."""
+    if not cursor:
+        return 0
+    return max(0, int(_cursor_payload(cursor)["offset"]))
+
+
+def cursor_state(cursor: Optional[str]) -> Dict[str, Any]:
+    """The state encode_cursor() stored next to the offset ({} for no cursor)."""
+    if not cursor:
+        return {}
+    payload = _cursor_payload(cursor)
+    payload.pop("offset")
+    return payload
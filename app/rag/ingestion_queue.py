@@ -0,0 +1,278 @@
+import atexit
+import hashlib
+import queue
+import threading
+from collections import OrderedDict, defaultdict
+from typing import List, Dict, Any, Optional
+import logging
+
+from .rag_service import RAGService
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeIngestionQueue:
+    """
+    Write-behind queue for agent-generated knowledge.
+
+    Callers submit documents and return immediately; a worker thread
+    batches them per collection and writes them through RAGService, so
+    chunking and embedding stay off the request path. The buffer is
+    bounded: when it is full, submit() waits briefly and then writes in the
+    caller's thread rather than dropping knowledge. Recently submitted
+    documents are deduplicated (a document whose write failed may be
+    submitted again), and pending items are flushed on shutdown.
+
+    With several worker processes (see start()), only the elected leader
+    writes to the vector stores: the other workers hand their batches to a
+    shared outbox, which the leader's worker thread drains.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "KnowledgeIngestionQueue":
+        """Singleton pattern to ensure a single ingestion queue."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = KnowledgeIngestionQueue()
+                atexit.register(cls._instance.shutdown)
+            return cls._instance
+
+    def __init__(
+        self,
+        rag_service: Optional[RAGService] = None,
+        max_pending: int = 1000,
+        batch_size: int = 64,
+        flush_interval: float = 1.0,
+        put_timeout: float = 0.5,
+        dedup_window: int = 10000,
+    ):
+        """
+        Args:
+            rag_service: Service to write through (defaults to the singleton)
+            max_pending: Maximum documents buffered before submit() applies backpressure
+            batch_size: Maximum documents written per batch
+            flush_interval: Seconds to wait for a batch to fill before writing it
+            put_timeout: Seconds submit() waits for space in a full buffer
+            dedup_window: Number of recent documents remembered for deduplication
+        """
+        self.rag_service = rag_service or RAGService.get_instance()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.dedup_window = dedup_window
+
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_pending)
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stopped = False
+        # Set by start() when several worker processes share the stores
+        self.leader = None
+        self.outbox = None
+        self.stats = {
+            "submitted": 0,
+            "duplicates": 0,
+            "written": 0,
+            "failed": 0,
+            "inline": 0,
+            "handed_over": 0,
+        }
+
+    @staticmethod
+    def _key(collection_name: str, document: str) -> str:
+        normalized = " ".join(document.split()).lower()
+        return hashlib.sha1(f"{collection_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _is_duplicate(self, key: str) -> bool:
+        with self._lock:
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                return True
+            self._recent[key] = None
+            if len(self._recent) > self.dedup_window:
+                self._recent.popitem(last=False)
+            return False
+
+    def _forget(self, items: List[Dict[str, Any]]):
+        """Drop items from the dedup window, so they can be submitted again."""
+        with self._lock:
+            for item in items:
+                self._recent.pop(self._key(item["collection"], item["document"]), None)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="knowledge-ingestion", daemon=True
+                )
+                self._worker.start()
+
+    def start(self, leader=None, outbox=None):
+        """
+        Start the worker thread ahead of the first submit.
+
+        Args:
+            leader: LeaderLease of the process allowed to write to the stores;
+                None when this is the only process
+            outbox: Shared store (app/db/knowledge_outbox.py) through which
+                the other processes pass their documents to the leader
+        """
+        self.leader = leader
+        self.outbox = outbox
+        self._ensure_worker()
+
+    def _leads(self) -> bool:
+        return self.leader is None or self.leader.is_leader()
+
+    def submit(
+        self,
+        collection_name: str,
+        document: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Queue a document for writing.
+
+        Args:
+            collection_name: Target collection
+            document: Text document to add
+            metadata: Optional metadata for the document
+
+        Returns:
+            False if the document was a recent duplicate and skipped, True otherwise
+        """
+        if not document or not document.strip():
+            return False
+        if self._is_duplicate(self._key(collection_name, document)):
+            self.stats["duplicates"] += 1
+            return False
+
+        item = {"collection": collection_name, "document": document, "metadata": metadata or {}}
+        self.stats["submitted"] += 1
+        if self._stopped:
+            self._write([item])
+            return True
+
+        self._ensure_worker()
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure: the writer is behind, so pay the write here
+            logger.warning(f"Knowledge queue full, writing to {collection_name} inline")
+            self.stats["inline"] += 1
+            self._write([item])
+        return True
+
+    def submit_many(self, items: List[Dict[str, Any]]) -> int:
+        """Queue {"collection", "document", "metadata"} items; returns how many were accepted."""
+        return sum(
+            self.submit(item["collection"], item["document"], item.get("metadata"))
+            for item in items
+        )
+
+    def pending(self) -> int:
+        """Number of documents waiting to be written."""
+        return self._queue.unfinished_tasks
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._drain_outbox()
+                continue
+
+            batch: List[Optional[Dict[str, Any]]] = [item]
+            while item is not None and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            stop = batch[-1] is None
+            items = [entry for entry in batch if entry is not None]
+            try:
+                if items:
+                    self._write(items)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+            self._drain_outbox()
+
+    def _drain_outbox(self):
+        """On the leader, write what the other workers handed over."""
+        if self.outbox is None or not self._leads():
+            return
+        try:
+            while True:
+                taken = self.outbox.take(self.batch_size)
+                failed = self._store([item for _, item in taken]) if taken else []
+                # Items that couldn't be written stay for the next drain
+                failed_items = {id(item) for item in failed}
+                stored = [item_id for item_id, item in taken if id(item) not in failed_items]
+                if stored:
+                    self.outbox.done(stored)
+                if failed or len(taken) < self.batch_size:
+                    return
+        except Exception as e:
+            logger.error(f"Error draining the knowledge outbox: {str(e)}", exc_info=True)
+
+    def _write(self, items: List[Dict[str, Any]]):
+        if self.outbox is not None and not self._leads():
+            try:
+                self.outbox.put(items)
+                self.stats["handed_over"] += len(items)
+            except Exception as e:
+                self.stats["failed"] += len(items)
+                self._forget(items)
+                logger.error(f"Error handing knowledge to the leader: {str(e)}", exc_info=True)
+            return
+        self._forget(self._store(items))
+
+    def _store(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write items to their collections; returns the items that couldn't be written."""
+        by_collection: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for item in items:
+            by_collection[item["collection"]].append(item)
+
+        failed = []
+        for collection_name, entries in by_collection.items():
+            try:
+                self.rag_service.store_documents(
+                    collection_name=collection_name,
+                    documents=[entry["document"] for entry in entries],
+                    metadatas=[entry["metadata"] for entry in entries],
+                )
+                self.stats["written"] += len(entries)
+                logger.info(f"Wrote {len(entries)} queued documents to {collection_name}")
+            except Exception as e:
+                self.stats["failed"] += len(entries)
+                failed.extend(entries)
+                logger.error(
+                    f"Error writing queued knowledge to {collection_name}: {str(e)}",
+                    exc_info=True,
+                )
+        return failed
+
+    def flush(self):
+        """Block until everything submitted so far has been written."""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.join()
+
+    def shutdown(self, timeout: Optional[float] = 30.0):
+        """Write out pending documents and stop the worker; later submits write inline."""
+        if self._stopped:
+            return
+        self._stopped = True
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            self._queue.put(None)
+            worker.join(timeout)
+        logger.info(f"Knowledge ingestion queue stopped: {self.stats}")
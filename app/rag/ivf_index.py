@@ -0,0 +1,208 @@
+import os
+from typing import List, Optional
+import numpy as np
+
+from .quantization import open_memmap
+
+# Rows assigned to centroids per block, bounding the distance temporaries
+ASSIGN_BLOCK_ROWS = 65536
+
+# k-means trains on at most this many vectors per list (more adds little)
+TRAIN_SAMPLES_PER_LIST = 256
+
+
+def default_n_lists(count: int) -> int:
+    """Rule-of-thumb list count: about 4 * sqrt(n), at least one."""
+    return max(1, min(count, int(4 * np.sqrt(count))))
+
+
+def assign_to_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid (squared L2) for every vector."""
+    centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for begin in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = np.asarray(vectors[begin : begin + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        # ||x||^2 is constant per row, so it does not affect the argmin
+        labels[begin : begin + len(block)] = np.argmin(
+            centroid_norms - 2.0 * (block @ centroids.T), axis=1
+        )
+    return labels
+
+
+def kmeans(
+    vectors: np.ndarray, n_clusters: int, iterations: int = 20, seed: int = 0
+) -> np.ndarray:
+    """
+    Lloyd's k-means in NumPy.
+
+    Args:
+        vectors: Training vectors, shape (n, dim)
+        n_clusters: Number of centroids (capped at n)
+        iterations: Number of assignment/update rounds
+        seed: Seed for the initial centroid sample
+
+    Returns:
+        Centroids, shape (n_clusters, dim)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n_clusters = min(n_clusters, len(vectors))
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = assign_to_centroids(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=n_clusters)
+        filled = counts > 0
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        centroids[filled] = np.add.reduceat(vectors[order], starts, axis=0) / counts[filled, None]
+
+        # Re-seed empty clusters with the points farthest from their centroid,
+        # which splits the loosest clusters and keeps lists balanced
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            difference = vectors - centroids[labels]
+            spread = np.einsum("ij,ij->i", difference, difference)
+            centroids[empty] = vectors[np.argsort(spread)[-len(empty) :]]
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF-flat) partitioning of a vector matrix.
+
+    Every row is assigned to its nearest k-means centroid; a query probes only
+    the ``nprobe`` nearest lists, trading recall for speed. Assignments are
+    kept in a memory-mapped int32 file so the index reopens without
+    re-clustering. New rows are assigned incrementally to the existing
+    centroids; the owning store re-clusters when lists drift out of balance.
+    """
+
+    CENTROIDS_FILE = "ivf_centroids.npy"
+    ASSIGNMENTS_FILE = "ivf_assignments.i32"
+
+    def __init__(self, directory: str, centroids: np.ndarray, count: int, capacity: int):
+        self.directory = directory
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        self.count = count
+        self.capacity = 0
+        self.assignments: Optional[np.memmap] = None
+        self.ensure_capacity(capacity)
+        self._lists: List[np.ndarray] = []
+        # Rows added since the lists were last rebuilt, per list
+        self._tails: List[List[int]] = []
+        self._tail_count = 0
+        self._rebuild_lists()
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def _path(cls, directory: str, name: str) -> str:
+        return os.path.join(directory, name)
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        return os.path.exists(cls._path(directory, cls.CENTROIDS_FILE))
+
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        count: int,
+        n_lists: Optional[int] = None,
+        seed: int = 0,
+    ):
+        """
+        Cluster the first ``count`` rows of ``vectors``.
+
+        Returns:
+            (centroids, assignments) for all ``count`` rows; nothing is written to disk
+        """
+        n_lists = n_lists or default_n_lists(count)
+        sample = np.arange(count)
+        sample_size = n_lists * TRAIN_SAMPLES_PER_LIST
+        if count > sample_size:
+            sample = np.sort(np.random.default_rng(seed).choice(count, sample_size, replace=False))
+        centroids = kmeans(vectors[sample], n_lists, seed=seed)
+        return centroids, assign_to_centroids(vectors[:count], centroids)
+
+    @classmethod
+    def create(
+        cls,
+        directory: str,
+        centroids: np.ndarray,
+        assignments: np.ndarray,
+        capacity: int,
+    ) -> "IVFIndex":
+        """Persist trained centroids and assignments and open the index over them."""
+        temp_path = cls._path(directory, cls.CENTROIDS_FILE) + ".tmp.npy"
+        np.save(temp_path, np.asarray(centroids, dtype=np.float32))
+        stored = open_memmap(
+            cls._path(directory, cls.ASSIGNMENTS_FILE), np.int32, max(capacity, len(assignments))
+        )
+        stored[: len(assignments)] = assignments
+        stored.flush()
+        os.replace(temp_path, cls._path(directory, cls.CENTROIDS_FILE))
+        return cls(directory, centroids, len(assignments), capacity)
+
+    @classmethod
+    def load(cls, directory: str, count: int, capacity: int) -> "IVFIndex":
+        centroids = np.load(cls._path(directory, cls.CENTROIDS_FILE))
+        return cls(directory, centroids, count, capacity)
+
+    def ensure_capacity(self, needed: int):
+        if self.assignments is not None and needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2, 1)
+        if self.assignments is not None:
+            self.assignments.flush()
+        self.assignments = open_memmap(
+            self._path(self.directory, self.ASSIGNMENTS_FILE), np.int32, capacity
+        )
+        self.capacity = capacity
+
+    def _rebuild_lists(self):
+        labels = np.asarray(self.assignments[: self.count])
+        # A stable sort keeps each list in ascending row order
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(self.n_lists + 1))
+        self._lists = [order[bounds[i] : bounds[i + 1]] for i in range(self.n_lists)]
+        self._tails = [[] for _ in range(self.n_lists)]
+        self._tail_count = 0
+
+    def add(self, start: int, vectors: np.ndarray):
+        """Assign rows [start, start + len(vectors)) to their nearest lists."""
+        labels = assign_to_centroids(vectors, self.centroids)
+        end = start + len(labels)
+        self.ensure_capacity(end)
+        self.assignments[start:end] = labels
+        self.assignments.flush()
+        self.count = max(self.count, end)
+
+        for row, label in enumerate(labels.tolist(), start=start):
+            self._tails[label].append(row)
+        self._tail_count += len(labels)
+        if self._tail_count > max(1024, self.count // 8):
+            self._rebuild_lists()
+
+    def list_sizes(self) -> np.ndarray:
+        return np.bincount(np.asarray(self.assignments[: self.count]), minlength=self.n_lists)
+
+    def imbalance(self) -> float:
+        """Largest list size relative to the mean list size (1.0 is perfectly balanced)."""
+        if not self.count:
+            return 1.0
+        return float(self.list_sizes().max() * self.n_lists / self.count)
+
+    def probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Rows in the ``nprobe`` lists nearest to the query, in ascending row order."""
+        nprobe = max(1, min(nprobe, self.n_lists))
+        distances = self.centroid_norms - 2.0 * (self.centroids @ query)
+        nearest = np.argpartition(distances, nprobe - 1)[:nprobe]
+        parts = [self._lists[i] for i in nearest]
+        parts.extend(np.asarray(self._tails[i], dtype=np.int64) for i in nearest)
+        return np.sort(np.concatenate(parts))
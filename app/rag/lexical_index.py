@@ -0,0 +1,188 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional
+import logging
+
+from .filters import matches_where, matches_where_document
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['_-][a-z0-9]+)*")
+
+# Very common words carry no signal for keyword lookups and bloat the postings
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has",
+    "in", "is", "it", "its", "of", "on", "or", "that", "the", "to", "was",
+    "were", "will", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase a text and split it into searchable terms."""
+    if not text:
+        return []
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+class BM25Index:
+    """In-memory BM25 inverted index kept alongside a vector collection."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {doc_id: term frequency}
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.documents: Dict[str, str] = {}
+        self.metadatas: Dict[str, Dict[str, Any]] = {}
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.documents
+
+    def add(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        overwrite: bool = True,
+    ):
+        """
+        Index documents under the given ids.
+
+        Args:
+            ids: Document ids, matching the ids used in the vector collection
+            documents: Raw document texts
+            metadatas: Optional metadata for each document
+            overwrite: Replace documents whose id is already indexed
+        """
+        if not metadatas:
+            metadatas = [{} for _ in documents]
+
+        with self._lock:
+            for doc_id, document, metadata in zip(ids, documents, metadatas):
+                if doc_id in self.documents:
+                    if not overwrite:
+                        continue
+                    self._remove_one(doc_id)
+
+                terms = tokenize(document or "")
+                for term, frequency in Counter(terms).items():
+                    self.postings[term][doc_id] = frequency
+
+                self.doc_terms[doc_id] = list(set(terms))
+                self.doc_lengths[doc_id] = len(terms)
+                self.documents[doc_id] = document
+                self.metadatas[doc_id] = metadata or {}
+                self.total_length += len(terms)
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace the stored metadata of indexed documents (used by filters)."""
+        with self._lock:
+            for doc_id, metadata in zip(ids, metadatas):
+                if doc_id in self.documents:
+                    self.metadatas[doc_id] = metadata or {}
+
+    def remove(self, ids: List[str]):
+        """Drop documents from the index."""
+        with self._lock:
+            for doc_id in ids:
+                if doc_id in self.documents:
+                    self._remove_one(doc_id)
+
+    def _remove_one(self, doc_id: str):
+        for term in self.doc_terms.pop(doc_id, []):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+
+        self.total_length -= self.doc_lengths.pop(doc_id, 0)
+        self.documents.pop(doc_id, None)
+        self.metadatas.pop(doc_id, None)
+
+    def score(self, query: str) -> Dict[str, float]:
+        """Compute BM25 scores for every document matching at least one query term."""
+        terms = tokenize(query)
+        scores: Dict[str, float] = defaultdict(float)
+
+        with self._lock:
+            n_docs = len(self.documents)
+            if not n_docs or not terms:
+                return {}
+            avg_length = self.total_length / n_docs or 1.0
+
+            for term in set(terms):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    length_norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length
+                    scores[doc_id] += idf * (
+                        frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                    )
+
+        return scores
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        offset: int = 0,
+        include_documents: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the index for documents matching the query terms.
+
+        Args:
+            query: Keyword query
+            n_results: Number of results to return
+            where: Optional Chroma-style metadata filter
+            where_document: Optional Chroma-style document content filter
+            offset: Number of leading matches to skip, for pagination
+            include_documents: Return document text; False returns ids/metadata only
+
+        Returns:
+            List of matched documents in the same format as VectorStore.search,
+            with a BM25 "score" instead of a distance
+        """
+        scores = self.score(query)
+
+        with self._lock:
+            if where or where_document:
+                scores = {
+                    doc_id: score
+                    for doc_id, score in scores.items()
+                    if matches_where(self.metadatas.get(doc_id), where)
+                    and matches_where_document(self.documents.get(doc_id), where_document)
+                }
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+            return [
+                {
+                    "id": doc_id,
+                    "document": self.documents[doc_id] if include_documents else None,
+                    "metadata": self.metadatas[doc_id],
+                    "distance": None,
+                    "score": score,
+                }
+                for doc_id, score in ranked[offset : offset + n_results]
+                if doc_id in self.documents
+            ]
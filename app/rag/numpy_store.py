@@ -0,0 +1,803 @@
+import json
+import os
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import logging
+
+from .embeddings import embed_texts, get_default_embedding_function
+from .file_lock import file_lock
+from .filters import matches_where, matches_where_document
+from .ivf_index import IVFIndex
+from .lexical_index import BM25Index
+from .quantization import open_memmap, PCAProjection, QuantizedMatrix
+from .routing import CentroidStats
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Vectors sampled to fit the PCA projection
+PCA_FIT_SAMPLE = 20000
+
+
+class NumpyVectorStore:
+    """
+    In-process vector store for small, hot collections.
+
+    Embeddings live in one contiguous float32 matrix backed by a memory-mapped
+    file, and search is an exact vectorized top-k. Distances are squared L2,
+    the same metric Chroma uses by default, so results match a Chroma
+    collection holding the same embeddings.
+
+    For growing collections the store can also keep a compact copy of the
+    vectors (float16 or int8 quantized, optionally PCA-reduced). Searches then
+    scan only the compact copy and re-score the best candidates exactly
+    against the float32 file, which stays on disk and is paged in per row.
+
+    Large collections can use an IVF index (index="ivf"): vectors are
+    partitioned by k-means and a query scans only the nprobe nearest
+    partitions. Clustering runs on a background thread once the collection
+    reaches ivf_min_train vectors, and again whenever the partitions grow
+    unbalanced; until the first clustering finishes, search is exact.
+
+    Several processes may open the same store: writes hold an exclusive
+    file lock, and a process notices another one's write by the replaced
+    state file and reloads before its next read or write.
+    """
+
+    INDEX_TYPES = ("flat", "ivf")
+
+    VECTORS_FILE = "vectors.f32"
+    ENTRIES_FILE = "entries.jsonl"
+    STATE_FILE = "store.json"
+    PCA_FILE = "pca.npz"
+    LOCK_FILE = "store.lock"
+
+    def __init__(
+        self,
+        collection_name: str,
+        persist_directory: str = "./chroma_db",
+        embedding_function=None,
+        initial_capacity: int = 1024,
+        quantization: str = "none",
+        pca_dim: Optional[int] = None,
+        pca_min_samples: Optional[int] = None,
+        rescore_factor: int = 4,
+        index: str = "flat",
+        n_lists: Optional[int] = None,
+        nprobe: int = 8,
+        ivf_min_train: int = 4096,
+        ivf_max_imbalance: float = 4.0,
+    ):
+        """
+        Args:
+            collection_name: Name of the collection (and its directory)
+            persist_directory: Root directory for stored collections
+            embedding_function: Embedding function; defaults to the shared one
+            initial_capacity: Rows to preallocate in the memory-mapped files
+            quantization: "none", "float16" or "int8" for the compact search copy
+            pca_dim: Reduce the compact copy to this many dimensions with PCA
+            pca_min_samples: Vectors needed before fitting PCA (exact search until then)
+            rescore_factor: Candidates re-scored exactly per requested result
+            index: "flat" for exhaustive search or "ivf" for a partitioned index
+            n_lists: Number of IVF partitions; about 4 * sqrt(count) by default
+            nprobe: IVF partitions scanned per query (overridable per search)
+            ivf_min_train: Vectors needed before the IVF index is first trained
+            ivf_max_imbalance: Re-cluster when the largest partition exceeds this multiple of the mean
+        """
+        if quantization != "none" and quantization not in QuantizedMatrix.MODES:
+            raise ValueError(
+                f"Unknown quantization '{quantization}', expected 'none' or one of {QuantizedMatrix.MODES}"
+            )
+        self.collection_name = collection_name
+        self.directory = os.path.join(persist_directory, "numpy", collection_name)
+        self.embedding_function = embedding_function or get_default_embedding_function()
+        self.initial_capacity = initial_capacity
+        self.quantization = quantization
+        self.pca_dim = pca_dim
+        self.pca_min_samples = pca_min_samples or max(4 * (pca_dim or 0), 256)
+        self.rescore_factor = max(1, rescore_factor)
+        if index not in self.INDEX_TYPES:
+            raise ValueError(f"Unknown index '{index}', expected one of {self.INDEX_TYPES}")
+        self.index = index
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.ivf_min_train = ivf_min_train
+        self.ivf_max_imbalance = ivf_max_imbalance
+        self._lock = threading.RLock()
+        self._recluster_thread: Optional[threading.Thread] = None
+        # Bumped whenever row numbers change (deletes, reloads), to discard stale clusterings
+        self._generation = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self._file_lock():
+            self._reset()
+            self._load()
+            self._loaded_state = self._state_signature()
+
+        self.lexical_index = BM25Index()
+        self.lexical_index.add(self.ids, self.documents, self.metadatas)
+        self._maybe_recluster()
+        logger.info(
+            f"Opened numpy collection {collection_name} with {len(self.ids)} vectors"
+        )
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _reset(self):
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.dim: Optional[int] = None
+        self.capacity = 0
+        self.vectors: Optional[np.memmap] = None
+        # Squared norms for exact search; unused once the compact copy is active
+        self.sq_norms: Optional[np.ndarray] = np.zeros(0, dtype=np.float32)
+        self.pca: Optional[PCAProjection] = None
+        self.quantized: Optional[QuantizedMatrix] = None
+        self.ivf: Optional[IVFIndex] = None
+        # Collection size when the IVF index was last trained
+        self.ivf_trained_count = 0
+        # Embedding centroid for query routing, kept in the state file
+        self._centroid_stats = CentroidStats()
+
+    def _file_lock(self, shared: bool = False):
+        """Cross-process lock on the store's files (see app/rag/file_lock.py)."""
+        return file_lock(self._path(self.LOCK_FILE), shared)
+
+    def _state_signature(self) -> Optional[Tuple[int, int, int]]:
+        # The state file is replaced on every write, so a new inode or
+        # mtime means another process changed the store
+        try:
+            stat = os.stat(self._path(self.STATE_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self, locked: bool = False):
+        """
+        Reload the store if another process wrote to it since this one last did.
+
+        Args:
+            locked: The caller already holds the exclusive file lock
+        """
+        if self._state_signature() == self._loaded_state:
+            return
+        if locked:
+            self._reload()
+        else:
+            with self._file_lock(shared=True):
+                self._reload()
+
+    def _reload(self):
+        self._reset()
+        self._generation += 1
+        self._load()
+        self._loaded_state = self._state_signature()
+        self.lexical_index = BM25Index()
+        self.lexical_index.add(self.ids, self.documents, self.metadatas)
+        logger.info(
+            f"Reloaded numpy collection {self.collection_name} ({len(self.ids)} vectors) "
+            "after a write by another process"
+        )
+
+    @property
+    def _compact_configured(self) -> bool:
+        return self.quantization != "none" or bool(self.pca_dim)
+
+    @property
+    def _compact_mode(self) -> str:
+        return self.quantization if self.quantization != "none" else "float32"
+
+    def _load(self):
+        if not os.path.exists(self._path(self.STATE_FILE)):
+            return
+
+        with open(self._path(self.STATE_FILE), "r") as f:
+            state = json.load(f)
+        count = state["count"]
+
+        # Entries are appended before the state file is updated, so any
+        # lines past "count" belong to an interrupted write
+        with open(self._path(self.ENTRIES_FILE), "r") as f:
+            for line, _ in zip(f, range(count)):
+                entry = json.loads(line)
+                self.ids.append(entry["id"])
+                self.documents.append(entry["document"])
+                self.metadatas.append(entry["metadata"])
+        self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.dim = state["dim"]
+        self.capacity = state["capacity"]
+
+        if not self.dim:
+            return
+        self.vectors = open_memmap(
+            self._path(self.VECTORS_FILE), np.float32, self.capacity, self.dim
+        )
+        if state.get("centroid") is not None:
+            self._centroid_stats = CentroidStats.from_dict(state["centroid"])
+        else:
+            # Stores written before centroids were tracked
+            for begin in range(0, count, 65536):
+                self._centroid_stats.add(self.vectors[begin : min(begin + 65536, count)])
+
+        compact_matches = (
+            self._compact_configured
+            and state.get("compact_mode") == self._compact_mode
+            and state.get("pca_dim") == self.pca_dim
+        )
+        if compact_matches:
+            # Reopen the compact copy without touching the float32 file
+            if self.pca_dim:
+                self.pca = PCAProjection.load(self._path(self.PCA_FILE))
+            self.quantized = QuantizedMatrix(
+                self.directory,
+                self._compact_mode,
+                self.pca_dim or self.dim,
+                self.capacity,
+            )
+            self.sq_norms = None
+        else:
+            stored = self.vectors[: len(self.ids)]
+            self.sq_norms = np.einsum("ij,ij->i", stored, stored)
+            self._maybe_build_compact()
+
+        if self.index == "ivf" and state.get("ivf_trained_count") and IVFIndex.exists(self.directory):
+            self.ivf = IVFIndex.load(self.directory, len(self.ids), self.capacity)
+            self.ivf_trained_count = state["ivf_trained_count"]
+
+    def _save_state(self):
+        state = {
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "count": len(self.ids),
+            "compact_mode": self._compact_mode if self.quantized is not None else None,
+            "pca_dim": self.pca_dim if self.quantized is not None else None,
+            "ivf_trained_count": self.ivf_trained_count if self.ivf is not None else None,
+            "centroid": self._centroid_stats.to_dict(),
+        }
+        temp_path = self._path(self.STATE_FILE) + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self._path(self.STATE_FILE))
+        self._loaded_state = self._state_signature()
+
+    def _ensure_capacity(self, needed: int):
+        if self.vectors is not None and needed <= self.capacity:
+            return
+
+        new_capacity = max(self.initial_capacity, self.capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+
+        if self.vectors is not None:
+            self.vectors.flush()
+        # Grow the backing file in place; existing rows keep their offsets
+        self.vectors = open_memmap(
+            self._path(self.VECTORS_FILE), np.float32, new_capacity, self.dim
+        )
+        self.capacity = new_capacity
+        if self.quantized is not None:
+            self.quantized.ensure_capacity(new_capacity)
+        if self.ivf is not None:
+            self.ivf.ensure_capacity(new_capacity)
+
+    def _reduce(self, vectors: np.ndarray) -> np.ndarray:
+        return self.pca.transform(vectors) if self.pca is not None else vectors
+
+    def _maybe_build_compact(self):
+        """Build the compact search copy once the collection qualifies for it."""
+        if not self._compact_configured or self.quantized is not None or not self.dim:
+            return
+        count = len(self.ids)
+        if self.pca_dim and self.pca is None and count < max(self.pca_min_samples, self.pca_dim):
+            return
+
+        if self.pca_dim and self.pca is None:
+            sample = np.arange(count)
+            if count > PCA_FIT_SAMPLE:
+                sample = np.sort(np.random.default_rng(0).choice(count, PCA_FIT_SAMPLE, replace=False))
+            self.pca = PCAProjection.fit(self.vectors[sample], self.pca_dim)
+            self.pca.save(self._path(self.PCA_FILE))
+
+        quantized = QuantizedMatrix(
+            self.directory, self._compact_mode, self.pca_dim or self.dim, self.capacity
+        )
+        for begin in range(0, count, 65536):
+            end = min(begin + 65536, count)
+            quantized.write(begin, self._reduce(self.vectors[begin:end]))
+        quantized.flush()
+
+        self.quantized = quantized
+        self.sq_norms = None
+        self._save_state()
+        logger.info(
+            f"Built {self._compact_mode} search copy for {self.collection_name} "
+            f"({count} vectors, dim {self.pca_dim or self.dim})"
+        )
+
+    def _maybe_recluster(self):
+        """Start background clustering when the IVF index is missing, stale or unbalanced."""
+        if self.index != "ivf":
+            return
+        count = len(self.ids)
+        if self.ivf is None:
+            due = count >= self.ivf_min_train
+        else:
+            # Re-cluster on imbalance, or once the collection has doubled
+            # and the lists have grown too long for the original nprobe
+            due = (
+                count >= 2 * self.ivf_trained_count
+                or self.ivf.imbalance() > self.ivf_max_imbalance
+            )
+        if due:
+            self.recluster(wait=False)
+
+    def recluster(self, wait: bool = True):
+        """
+        (Re-)train the IVF index on the current vectors.
+
+        Clustering runs outside the store lock, so searches and writes carry
+        on against the old index; rows added meanwhile are assigned to the
+        new centroids before it is swapped in.
+
+        Args:
+            wait: Block until clustering finishes instead of running in the background
+        """
+        with self._lock:
+            if self._recluster_thread is not None and self._recluster_thread.is_alive():
+                thread = self._recluster_thread
+            elif not self.ids:
+                return
+            else:
+                thread = threading.Thread(
+                    target=self._recluster,
+                    name=f"ivf-recluster-{self.collection_name}",
+                    daemon=True,
+                )
+                self._recluster_thread = thread
+                thread.start()
+        if wait:
+            thread.join()
+
+    def _recluster(self):
+        try:
+            with self._lock:
+                count = len(self.ids)
+                vectors = self.vectors
+                generation = self._generation
+            centroids, assignments = IVFIndex.train(vectors, count, self.n_lists)
+
+            with self._lock, self._file_lock():
+                if generation != self._generation or self._state_signature() != self._loaded_state:
+                    # Rows were renumbered meanwhile; the next write re-clusters
+                    logger.info(f"Discarding stale clustering of {self.collection_name}")
+                    return
+                ivf = IVFIndex.create(self.directory, centroids, assignments, self.capacity)
+                if len(self.ids) > count:
+                    ivf.add(count, self.vectors[count : len(self.ids)])
+                self.ivf = ivf
+                self.ivf_trained_count = len(self.ids)
+                self._save_state()
+            logger.info(
+                f"Clustered {self.collection_name} into {ivf.n_lists} lists "
+                f"({count} vectors, imbalance {ivf.imbalance():.1f})"
+            )
+        except Exception as e:
+            logger.error(f"Error clustering {self.collection_name}: {str(e)}", exc_info=True)
+
+    def warm_up(self):
+        """Load the embedding model and page the search vectors into memory."""
+        query_vector = embed_texts(["warm up"], self.embedding_function)[0]
+        with self._lock:
+            self._refresh()
+            if self.ids:
+                self._nearest(query_vector, 1, None)
+
+    def count(self) -> int:
+        """Number of stored vectors."""
+        with self._lock:
+            self._refresh()
+            return len(self.ids)
+
+    def centroid_stats(self) -> CentroidStats:
+        """Centroid statistics of the stored embeddings, for query routing."""
+        with self._lock:
+            self._refresh()
+            return self._centroid_stats
+
+    def add_documents(
+        self,
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        embeddings: Optional[np.ndarray] = None,
+    ):
+        """
+        Add documents to the store.
+
+        Args:
+            documents: List of text documents to embed and store
+            metadatas: Optional metadata for each document
+            ids: Optional custom IDs for each document
+            embeddings: Optional precomputed embeddings, skipping the embedding call
+        """
+        if not ids:
+            ids = [f"doc_{i}" for i in range(len(documents))]
+
+        if not metadatas:
+            metadatas = [{} for _ in documents]
+
+        with self._lock:
+            self._refresh()
+            keep = self._new_positions(ids)
+            if not keep:
+                return
+
+            # Embed before taking the file lock, so other processes' writes don't wait on it
+            if embeddings is None:
+                vectors = embed_texts([documents[i] for i in keep], self.embedding_function)
+            else:
+                vectors = np.asarray(embeddings, dtype=np.float32)[keep]
+
+            with self._file_lock():
+                self._refresh(locked=True)
+                # Another process may have stored some of the ids meanwhile
+                fresh = self._new_positions(ids)
+                if len(fresh) < len(keep):
+                    vectors = vectors[[keep.index(i) for i in fresh]]
+                    keep = fresh
+                if keep:
+                    self._append(documents, metadatas, ids, keep, vectors)
+        logger.info(f"Added {len(keep)} documents to numpy collection {self.collection_name}")
+
+    def _new_positions(self, ids: List[str]) -> List[int]:
+        """Positions in ``ids`` to store: like Chroma's add, the first copy of each new id."""
+        keep, seen = [], set(self.id_to_row)
+        for i, doc_id in enumerate(ids):
+            if doc_id not in seen:
+                seen.add(doc_id)
+                keep.append(i)
+        return keep
+
+    def _append(
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        keep: List[int],
+        vectors: np.ndarray,
+    ):
+        """Store the ``keep`` positions of a batch with their embeddings (store locks held)."""
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self.dim}"
+            )
+
+        start = len(self.ids)
+        end = start + len(keep)
+        self._ensure_capacity(end)
+        self.vectors[start:end] = vectors
+        self.vectors.flush()
+        if self.quantized is not None:
+            self.quantized.write(start, self._reduce(vectors))
+            self.quantized.flush()
+        else:
+            self.sq_norms = np.concatenate(
+                [self.sq_norms, np.einsum("ij,ij->i", vectors, vectors)]
+            )
+        if self.ivf is not None:
+            self.ivf.add(start, vectors)
+        self._centroid_stats.add(vectors)
+
+        with open(self._path(self.ENTRIES_FILE), "a") as f:
+            for row, i in enumerate(keep, start=start):
+                entry = {"id": ids[i], "document": documents[i], "metadata": metadatas[i] or {}}
+                f.write(json.dumps(entry) + "\n")
+                self.ids.append(ids[i])
+                self.documents.append(documents[i])
+                self.metadatas.append(metadatas[i] or {})
+                self.id_to_row[ids[i]] = row
+        self._save_state()
+        self._maybe_build_compact()
+        self._maybe_recluster()
+
+        self.lexical_index.add(
+            [ids[i] for i in keep],
+            [documents[i] for i in keep],
+            [metadatas[i] for i in keep],
+            overwrite=False,
+        )
+
+    def export(self) -> Dict[str, Any]:
+        """
+        Read every stored document with its embedding, without re-embedding.
+
+        Returns:
+            {"ids", "documents", "metadatas", "embeddings"} with embeddings as a float32 matrix
+        """
+        with self._lock:
+            self._refresh()
+            count = len(self.ids)
+            return {
+                "ids": list(self.ids),
+                "documents": list(self.documents),
+                "metadatas": [dict(metadata) for metadata in self.metadatas],
+                "embeddings": np.array(self.vectors[:count])
+                if count
+                else np.zeros((0, self.dim or 0), dtype=np.float32),
+            }
+
+    def _write_entries(self, rows: List[int]) -> str:
+        """Write the entries of ``rows`` to a temporary file and return its path."""
+        temp_path = self._path(self.ENTRIES_FILE) + ".tmp"
+        with open(temp_path, "w") as f:
+            for row in rows:
+                entry = {
+                    "id": self.ids[row],
+                    "document": self.documents[row],
+                    "metadata": self.metadatas[row],
+                }
+                f.write(json.dumps(entry) + "\n")
+        return temp_path
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Merge new metadata into existing documents, leaving text and embeddings untouched.
+
+        Args:
+            ids: Documents to update
+            metadatas: Metadata to merge into each document's existing metadata
+        """
+        with self._lock, self._file_lock():
+            self._refresh(locked=True)
+            updated = []
+            for doc_id, patch in zip(ids, metadatas):
+                row = self.id_to_row.get(doc_id)
+                if row is not None:
+                    self.metadatas[row] = {**self.metadatas[row], **(patch or {})}
+                    updated.append(doc_id)
+            if not updated:
+                return
+            # The entry log is rewritten whole; metadata updates are rare merges
+            temp_path = self._write_entries(list(range(len(self.ids))))
+            os.replace(temp_path, self._path(self.ENTRIES_FILE))
+            # Rewritten so other processes see the change
+            self._save_state()
+            self.lexical_index.update_metadata(
+                updated, [self.metadatas[self.id_to_row[doc_id]] for doc_id in updated]
+            )
+
+    def delete(self, ids: List[str]) -> int:
+        """
+        Remove documents by id, compacting the stored vectors.
+
+        The float32 file is rewritten without the deleted rows and swapped in
+        atomically. The compact search copy is re-encoded (reusing the fitted
+        PCA) and IVF lists keep their centroids, so nothing is re-embedded or
+        re-clustered.
+
+        Returns:
+            Number of documents removed
+        """
+        with self._lock, self._file_lock():
+            self._refresh(locked=True)
+            # Row numbers change below; a clustering still running is discarded
+            self._generation += 1
+
+            doomed = {self.id_to_row[doc_id] for doc_id in ids if doc_id in self.id_to_row}
+            if not doomed:
+                return 0
+            keep = np.array(
+                [row for row in range(len(self.ids)) if row not in doomed], dtype=np.int64
+            )
+            self._centroid_stats.remove(self.vectors[sorted(doomed)])
+
+            vectors_path = self._path(self.VECTORS_FILE)
+            temp_path = vectors_path + ".tmp"
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            compacted = open_memmap(temp_path, np.float32, self.capacity, self.dim)
+            for begin in range(0, len(keep), 65536):
+                block = keep[begin : begin + 65536]
+                compacted[begin : begin + len(block)] = self.vectors[block]
+            compacted.flush()
+            del compacted
+
+            entries_temp_path = self._write_entries(keep.tolist())
+
+            os.replace(temp_path, vectors_path)
+            os.replace(entries_temp_path, self._path(self.ENTRIES_FILE))
+            self.vectors = open_memmap(vectors_path, np.float32, self.capacity, self.dim)
+
+            removed = [self.ids[row] for row in sorted(doomed)]
+            self.ids = [self.ids[row] for row in keep.tolist()]
+            self.documents = [self.documents[row] for row in keep.tolist()]
+            self.metadatas = [self.metadatas[row] for row in keep.tolist()]
+            self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids)}
+
+            if self.sq_norms is not None:
+                self.sq_norms = self.sq_norms[keep]
+            if self.quantized is not None:
+                self.quantized = None
+                self._maybe_build_compact()
+            if self.ivf is not None:
+                assignments = np.asarray(self.ivf.assignments[: self.ivf.count])[keep]
+                self.ivf = IVFIndex.create(
+                    self.directory, self.ivf.centroids, assignments, self.capacity
+                )
+            self._save_state()
+            self.lexical_index.remove(removed)
+        logger.info(f"Deleted {len(removed)} documents from numpy collection {self.collection_name}")
+        return len(removed)
+
+    def _filtered_rows(
+        self,
+        where: Optional[Dict[str, Any]],
+        where_document: Optional[Dict[str, Any]],
+    ) -> Optional[np.ndarray]:
+        """Rows passing the filters, or None when there are no filters."""
+        if not where and not where_document:
+            return None
+        return np.array(
+            [
+                row
+                for row in range(len(self.ids))
+                if matches_where(self.metadatas[row], where)
+                and matches_where_document(self.documents[row], where_document)
+            ],
+            dtype=np.int64,
+        )
+
+    @staticmethod
+    def _top_k(distances: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the k smallest distances, nearest first."""
+        if k < len(distances):
+            top = np.argpartition(distances, k - 1)[:k]
+        else:
+            top = np.arange(len(distances))
+        return top[np.argsort(distances[top], kind="stable")]
+
+    def _nearest(
+        self,
+        query_vector: np.ndarray,
+        k: int,
+        rows: Optional[np.ndarray],
+        nprobe: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the k nearest rows (optionally restricted to ``rows``) and their distances."""
+        count = len(self.ids)
+
+        if self.ivf is not None:
+            candidates = self.ivf.probe(query_vector, nprobe or self.nprobe)
+            if rows is not None:
+                candidates = np.intersect1d(candidates, rows, assume_unique=True)
+            # Too few candidates in the probed lists: fall back to a full scan
+            if len(candidates) >= k:
+                rows = candidates
+
+        if self.quantized is None:
+            matrix = self.vectors[:count] if rows is None else self.vectors[rows]
+            sq_norms = self.sq_norms[:count] if rows is None else self.sq_norms[rows]
+            distances = sq_norms - 2.0 * (matrix @ query_vector) + query_vector @ query_vector
+            top = self._top_k(distances, k)
+            top_rows = top if rows is None else rows[top]
+            return top_rows, distances[top]
+
+        # Coarse pass over the compact copy, then exact re-scoring of the best candidates
+        approx = self.quantized.approx_distances(self._reduce(query_vector), count, rows)
+        candidates = self._top_k(approx, min(len(approx), k * self.rescore_factor))
+        candidate_rows = np.sort(candidates if rows is None else rows[candidates])
+        difference = self.vectors[candidate_rows] - query_vector
+        exact = np.einsum("ij,ij->i", difference, difference)
+        order = np.argsort(exact, kind="stable")[:k]
+        return candidate_rows[order], exact[order]
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        offset: int = 0,
+        include_documents: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Nearest-neighbour search, with the same arguments and result format as VectorStore.search.
+
+        ``nprobe`` overrides the store's IVF partitions-per-query for this search.
+        """
+        try:
+            logger.info(f"Searching with query: '{query}' (n_results={n_results})")
+            with self._lock:
+                self._refresh()
+                if not self.ids:
+                    return []
+
+                rows = self._filtered_rows(where, where_document)
+                if rows is not None and not len(rows):
+                    return []
+                if query_embedding is not None:
+                    query_vector = np.asarray(query_embedding, dtype=np.float32)
+                else:
+                    query_vector = embed_texts([query], self.embedding_function)[0]
+
+                k = offset + n_results
+                if k <= 0:
+                    return []
+                top_rows, distances = self._nearest(query_vector, k, rows, nprobe)
+
+                results = []
+                for row, distance in zip(top_rows[offset:], distances[offset:]):
+                    row = int(row)
+                    results.append(
+                        {
+                            "id": self.ids[row],
+                            "document": self.documents[row] if include_documents else None,
+                            "metadata": self.metadatas[row],
+                            "distance": float(max(distance, 0.0)),
+                        }
+                    )
+            logger.info(f"Found {len(results)} results")
+            return results
+        except Exception as e:
+            logger.error(f"Error searching documents: {str(e)}", exc_info=True)
+            return []
+
+    def get_documents(
+        self,
+        where: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        include_documents: bool = True,
+        ids: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """List stored documents matching filters, like VectorStore.get_documents."""
+        with self._lock:
+            self._refresh()
+            rows = self._filtered_rows(where, where_document)
+            rows = range(len(self.ids)) if rows is None else rows.tolist()
+            if ids is not None:
+                wanted = {self.id_to_row[doc_id] for doc_id in ids if doc_id in self.id_to_row}
+                rows = [row for row in rows if row in wanted]
+            end = None if limit is None else offset + limit
+            return [
+                {
+                    "id": self.ids[row],
+                    "document": self.documents[row] if include_documents else None,
+                    "metadata": self.metadatas[row],
+                }
+                for row in list(rows)[offset:end]
+            ]
+
+    def lexical_search(
+        self,
+        query: str,
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        offset: int = 0,
+        include_documents: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Keyword search over the BM25 index, like VectorStore.lexical_search."""
+        try:
+            with self._lock:
+                self._refresh()
+            return self.lexical_index.search(
+                query,
+                n_results,
+                where=where,
+                where_document=where_document,
+                offset=offset,
+                include_documents=include_documents,
+            )
+        except Exception as e:
+            logger.error(f"Error in lexical search: {str(e)}", exc_info=True)
+            return []
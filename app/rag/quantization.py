@@ -0,0 +1,140 @@
+import os
+from typing import Optional
+import numpy as np
+
+# Rows processed per block when scanning quantized vectors, so dequantized
+# temporaries stay small however large the collection is
+SCAN_BLOCK_ROWS = 65536
+
+
+def open_memmap(path: str, dtype, rows: int, cols: Optional[int] = None) -> np.memmap:
+    """Open a row-major memmap file, creating or growing it to hold ``rows`` rows."""
+    shape = (rows,) if cols is None else (rows, cols)
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    with open(path, "ab") as f:
+        if f.tell() < nbytes:
+            f.truncate(nbytes)
+    return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+
+class PCAProjection:
+    """Linear dimensionality reduction fitted with an SVD of the centered vectors."""
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray):
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)
+
+    @property
+    def n_components(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, n_components: int) -> "PCAProjection":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        mean = vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        return cls(mean, vt[:n_components])
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        return ((np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T).astype(
+            np.float32
+        )
+
+    def save(self, path: str):
+        temp_path = path + ".tmp.npz"
+        np.savez(temp_path, mean=self.mean, components=self.components)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PCAProjection":
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"])
+
+
+class QuantizedMatrix:
+    """
+    Compact, memory-mapped copy of a vector matrix used for coarse search.
+
+    "float16" halves the footprint; "int8" stores symmetric per-vector
+    quantized codes plus one float32 scale per vector (about 4x smaller);
+    "float32" keeps full precision, for PCA-reduced vectors without quantization.
+    Approximate squared-L2 distances are computed block by block from the
+    codes; callers re-score the best candidates against full-precision vectors.
+    """
+
+    MODES = ("float32", "float16", "int8")
+
+    def __init__(self, directory: str, mode: str, dim: int, capacity: int):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown quantization '{mode}', expected one of {self.MODES}")
+        self.directory = directory
+        self.mode = mode
+        self.dim = dim
+        self.capacity = 0
+        self.codes: Optional[np.memmap] = None
+        self.scales: Optional[np.memmap] = None
+        # Squared norms of the dequantized vectors, for the L2 expansion
+        self.norms: Optional[np.memmap] = None
+        self.ensure_capacity(capacity)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def ensure_capacity(self, needed: int):
+        if self.codes is not None and needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2, 1)
+        self.flush()
+        code_dtype = np.dtype(self.mode)
+        self.codes = open_memmap(self._path(f"vectors.{self.mode}"), code_dtype, capacity, self.dim)
+        self.norms = open_memmap(self._path(f"norms.{self.mode}.f32"), np.float32, capacity)
+        if self.mode == "int8":
+            self.scales = open_memmap(self._path("scales.int8.f32"), np.float32, capacity)
+        self.capacity = capacity
+
+    def write(self, start: int, vectors: np.ndarray):
+        """Quantize vectors into rows [start, start + len(vectors))."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        end = start + len(vectors)
+        self.ensure_capacity(end)
+
+        if self.mode == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+            self.scales[start:end] = scales
+            dequantized = codes.astype(np.float32) * scales[:, None]
+        else:
+            codes = vectors.astype(self.mode)
+            dequantized = codes.astype(np.float32)
+
+        self.codes[start:end] = codes
+        self.norms[start:end] = np.einsum("ij,ij->i", dequantized, dequantized)
+
+    def _dequantize(self, rows) -> np.ndarray:
+        block = self.codes[rows].astype(np.float32)
+        if self.mode == "int8":
+            block *= self.scales[rows][:, None]
+        return block
+
+    def approx_distances(
+        self, query: np.ndarray, count: int, rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Approximate squared-L2 distances from query to the first ``count`` rows (or ``rows``)."""
+        query = np.asarray(query, dtype=np.float32)
+        query_norm = float(query @ query)
+        total = count if rows is None else len(rows)
+        distances = np.empty(total, dtype=np.float32)
+
+        for begin in range(0, total, SCAN_BLOCK_ROWS):
+            end = min(begin + SCAN_BLOCK_ROWS, total)
+            block_rows = slice(begin, end) if rows is None else rows[begin:end]
+            block = self._dequantize(block_rows)
+            distances[begin:end] = self.norms[block_rows] - 2.0 * (block @ query) + query_norm
+
+        return distances
+
+    def flush(self):
+        for array in (self.codes, self.scales, self.norms):
+            if array is not None:
+                array.flush()
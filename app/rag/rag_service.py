@@ -1,9 +1,21 @@
 # --- START OF FILE rag_service.py ---
 
-from typing import List, Dict, Any, Optional, Set
-from .vector_store import VectorStore
+from typing import List, Dict, Any, Optional, Set, Iterable, Callable
+from .vector_store import VectorStore, chroma_collection_exists
+from .numpy_store import NumpyVectorStore
 from .document_processor import DocumentProcessor
+from .bulk_ingest import BulkIngestor
+from .lexical_index import tokenize
+from .ranking import reciprocal_rank_fusion, rerank
+from .filters import encode_cursor, decode_cursor, cursor_state
+from .retention import HitTracker
+from .dedup import NearDuplicateIndex
+from .snapshot import snapshot_path, write_snapshot, read_snapshot, list_snapshots
+from .embeddings import embed_query
+from .routing import CentroidStats, plan_collections, DEFAULT_ROUTING_TOP_N, DEFAULT_ROUTING_MARGIN
+import hashlib
 import logging
+import time
 
 # REMOVE THESE LangChain imports:
 # from langchain.retrievers.multi_query import MultiQueryRetriever
@@ -19,6 +31,35 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
+# "vector": embedding search only, "lexical": BM25 only,
+# "hybrid": RRF of both, "auto": lexical fast path for short keyword queries
+SEARCH_MODES = ("vector", "lexical", "hybrid", "auto")
+DEFAULT_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "vector")
+
+# Storage backends a collection can be configured to use
+COLLECTION_BACKENDS = {"chroma": VectorStore, "numpy": NumpyVectorStore}
+
+# A collection configured for numpy whose numpy store is empty starts from a
+# copy of its Chroma collection, if one exists with at most this many
+# documents; a larger Chroma collection is kept and used as is
+NUMPY_MAX_DOCUMENTS = int(os.getenv("RAG_NUMPY_MAX_DOCUMENTS", 50000))
+
+# Queries with at most this many terms are treated as keyword lookups in "auto" mode
+KEYWORD_QUERY_MAX_TERMS = 3
+
+# How many first-stage candidates to fetch per requested result when reranking
+RERANK_CANDIDATE_MULTIPLIER = 4
+
+# What add_documents does with a chunk that nearly duplicates a stored one:
+# "skip" drops it, "merge" drops its text but refreshes the stored copy's metadata
+DUPLICATE_POLICIES = ("skip", "merge")
+DEFAULT_DUPLICATE_THRESHOLD = float(os.getenv("RAG_DUPLICATE_THRESHOLD", 0.85))
+
+
+def content_id(text: str) -> str:
+    """Stable id derived from a chunk's text, so re-adding identical text is a no-op."""
+    return f"doc_{hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]}"
+
 
 class RAGService:
     """Centralized service for document storage and retrieval using LangChain."""
@@ -36,8 +77,18 @@ class RAGService:
         """Initialize the RAG service with collections storage."""
         logger.info("Initializing RAG service with LangChain integration")
         self.collections: Dict[str, VectorStore] = {}
+        # Per-collection backend and backend options, see configure_collection()
+        self.collection_configs: Dict[str, Dict[str, Any]] = {}
         self.document_processor = DocumentProcessor()
         self.shared_collections: Set[str] = set()
+        # Search hits per document, for LRU retention (see retention.py)
+        self.hit_tracker = HitTracker()
+        # Near-duplicate detection per collection, see configure_deduplication()
+        self.dedup_configs: Dict[str, Dict[str, Any]] = {}
+        self.dedup_indexes: Dict[str, NearDuplicateIndex] = {}
+        self.default_search_mode = (
+            DEFAULT_SEARCH_MODE if DEFAULT_SEARCH_MODE in SEARCH_MODES else "vector"
+        )
 
         # Remove LLM initialization based on ChatGoogleGenerativeAI
         self.llm = None  # No longer needed
@@ -46,12 +97,77 @@ class RAGService:
         else:
             logger.warning("No API key available for advanced retrieval methods")
 
+    def configure_collection(
+        self, collection_name: str, backend: str = "chroma", **options
+    ):
+        """
+        Choose the storage backend for a collection.
+
+        Args:
+            collection_name: Collection to configure
+            backend: Key of COLLECTION_BACKENDS ("chroma" or "numpy")
+            **options: Extra keyword arguments for the backend's constructor,
+                e.g. hnsw={"space": "cosine", "search_ef": 64} for Chroma
+        """
+        if backend not in COLLECTION_BACKENDS:
+            raise ValueError(
+                f"Unknown collection backend '{backend}', expected one of {list(COLLECTION_BACKENDS)}"
+            )
+        config = {"backend": backend, **options}
+        if self.collection_configs.get(collection_name) != config:
+            self.collection_configs[collection_name] = config
+            # Reopen with the new backend on next access
+            self.collections.pop(collection_name, None)
+
+    def configure_deduplication(
+        self,
+        collection_name: str,
+        threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+        policy: str = "skip",
+    ):
+        """
+        Check chunks added to a collection against its stored chunks before embedding.
+
+        Args:
+            collection_name: Collection to deduplicate
+            threshold: Estimated Jaccard similarity of word shingles at which chunks are duplicates
+            policy: One of DUPLICATE_POLICIES
+        """
+        if policy not in DUPLICATE_POLICIES:
+            raise ValueError(
+                f"Unknown duplicate policy '{policy}', expected one of {DUPLICATE_POLICIES}"
+            )
+        config = {"threshold": threshold, "policy": policy}
+        if self.dedup_configs.get(collection_name) != config:
+            self.dedup_configs[collection_name] = config
+            self.dedup_indexes.pop(collection_name, None)
+
+    def _duplicate_index(self, collection_name: str) -> Optional[NearDuplicateIndex]:
+        """The collection's near-duplicate index, built from stored chunks on first use."""
+        config = self.dedup_configs.get(collection_name)
+        if config is None:
+            return None
+        if collection_name not in self.dedup_indexes:
+            index = NearDuplicateIndex(config["threshold"])
+            for doc in self.get_collection(collection_name).get_documents():
+                index.add(doc["id"], doc["document"] or "")
+            self.dedup_indexes[collection_name] = index
+            logger.info(f"Built near-duplicate index for {collection_name} ({len(index)} chunks)")
+        return self.dedup_indexes[collection_name]
+
     def get_collection(self, collection_name: str) -> VectorStore:
         """Get or create a vector store collection."""
         if collection_name not in self.collections:
             logger.info(f"Creating new collection: {collection_name}")
             try:
-                self.collections[collection_name] = VectorStore(collection_name)
+                options = dict(self.collection_configs.get(collection_name, {}))
+                backend = options.pop("backend", "chroma")
+                if backend == "numpy":
+                    self.collections[collection_name] = self._open_numpy(collection_name, options)
+                else:
+                    self.collections[collection_name] = COLLECTION_BACKENDS[backend](
+                        collection_name, **options
+                    )
             except Exception as e:
                 logger.error(f"Error creating collection {collection_name}: {str(e)}")
 
@@ -69,6 +185,30 @@ class RAGService:
                         )
                         return []
 
+                    def lexical_search(self, *args, **kwargs):
+                        return []
+
+                    def get_documents(self, *args, **kwargs):
+                        return []
+
+                    def count(self):
+                        return 0
+
+                    def delete(self, *args, **kwargs):
+                        return 0
+
+                    def update_metadata(self, *args, **kwargs):
+                        return
+
+                    def export(self):
+                        return {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+
+                    def warm_up(self):
+                        return
+
+                    def centroid_stats(self):
+                        return CentroidStats()
+
                     def as_retriever(self, *args, **kwargs):
                         # Dummy retriever not needed now.
                         return None
@@ -77,6 +217,41 @@ class RAGService:
 
         return self.collections[collection_name]
 
+    def _open_numpy(self, collection_name: str, options: Dict[str, Any]):
+        """
+        Open a numpy-backed collection, moving it over from Chroma on first use.
+
+        An empty numpy store is filled once with the stored embeddings of
+        the Chroma collection of the same name, so switching a collection's
+        backend neither loses documents nor re-embeds them. Chroma
+        collections above NUMPY_MAX_DOCUMENTS stay on Chroma.
+        """
+        store = NumpyVectorStore(collection_name, **options)
+        persist_directory = options.get("persist_directory", "./chroma_db")
+        if store.count() or not chroma_collection_exists(collection_name, persist_directory):
+            return store
+
+        chroma = VectorStore(collection_name, persist_directory, options.get("embedding_function"))
+        count = chroma.count()
+        if count > NUMPY_MAX_DOCUMENTS:
+            logger.warning(
+                f"Keeping {collection_name} on Chroma: {count} documents is above the "
+                f"numpy backend's limit of {NUMPY_MAX_DOCUMENTS}"
+            )
+            return chroma
+        if count:
+            exported = chroma.export()
+            store.add_documents(
+                exported["documents"],
+                exported["metadatas"],
+                exported["ids"],
+                embeddings=exported["embeddings"],
+            )
+            logger.info(
+                f"Copied {store.count()} documents of {collection_name} from Chroma to numpy"
+            )
+        return store
+
     def add_documents(
         self,
         collection_name: str,
@@ -84,37 +259,528 @@ class RAGService:
         metadatas: Optional[List[Dict[str, Any]]] = None,
         ids: Optional[List[str]] = None,
     ):
-        """Add documents to a specified collection."""
-        try:
-            collection = self.get_collection(collection_name)
-
-            # Process documents if needed (chunking)
-            processed = self.document_processor.process_documents(documents, metadatas)
+        """
+        Add documents to a specified collection, logging rather than raising errors.
 
-            # Add to vector store
-            collection.add_documents(
-                documents=processed["chunks"],
-                metadatas=processed["metadatas"],
-                ids=ids or [f"doc_{i}" for i in range(len(processed["chunks"]))],
-            )
-            logger.info(f"Added {len(processed['chunks'])} chunks to {collection_name}")
+        See store_documents(), which this calls.
+        """
+        try:
+            self.store_documents(collection_name, documents, metadatas, ids)
         except Exception as e:
             logger.error(
                 f"Error adding documents to {collection_name}: {str(e)}", exc_info=True
             )
             # Don't fail the entire workflow if RAG operations fail
 
+    def store_documents(
+        self,
+        collection_name: str,
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> int:
+        """
+        Add documents to a specified collection, raising if they can't be stored.
+
+        Documents are chunked first. Given ids apply per document (with a
+        "_<n>" suffix per chunk when a document splits); without ids, each
+        chunk's id is derived from its text. In collections configured with
+        configure_deduplication(), near-duplicates of stored chunks are
+        skipped or merged before anything is embedded.
+
+        Returns:
+            Number of chunks written
+        """
+        collection = self.get_collection(collection_name)
+
+        # Stamp ingestion time so callers can filter by recency
+        ingested_at = time.time()
+        metadatas = [
+            {"ingested_at": ingested_at, **(meta or {})}
+            for meta in (metadatas or [{} for _ in documents])
+        ]
+
+        # Process documents if needed (chunking)
+        processed = self.document_processor.process_documents(documents, metadatas, ids)
+        chunk_ids = processed["ids"] or [content_id(chunk) for chunk in processed["chunks"]]
+
+        # Stores reject repeated ids within one call; keep the first copy
+        keep, seen = [], set()
+        for i, chunk_id in enumerate(chunk_ids):
+            if chunk_id not in seen:
+                seen.add(chunk_id)
+                keep.append(i)
+
+        index = self._duplicate_index(collection_name)
+        signatures = {}
+        if index is not None:
+            keep, signatures = self._drop_near_duplicates(
+                collection_name, collection, index, processed, chunk_ids, keep
+            )
+        if not keep:
+            return 0
+
+        # Add to vector store
+        collection.add_documents(
+            documents=[processed["chunks"][i] for i in keep],
+            metadatas=[processed["metadatas"][i] for i in keep],
+            ids=[chunk_ids[i] for i in keep],
+        )
+        if index is not None:
+            for i in keep:
+                index.add(chunk_ids[i], processed["chunks"][i], signatures.get(i))
+        logger.info(f"Added {len(keep)} chunks to {collection_name}")
+        return len(keep)
+
+    def _drop_near_duplicates(
+        self,
+        collection_name: str,
+        collection,
+        index: NearDuplicateIndex,
+        processed: Dict[str, List],
+        chunk_ids: List[str],
+        keep: List[int],
+    ):
+        """Filter near-duplicate chunks out of ``keep`` according to the collection's policy."""
+        policy = self.dedup_configs[collection_name]["policy"]
+        # Chunks of this call are checked against each other too
+        batch = NearDuplicateIndex(index.threshold)
+        unique, signatures, merges = [], {}, {}
+
+        for i in keep:
+            chunk = processed["chunks"][i]
+            signature = index.signature(chunk)
+            match = index.find(chunk, signature) or batch.find(chunk, signature)
+            if match is None or match[0] == chunk_ids[i]:
+                unique.append(i)
+                signatures[i] = signature
+                batch.add(chunk_ids[i], chunk, signature)
+            elif policy == "merge" and match[0] in index:
+                merges[match[0]] = processed["metadatas"][i]
+
+        if merges:
+            collection.update_metadata(list(merges), list(merges.values()))
+        skipped = len(keep) - len(unique)
+        if skipped:
+            logger.info(
+                f"Dropped {skipped} near-duplicate chunks for {collection_name} "
+                f"({len(merges)} merged into stored chunks)"
+            )
+        return unique, signatures
+
+    def bulk_add_documents(
+        self,
+        collection_name: str,
+        documents: Iterable[str],
+        metadatas: Optional[Iterable[Dict[str, Any]]] = None,
+        id_prefix: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        **ingestor_options,
+    ) -> Dict[str, Any]:
+        """
+        Load a large document set into a collection, chunking across a process pool.
+
+        Args:
+            collection_name: Target collection
+            documents: Iterable of raw documents; may be a lazy generator
+            metadatas: Optional iterable of metadata, parallel to documents
+            id_prefix: Prefix for the generated chunk ids
+            progress_callback: Called with progress stats after every stored batch
+            **ingestor_options: BulkIngestor options (max_workers, embed_batch_size, ...)
+
+        Returns:
+            Ingestion stats
+
+        In collections configured with configure_deduplication(), every batch
+        is checked for near-duplicates before it is embedded, as in
+        add_documents().
+        """
+        collection = self.get_collection(collection_name)
+        index = self._duplicate_index(collection_name)
+
+        def drop_near_duplicates(chunks):
+            processed = {
+                "chunks": [chunk for _, chunk, _ in chunks],
+                "metadatas": [metadata for _, _, metadata in chunks],
+            }
+            chunk_ids = [chunk_id for chunk_id, _, _ in chunks]
+            keep, signatures = self._drop_near_duplicates(
+                collection_name,
+                collection,
+                index,
+                processed,
+                chunk_ids,
+                list(range(len(chunks))),
+            )
+            # The ingestor stores the batch right away; a failed write resets the index
+            for i in keep:
+                index.add(chunk_ids[i], processed["chunks"][i], signatures.get(i))
+            return [chunks[i] for i in keep]
+
+        ingestor = BulkIngestor(
+            collection,
+            chunk_size=self.document_processor.chunker.chunk_size,
+            chunk_overlap=self.document_processor.chunker.chunk_overlap,
+            chunk_filter=drop_near_duplicates if index is not None else None,
+            **ingestor_options,
+        )
+        try:
+            return ingestor.ingest(
+                documents,
+                metadatas,
+                id_prefix=id_prefix,
+                progress_callback=progress_callback,
+            )
+        except Exception:
+            # Rebuilt from the stored chunks on next use
+            self.dedup_indexes.pop(collection_name, None)
+            raise
+
     def search(
-        self, collection_name: str, query: str, n_results: int = 5
+        self,
+        collection_name: str,
+        query: str,
+        n_results: int = 5,
+        mode: Optional[str] = None,
+        rerank: bool = False,
+        token_budget: Optional[int] = None,
+        where: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        cursor: Optional[str] = None,
+        include_documents: bool = True,
+        query_embedding=None,
     ) -> List[Dict[str, Any]]:
-        """Search for relevant documents in a collection."""
+        """
+        Search for relevant documents in a collection.
+
+        Args:
+            collection_name: Collection to search
+            query: Text query to search for
+            n_results: Number of results to return
+            mode: One of SEARCH_MODES; defaults to the service's default_search_mode
+            rerank: Over-fetch candidates and rescore them locally before returning
+            token_budget: With rerank, cap on the total tokens of returned documents;
+                it covers all pages together, so it can't be combined with a
+                cursor past the first page
+            where: Metadata filter, e.g. {"type": "meeting_summary"}, applied in the index
+            where_document: Document content filter, e.g. {"$contains": "budget"}
+            cursor: Pagination cursor from search_page(); None starts at the top
+            include_documents: Return document text; False returns ids/metadata only
+            query_embedding: Precomputed query embedding, e.g. shared across collections
+
+        Returns:
+            List of matched documents with their metadata and scores
+        """
+        mode = mode or self.default_search_mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(
+                f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}"
+            )
+        offset = decode_cursor(cursor)
+        if rerank and token_budget is not None and offset:
+            raise ValueError(
+                "token_budget caps all pages together; it only applies to the first page"
+            )
+        filters = {"where": where, "where_document": where_document}
+
         try:
             collection = self.get_collection(collection_name)
-            return collection.search(query, n_results)
+            # Rank through the end of the requested page, then cut the page out
+            window = offset + n_results
+            if not rerank:
+                results = self._first_stage_search(
+                    collection,
+                    query,
+                    window,
+                    mode,
+                    include_documents,
+                    query_embedding,
+                    **filters,
+                )
+            else:
+                # The reranker needs document text even for projected results
+                candidates = self._first_stage_search(
+                    collection,
+                    query,
+                    self._rerank_candidates(cursor, window),
+                    mode,
+                    True,
+                    query_embedding,
+                    **filters,
+                )
+                results = self.rerank_results(query, candidates, window, token_budget)
+                if not include_documents:
+                    results = [dict(r, document=None) for r in results]
+            results = results[offset:window]
+            self.hit_tracker.record(collection_name, [r["id"] for r in results])
+            return results
         except Exception as e:
             logger.error(f"Error searching {collection_name}: {str(e)}")
             return []
 
+    def delete_documents(self, collection_name: str, ids: List[str]) -> int:
+        """Remove documents from a collection by id; returns how many were removed."""
+        collection = self.get_collection(collection_name)
+        removed = collection.delete(ids)
+        self.hit_tracker.forget(collection_name, ids)
+        if collection_name in self.dedup_indexes:
+            self.dedup_indexes[collection_name].remove(ids)
+        return removed
+
+    @staticmethod
+    def _embedding_model(collection) -> Optional[str]:
+        embedding_function = getattr(collection, "embedding_function", None)
+        return type(embedding_function).__name__ if embedding_function is not None else None
+
+    def export_snapshot(
+        self, collection_name: str, directory: str, dtype: str = "float32"
+    ) -> str:
+        """
+        Export a collection, with its embeddings, to a versioned snapshot file.
+
+        Args:
+            collection_name: Collection to export
+            directory: Directory for "<collection>.snapshot.npz"
+            dtype: "float32", or "float16" for a smaller file
+
+        Returns:
+            Path of the written snapshot
+        """
+        collection = self.get_collection(collection_name)
+        path = snapshot_path(directory, collection_name)
+        write_snapshot(
+            path,
+            collection_name,
+            collection.export(),
+            embedding_model=self._embedding_model(collection),
+            dtype=dtype,
+        )
+        return path
+
+    def import_snapshot(
+        self, path: str, collection_name: Optional[str] = None, batch_size: int = 5000
+    ) -> int:
+        """
+        Bulk-load a snapshot into a collection using its stored embeddings.
+
+        Documents whose id already exists are left as they are.
+
+        Args:
+            path: Snapshot file written by export_snapshot()
+            collection_name: Target collection (defaults to the exported one)
+            batch_size: Documents per store write
+
+        Returns:
+            Number of documents in the snapshot
+        """
+        snapshot = read_snapshot(path)
+        manifest = snapshot["manifest"]
+        collection_name = collection_name or manifest["collection"]
+        collection = self.get_collection(collection_name)
+
+        model = self._embedding_model(collection)
+        if manifest.get("embedding_model") and model and manifest["embedding_model"] != model:
+            raise ValueError(
+                f"Snapshot {path} was embedded with {manifest['embedding_model']}, "
+                f"but {collection_name} uses {model}"
+            )
+
+        started = time.monotonic()
+        for begin in range(0, manifest["count"], batch_size):
+            end = begin + batch_size
+            collection.add_documents(
+                documents=snapshot["documents"][begin:end],
+                metadatas=snapshot["metadatas"][begin:end],
+                ids=snapshot["ids"][begin:end],
+                embeddings=snapshot["embeddings"][begin:end],
+            )
+        # Rebuilt from the store on next use
+        self.dedup_indexes.pop(collection_name, None)
+        logger.info(
+            f"Imported {manifest['count']} documents into {collection_name} "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+        return manifest["count"]
+
+    def import_snapshots(
+        self,
+        directory: str,
+        collections: Optional[List[str]] = None,
+        only_empty: bool = False,
+    ) -> Dict[str, int]:
+        """
+        Import every snapshot in a directory.
+
+        Args:
+            directory: Directory of "<collection>.snapshot.npz" files
+            collections: Only import these collections
+            only_empty: Skip collections that already hold documents
+
+        Returns:
+            Dictionary mapping imported collections to their document counts
+        """
+        imported = {}
+        for collection_name, path in list_snapshots(directory).items():
+            if collections is not None and collection_name not in collections:
+                continue
+            if only_empty and self.get_collection(collection_name).count():
+                continue
+            try:
+                imported[collection_name] = self.import_snapshot(path, collection_name)
+            except Exception as e:
+                logger.error(f"Error importing snapshot {path}: {str(e)}", exc_info=True)
+        return imported
+
+    def search_page(
+        self, collection_name: str, query: str, page_size: int = 5, **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Search one page of results and return a cursor for the next page.
+
+        Accepts the same keyword arguments as search(), including ``cursor``.
+        With rerank, the candidate set is chosen on the first page and kept
+        in the cursor, so later pages continue the same ranking; the pages
+        end when those candidates run out. A token_budget caps the results
+        of all pages together, so with one there is no next page.
+
+        Returns:
+            Dictionary with "results" and "next_cursor" (None on the last page)
+        """
+        offset = decode_cursor(kwargs.get("cursor"))
+        state = {}
+        if kwargs.get("rerank"):
+            # Every page reranks the first page's candidates, so pages continue one ranking
+            state["candidates"] = self._rerank_candidates(
+                kwargs.get("cursor"), offset + page_size + 1
+            )
+            kwargs["cursor"] = encode_cursor(offset, **state)
+        # Ask for one extra result to learn whether another page exists
+        results = self.search(collection_name, query, page_size + 1, **kwargs)
+        has_more = len(results) > page_size and not (
+            kwargs.get("rerank") and kwargs.get("token_budget") is not None
+        )
+        return {
+            "results": results[:page_size],
+            "next_cursor": encode_cursor(offset + page_size, **state) if has_more else None,
+        }
+
+    @staticmethod
+    def _rerank_candidates(cursor: Optional[str], window: int) -> int:
+        """First-stage candidates to rerank: fixed by a search_page() cursor, else by the window."""
+        return int(cursor_state(cursor).get("candidates") or window * RERANK_CANDIDATE_MULTIPLIER)
+
+    def list_documents(
+        self,
+        collection_name: str,
+        where: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_documents: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        List documents matching filters without a query, one page at a time.
+
+        Returns:
+            Dictionary with "results" and "next_cursor" (None on the last page)
+        """
+        offset = decode_cursor(cursor)
+        try:
+            collection = self.get_collection(collection_name)
+            results = collection.get_documents(
+                where=where,
+                where_document=where_document,
+                limit=limit + 1,
+                offset=offset,
+                include_documents=include_documents,
+            )
+        except Exception as e:
+            logger.error(f"Error listing documents in {collection_name}: {str(e)}")
+            results = []
+
+        has_more = len(results) > limit
+        return {
+            "results": results[:limit],
+            "next_cursor": encode_cursor(offset + limit) if has_more else None,
+        }
+
+    def rerank_results(
+        self,
+        query: str,
+        candidates: List[Dict[str, Any]],
+        n_results: int = 5,
+        token_budget: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Rescore candidates with the local reranker and trim them to n_results/token_budget."""
+        return rerank(
+            query,
+            candidates,
+            n_results=n_results,
+            token_budget=token_budget,
+            count_tokens=self.document_processor._num_tokens,
+        )
+
+    def _first_stage_search(
+        self,
+        collection: VectorStore,
+        query: str,
+        n_results: int,
+        mode: str,
+        include_documents: bool = True,
+        query_embedding=None,
+        **filters,
+    ) -> List[Dict[str, Any]]:
+        if mode == "auto":
+            if len(tokenize(query)) <= KEYWORD_QUERY_MAX_TERMS:
+                results = collection.lexical_search(
+                    query, n_results, include_documents=include_documents, **filters
+                )
+                if results:
+                    return results
+            mode = "hybrid"
+
+        if mode == "lexical":
+            return collection.lexical_search(
+                query, n_results, include_documents=include_documents, **filters
+            )
+        if mode == "hybrid":
+            return self._hybrid_search(
+                collection, query, n_results, include_documents, query_embedding, **filters
+            )
+        return collection.search(
+            query,
+            n_results,
+            include_documents=include_documents,
+            query_embedding=query_embedding,
+            **filters,
+        )
+
+    def _hybrid_search(
+        self,
+        collection: VectorStore,
+        query: str,
+        n_results: int,
+        include_documents: bool = True,
+        query_embedding=None,
+        **filters,
+    ) -> List[Dict[str, Any]]:
+        """Fuse vector and BM25 rankings with reciprocal-rank fusion."""
+        # Over-fetch from both retrievers so fusion has overlap to work with
+        n_candidates = max(n_results * 2, 10)
+        vector_results = collection.search(
+            query,
+            n_candidates,
+            include_documents=include_documents,
+            query_embedding=query_embedding,
+            **filters,
+        )
+        lexical_results = collection.lexical_search(
+            query, n_candidates, include_documents=include_documents, **filters
+        )
+        return reciprocal_rank_fusion(
+            [vector_results, lexical_results], n_results=n_results
+        )
+
     # Remove or comment out the LangChain-specific methods:
     # def get_retriever(self, ...): ...
     # def get_merged_retriever(self, ...): ...
@@ -137,8 +803,101 @@ class RAGService:
         """List all shared collections."""
         return self.shared_collections
 
+    def warm_up(self, collection_names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        Open collections and load their indexes so the first query doesn't pay for it.
+
+        Args:
+            collection_names: Collections to warm (defaults to all shared collections)
+
+        Returns:
+            Dictionary mapping each warmed collection to the seconds it took
+        """
+        if collection_names is None:
+            collection_names = list(self.shared_collections)
+
+        timings = {}
+        for collection_name in collection_names:
+            started = time.monotonic()
+            try:
+                self.get_collection(collection_name).warm_up()
+                timings[collection_name] = time.monotonic() - started
+                logger.info(
+                    f"Warmed up collection {collection_name} in {timings[collection_name]:.2f}s"
+                )
+            except Exception as e:
+                logger.error(f"Error warming up collection {collection_name}: {str(e)}")
+        return timings
+
+    def route_query(
+        self,
+        query: str,
+        collections: Iterable[str],
+        top_n: Optional[int] = None,
+        margin: Optional[float] = None,
+    ):
+        """
+        Choose which collections to search for a query from their centroids.
+
+        The query is embedded once per embedding model and compared with each
+        collection's centroid statistics; only the closest top_n collections,
+        plus any within ``margin`` of them, are kept.
+
+        Args:
+            query: Text query
+            collections: Candidate collections
+            top_n: Collections to search at least (default RAG_ROUTING_TOP_N)
+            margin: Recall safety margin in embedding distance (default RAG_ROUTING_MARGIN)
+
+        Returns:
+            (selected collection names, closest first; query embedding per selected collection)
+        """
+        top_n = DEFAULT_ROUTING_TOP_N if top_n is None else top_n
+        margin = DEFAULT_ROUTING_MARGIN if margin is None else margin
+
+        collections = list(collections)
+        # Distances are only comparable between collections of the same model
+        groups: Dict[int, Dict[str, Any]] = {}
+        for collection_name in collections:
+            collection = self.get_collection(collection_name)
+            embedding_function = getattr(collection, "embedding_function", None)
+            group = groups.setdefault(
+                id(embedding_function), {"embedding_function": embedding_function, "stats": {}}
+            )
+            try:
+                group["stats"][collection_name] = collection.centroid_stats()
+            except Exception as e:
+                logger.warning(f"No centroid for {collection_name}: {str(e)}")
+                group["stats"][collection_name] = None
+
+        selected, query_embeddings = [], {}
+        for group in groups.values():
+            # Empty groups (only empty collections) don't need an embedding
+            if not any(stats is None or stats.count for stats in group["stats"].values()):
+                continue
+            try:
+                query_vector = embed_query(query, group["embedding_function"])
+            except Exception as e:
+                # Without a query vector there is nothing to route on; search everything
+                logger.error(f"Error embedding query for routing: {str(e)}")
+                return collections, {}
+            for collection_name in plan_collections(query_vector, group["stats"], top_n, margin):
+                selected.append(collection_name)
+                query_embeddings[collection_name] = query_vector
+        candidates = sum(len(group["stats"]) for group in groups.values())
+        logger.info(f"Routed query to {selected} of {candidates} collections")
+        return selected, query_embeddings
+
     def search_across_collections(
-        self, query: str, n_results: int = 5, collections: Optional[List[str]] = None
+        self,
+        query: str,
+        n_results: int = 5,
+        collections: Optional[List[str]] = None,
+        mode: Optional[str] = None,
+        route: bool = False,
+        top_n: Optional[int] = None,
+        margin: Optional[float] = None,
+        **search_kwargs,
     ) -> Dict[str, List[Dict[str, Any]]]:
         """
         Search across multiple collections and return combined results.
@@ -147,19 +906,36 @@ class RAGService:
             query: Text query to search for
             n_results: Number of results to return per collection
             collections: Specific collections to search (defaults to all shared collections)
+            mode: Search mode passed through to search()
+            route: Search only the collections route_query() picks for the query
+            top_n: With route, collections searched at least
+            margin: With route, recall safety margin (see plan_collections)
+            **search_kwargs: Other search() options such as where, where_document,
+                cursor and include_documents, applied to every collection
 
         Returns:
-            Dictionary mapping collection names to their search results
+            Dictionary mapping searched collection names to their search results
         """
         if collections is None:
             collections = list(self.shared_collections)
 
+        query_embeddings = {}
+        if route:
+            collections, query_embeddings = self.route_query(
+                query, collections, top_n, margin
+            )
+
         results = {}
         for collection_name in collections:
             if collection_name in self.collections:
                 try:
                     results[collection_name] = self.search(
-                        collection_name, query, n_results
+                        collection_name,
+                        query,
+                        n_results,
+                        mode=mode,
+                        query_embedding=query_embeddings.get(collection_name),
+                        **search_kwargs,
                     )
                 except Exception as e:
                     logger.error(
@@ -0,0 +1,122 @@
+from typing import List, Dict, Any, Optional, Callable, Set
+
+from .lexical_index import tokenize
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Dict[str, Any]]], n_results: int = 5, k: int = 60
+) -> List[Dict[str, Any]]:
+    """
+    Fuse several ranked result lists with reciprocal-rank fusion.
+
+    Args:
+        result_lists: Ranked search results, each item carrying an "id"
+        n_results: Number of fused results to return
+        k: RRF damping constant; larger values flatten the rank contribution
+
+    Returns:
+        Fused results ordered by RRF score, stored under "score"
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+
+    for results in result_lists:
+        for rank, result in enumerate(results):
+            doc_id = result["id"]
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+            if doc_id not in fused:
+                fused[doc_id] = dict(result)
+            elif fused[doc_id].get("distance") is None:
+                # Keep the vector distance when any list provides it
+                fused[doc_id]["distance"] = result.get("distance")
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    output = []
+    for doc_id, score in ranked[:n_results]:
+        result = fused[doc_id]
+        result["score"] = score
+        output.append(result)
+    return output
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def rerank(
+    query: str,
+    candidates: List[Dict[str, Any]],
+    n_results: int = 5,
+    token_budget: Optional[int] = None,
+    diversity: float = 0.3,
+    count_tokens: Optional[Callable[[str], int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Rescore first-stage candidates locally and pick a diverse, deduplicated top-k.
+
+    Relevance blends query-term overlap with the candidate's first-stage rank;
+    selection uses maximal marginal relevance so near-copies don't crowd the top.
+
+    Args:
+        query: The search query
+        candidates: First-stage results, best first
+        n_results: Maximum number of results to return
+        token_budget: Optional cap on the total tokens of returned documents
+        diversity: MMR trade-off; 0 ranks purely by relevance
+        count_tokens: Token counter used for the budget (defaults to len // 4)
+
+    Returns:
+        Selected results, each annotated with a "rerank_score"
+    """
+    count_tokens = count_tokens or (lambda text: len(text) // 4)
+    query_terms = set(tokenize(query))
+
+    # Drop exact duplicates, keeping the best-ranked copy
+    seen_texts = set()
+    pool = []
+    for rank, candidate in enumerate(candidates):
+        normalized = _normalize_text(candidate.get("document", ""))
+        if not normalized or normalized in seen_texts:
+            continue
+        seen_texts.add(normalized)
+
+        terms = set(tokenize(normalized))
+        overlap = len(query_terms & terms) / len(query_terms) if query_terms else 0.0
+        rank_prior = 1.0 / (1 + rank)
+        pool.append(
+            {
+                "result": candidate,
+                "terms": terms,
+                "relevance": 0.7 * overlap + 0.3 * rank_prior,
+                "tokens": count_tokens(candidate.get("document", "")),
+            }
+        )
+
+    selected = []
+    used_tokens = 0
+    while pool and len(selected) < n_results:
+        best_index, best_score = None, None
+        for index, item in enumerate(pool):
+            redundancy = max(
+                (_jaccard(item["terms"], chosen["terms"]) for chosen in selected),
+                default=0.0,
+            )
+            score = (1 - diversity) * item["relevance"] - diversity * redundancy
+            if best_score is None or score > best_score:
+                best_index, best_score = index, score
+
+        item = pool.pop(best_index)
+        if token_budget is not None and used_tokens + item["tokens"] > token_budget:
+            # Doesn't fit; a shorter candidate further down still might
+            continue
+        used_tokens += item["tokens"]
+        item["result"] = dict(item["result"], rerank_score=best_score)
+        selected.append(item)
+
+    return [item["result"] for item in selected]
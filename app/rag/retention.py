@@ -0,0 +1,224 @@
+import threading
+import time
+from typing import List, Dict, Any, Optional, Iterable
+import logging
+
+from .dedup import NearDuplicateIndex
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Retention policy keys (all optional):
+#   ttl_seconds: remove documents whose "ingested_at" is older than this
+#   max_documents: evict least recently used documents beyond this count
+#   merge_duplicates: keep one copy of each group of near-duplicate documents
+#   duplicate_threshold: MinHash similarity for merge_duplicates (default 0.85)
+#   where: metadata filter selecting the documents the policy manages;
+#       others (e.g. seeded reference material) are never removed
+POLICY_KEYS = ("ttl_seconds", "max_documents", "merge_duplicates", "duplicate_threshold", "where")
+
+
+class HitTracker:
+    """
+    Records when documents are returned by searches.
+
+    Used for LRU eviction: a document's last use is its latest search hit, or
+    its ingestion time if it was never returned. Hits are kept in memory only;
+    after a restart documents fall back to their ingestion time.
+    """
+
+    def __init__(self):
+        self._hits: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, collection_name: str, ids: Iterable[str]):
+        now = time.time()
+        with self._lock:
+            hits = self._hits.setdefault(collection_name, {})
+            for doc_id in ids:
+                hits[doc_id] = now
+
+    def last_hit(self, collection_name: str, doc_id: str) -> Optional[float]:
+        with self._lock:
+            return self._hits.get(collection_name, {}).get(doc_id)
+
+    def forget(self, collection_name: str, ids: Iterable[str]):
+        with self._lock:
+            hits = self._hits.get(collection_name, {})
+            for doc_id in ids:
+                hits.pop(doc_id, None)
+
+
+def plan_retention(
+    documents: List[Dict[str, Any]],
+    policy: Dict[str, Any],
+    last_used: Dict[str, float],
+    now: Optional[float] = None,
+) -> Dict[str, List[str]]:
+    """
+    Decide which documents a policy removes.
+
+    Args:
+        documents: Managed documents ({"id", "document", "metadata"})
+        policy: Retention policy (see POLICY_KEYS)
+        last_used: Last use time per document id
+        now: Current time (defaults to time.time())
+
+    Returns:
+        Ids to remove, grouped as "expired", "merged" and "evicted"
+    """
+    now = now or time.time()
+    plan = {"expired": [], "merged": [], "evicted": []}
+    remaining = list(documents)
+
+    ttl = policy.get("ttl_seconds")
+    if ttl:
+        cutoff = now - ttl
+        kept = []
+        for doc in remaining:
+            ingested_at = (doc.get("metadata") or {}).get("ingested_at")
+            if ingested_at is not None and ingested_at < cutoff:
+                plan["expired"].append(doc["id"])
+            else:
+                kept.append(doc)
+        remaining = kept
+
+    if policy.get("merge_duplicates"):
+        # Keep the most recently used copy of each group
+        survivors = NearDuplicateIndex(policy.get("duplicate_threshold", 0.85))
+        for doc in sorted(remaining, key=lambda d: last_used.get(d["id"], 0.0), reverse=True):
+            text = doc.get("document") or ""
+            signature = survivors.signature(text)
+            if survivors.find(text, signature):
+                plan["merged"].append(doc["id"])
+            else:
+                survivors.add(doc["id"], text, signature)
+        merged = set(plan["merged"])
+        remaining = [doc for doc in remaining if doc["id"] not in merged]
+
+    max_documents = policy.get("max_documents")
+    if max_documents is not None and len(remaining) > max_documents:
+        by_use = sorted(remaining, key=lambda d: last_used.get(d["id"], 0.0))
+        plan["evicted"] = [doc["id"] for doc in by_use[: len(remaining) - max_documents]]
+
+    return plan
+
+
+class RetentionCompactor:
+    """
+    Applies per-collection retention policies, on demand or periodically.
+
+    Each pass lists a collection's managed documents, plans removals (TTL,
+    duplicate merging, LRU eviction beyond max_documents) and deletes them
+    through the store, which updates its indexes in place. Reports of the
+    latest pass per collection are kept in ``last_reports``.
+
+    Given a leader lease, background passes run only in the worker process
+    holding it (LRU eviction then sees the search hits of that process).
+    """
+
+    def __init__(
+        self,
+        rag_service,
+        policies: Optional[Dict[str, Dict[str, Any]]] = None,
+        interval_seconds: float = 3600.0,
+        leader=None,
+    ):
+        """
+        Args:
+            rag_service: RAGService whose collections are compacted
+            policies: Retention policy per collection name
+            interval_seconds: Time between background passes
+            leader: LeaderLease gating background passes across worker processes
+        """
+        self.rag_service = rag_service
+        self.policies: Dict[str, Dict[str, Any]] = {}
+        for collection_name, policy in (policies or {}).items():
+            self.set_policy(collection_name, **policy)
+        self.interval_seconds = interval_seconds
+        self.leader = leader
+        self.last_reports: Dict[str, Dict[str, Any]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def set_policy(self, collection_name: str, **policy):
+        """Set (or replace) the retention policy of a collection."""
+        unknown = set(policy) - set(POLICY_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown retention settings {sorted(unknown)}, expected {POLICY_KEYS}")
+        self.policies[collection_name] = policy
+
+    def _last_used(self, collection_name: str, documents: List[Dict[str, Any]]) -> Dict[str, float]:
+        tracker = self.rag_service.hit_tracker
+        last_used = {}
+        for doc in documents:
+            hit = tracker.last_hit(collection_name, doc["id"])
+            ingested_at = (doc.get("metadata") or {}).get("ingested_at") or 0.0
+            last_used[doc["id"]] = max(hit or 0.0, ingested_at)
+        return last_used
+
+    def compact(self, collection_name: str) -> Dict[str, Any]:
+        """
+        Apply a collection's policy once.
+
+        Returns:
+            Report with the removed ids per reason, the remaining managed
+            document count and the time taken
+        """
+        policy = self.policies.get(collection_name, {})
+        started = time.monotonic()
+        collection = self.rag_service.get_collection(collection_name)
+
+        documents = collection.get_documents(
+            where=policy.get("where"),
+            include_documents=bool(policy.get("merge_duplicates")),
+        )
+        plan = plan_retention(documents, policy, self._last_used(collection_name, documents))
+
+        removed = plan["expired"] + plan["merged"] + plan["evicted"]
+        if removed:
+            self.rag_service.delete_documents(collection_name, removed)
+
+        report = {
+            "collection": collection_name,
+            **plan,
+            "removed": len(removed),
+            "remaining": len(documents) - len(removed),
+            "seconds": time.monotonic() - started,
+            "finished_at": time.time(),
+        }
+        self.last_reports[collection_name] = report
+        logger.info(
+            f"Compacted {collection_name}: {len(plan['expired'])} expired, "
+            f"{len(plan['merged'])} merged, {len(plan['evicted'])} evicted, "
+            f"{report['remaining']} remaining"
+        )
+        return report
+
+    def compact_all(self) -> List[Dict[str, Any]]:
+        """Apply every configured policy; a failing collection doesn't stop the others."""
+        reports = []
+        for collection_name in list(self.policies):
+            try:
+                reports.append(self.compact(collection_name))
+            except Exception as e:
+                logger.error(f"Error compacting {collection_name}: {str(e)}", exc_info=True)
+        return reports
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            if self.leader is None or self.leader.is_leader():
+                self.compact_all()
+
+    def start(self):
+        """Run compact_all() every interval_seconds on a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rag-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,143 @@
+"""
+Per-collection centroid statistics and query routing across collections.
+
+Each store keeps a CentroidStats of its embeddings (count, vector sum and
+sum of squared norms), updated as documents are added and deleted. From
+these the router estimates how close a query can get to a collection's
+documents and searches only the most promising collections, so fan-out
+stays constant as domains and tenants add collections.
+"""
+
+import json
+import os
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+# Collections searched per routed query, and the slack (in embedding
+# distance) within which further collections are searched as well
+DEFAULT_ROUTING_TOP_N = int(os.getenv("RAG_ROUTING_TOP_N", 2))
+DEFAULT_ROUTING_MARGIN = float(os.getenv("RAG_ROUTING_MARGIN", 0.1))
+
+
+class CentroidStats:
+    """Running count, vector sum and squared-norm sum of a collection's embeddings."""
+
+    def __init__(
+        self,
+        count: int = 0,
+        vector_sum: Optional[np.ndarray] = None,
+        sq_norm_sum: float = 0.0,
+    ):
+        self.count = count
+        self.vector_sum = vector_sum
+        self.sq_norm_sum = sq_norm_sum
+
+    def add(self, vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float64)
+        if not len(vectors):
+            return
+        if self.vector_sum is None:
+            self.vector_sum = np.zeros(vectors.shape[1], dtype=np.float64)
+        self.count += len(vectors)
+        self.vector_sum += vectors.sum(axis=0)
+        self.sq_norm_sum += float(np.einsum("ij,ij->", vectors, vectors))
+
+    def remove(self, vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float64)
+        if not len(vectors) or self.vector_sum is None:
+            return
+        self.count = max(self.count - len(vectors), 0)
+        if not self.count:
+            # Start clean rather than carry rounding error
+            self.vector_sum = None
+            self.sq_norm_sum = 0.0
+            return
+        self.vector_sum -= vectors.sum(axis=0)
+        self.sq_norm_sum -= float(np.einsum("ij,ij->", vectors, vectors))
+
+    @property
+    def centroid(self) -> Optional[np.ndarray]:
+        if not self.count:
+            return None
+        return self.vector_sum / self.count
+
+    @property
+    def radius(self) -> float:
+        """Root-mean-square distance of the embeddings from the centroid."""
+        if not self.count:
+            return 0.0
+        centroid = self.centroid
+        return float(np.sqrt(max(self.sq_norm_sum / self.count - centroid @ centroid, 0.0)))
+
+    def distance(self, query_vector: np.ndarray) -> float:
+        """
+        Estimated distance from a query to the collection's nearest documents.
+
+        The query's distance to the centroid, less the collection's radius:
+        broad collections are not penalized for having a distant centroid.
+        """
+        difference = np.asarray(query_vector, dtype=np.float64) - self.centroid
+        return max(float(np.sqrt(difference @ difference)) - self.radius, 0.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "vector_sum": None if self.vector_sum is None else self.vector_sum.tolist(),
+            "sq_norm_sum": self.sq_norm_sum,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CentroidStats":
+        vector_sum = data.get("vector_sum")
+        return cls(
+            data.get("count", 0),
+            None if vector_sum is None else np.asarray(vector_sum, dtype=np.float64),
+            data.get("sq_norm_sum", 0.0),
+        )
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CentroidStats"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+
+def plan_collections(
+    query_vector: np.ndarray,
+    stats: Dict[str, Optional[CentroidStats]],
+    top_n: int = DEFAULT_ROUTING_TOP_N,
+    margin: float = DEFAULT_ROUTING_MARGIN,
+) -> List[str]:
+    """
+    Pick the collections worth searching for a query.
+
+    Args:
+        query_vector: Query embedding
+        stats: Centroid statistics per candidate collection; None when unknown
+        top_n: Collections to search at least
+        margin: Also search collections whose estimated distance is within
+            this much of the top_n-th closest, as a recall safety margin
+
+    Returns:
+        Collection names, closest first. Empty collections are dropped and
+        collections without statistics are always kept.
+    """
+    unknown = [name for name, stat in stats.items() if stat is None]
+    scored = sorted(
+        (stat.distance(query_vector), name)
+        for name, stat in stats.items()
+        if stat is not None and stat.count
+    )
+    top_n = max(top_n, 1)
+    if len(scored) > top_n:
+        cutoff = scored[top_n - 1][0] + margin
+        scored = [entry for entry in scored if entry[0] <= cutoff]
+    return [name for _, name in scored] + unknown
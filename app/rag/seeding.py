@@ -0,0 +1,258 @@
+"""
+Declarative, versioned seeding of reference knowledge.
+
+Agents and the KnowledgeRegistry register seed corpora (fixed documents a
+collection should always contain) under a name. Each seed has a version
+hash of its content, and a small JSON manifest next to the vector stores
+records which version of each seed has been written. Seeding runs once at
+deploy or startup (seed_all); at runtime, checking a seed is a dictionary
+lookup rather than a scan of the collection.
+
+Usage:
+    python -m app.rag.seeding
+    python -m app.rag.seeding --force
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional
+import logging
+
+from .file_lock import file_lock
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_MANIFEST_PATH = os.getenv(
+    "RAG_SEED_MANIFEST", os.path.join("./chroma_db", "seed_manifest.json")
+)
+
+
+def seed_version(
+    collection_name: str,
+    documents: List[str],
+    metadatas: List[Dict[str, Any]],
+    ids: List[str],
+) -> str:
+    """Hash of everything a seed writes; any edit to the corpus changes it."""
+    payload = json.dumps([collection_name, documents, metadatas, ids], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class KnowledgeSeeder:
+    """
+    Registry of seed corpora and the manifest of what has been seeded.
+
+    The manifest maps seed names to {"collection", "version", "ids", "count",
+    "seeded_at"}. It is read once per process and rewritten atomically after
+    each seed, so a seed is written again only when its content changes (or
+    the manifest is removed). Seeding holds a file lock and re-reads the
+    manifest first, so worker processes sharing it don't seed twice.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "KnowledgeSeeder":
+        """Singleton pattern to ensure a single seeder."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = KnowledgeSeeder()
+            return cls._instance
+
+    def __init__(self, manifest_path: str = DEFAULT_MANIFEST_PATH, rag_service=None):
+        """
+        Args:
+            manifest_path: JSON file recording seeded versions
+            rag_service: Service to write through (defaults to the RAGService singleton)
+        """
+        self.manifest_path = manifest_path
+        self._rag_service = rag_service
+        self.seeds: Dict[str, Dict[str, Any]] = {}
+        self.manifest: Dict[str, Dict[str, Any]] = self._load_manifest()
+        self._lock = threading.RLock()
+        # LeaderLease of the worker process that seeds, when there are several
+        self.leader = None
+
+    @property
+    def rag_service(self):
+        if self._rag_service is None:
+            from .rag_service import RAGService
+
+            self._rag_service = RAGService.get_instance()
+        return self._rag_service
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable seed manifest {self.manifest_path}: {str(e)}")
+            return {}
+
+    def _save_manifest(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.manifest_path)), exist_ok=True)
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def register(
+        self,
+        name: str,
+        collection_name: str,
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Register (or replace) a seed corpus.
+
+        Args:
+            name: Unique seed name
+            collection_name: Collection the seed is written to
+            documents: Seed documents
+            metadatas: Optional metadata per document
+            ids: Optional ids per document (defaults to "<name>_<i>")
+
+        Returns:
+            The seed's version hash
+        """
+        metadatas = metadatas or [{} for _ in documents]
+        ids = ids or [f"{name}_{i}" for i in range(len(documents))]
+        if not (len(documents) == len(metadatas) == len(ids)):
+            raise ValueError(f"Seed '{name}' needs one metadata dict and id per document")
+
+        version = seed_version(collection_name, documents, metadatas, ids)
+        with self._lock:
+            self.seeds[name] = {
+                "collection": collection_name,
+                "documents": list(documents),
+                "metadatas": list(metadatas),
+                "ids": list(ids),
+                "version": version,
+            }
+        return version
+
+    def is_seeded(self, name: str) -> bool:
+        """Whether the registered version of a seed has been written (manifest lookup only)."""
+        seed = self.seeds.get(name)
+        entry = self.manifest.get(name)
+        return seed is not None and entry is not None and entry.get("version") == seed["version"]
+
+    def pending(self) -> List[str]:
+        """Names of registered seeds that are missing or outdated."""
+        return [name for name in self.seeds if not self.is_seeded(name)]
+
+    def seed(self, name: str, force: bool = False) -> bool:
+        """
+        Write a seed if its current version hasn't been written yet.
+
+        A changed seed replaces the documents of its previous version.
+
+        Returns:
+            True if documents were written
+        """
+        with self._lock, file_lock(self.manifest_path + ".lock"):
+            if name not in self.seeds:
+                raise KeyError(f"Unknown seed '{name}'")
+            # Another worker process may have written it since the manifest was read
+            self.manifest = self._load_manifest()
+            if self.is_seeded(name) and not force:
+                return False
+
+            seed = self.seeds[name]
+            previous = self.manifest.get(name)
+            if previous:
+                # Ids are stable across versions, so stale copies must go first
+                stale = set(previous.get("ids", [])) | set(seed["ids"])
+                self.rag_service.delete_documents(previous["collection"], sorted(stale))
+
+            self.rag_service.add_documents(
+                collection_name=seed["collection"],
+                documents=seed["documents"],
+                metadatas=[dict(metadata) for metadata in seed["metadatas"]],
+                ids=seed["ids"],
+            )
+            # add_documents logs and swallows failures (e.g. no embedding
+            # model); a seed whose documents aren't all stored stays pending
+            stored = {
+                doc["id"]
+                for doc in self.rag_service.get_collection(seed["collection"]).get_documents(
+                    ids=seed["ids"], include_documents=False
+                )
+            }
+            missing = set(seed["ids"]) - stored
+            if missing:
+                raise RuntimeError(
+                    f"{len(missing)} of {len(seed['ids'])} documents of seed '{name}' were not stored"
+                )
+            self.manifest[name] = {
+                "collection": seed["collection"],
+                "version": seed["version"],
+                "ids": seed["ids"],
+                "count": len(seed["documents"]),
+                "seeded_at": time.time(),
+            }
+            self._save_manifest()
+            logger.info(
+                f"Seeded {name} ({len(seed['documents'])} documents, version "
+                f"{seed['version']}) into {seed['collection']}"
+            )
+            return True
+
+    def ensure_seeded(self, name: str) -> bool:
+        """
+        Constant-time check that a seed is in place, seeding it only if it is not.
+
+        For processes that skipped startup seeding (scripts, tests); in the
+        app, seed_all() has already run and this is a dictionary lookup.
+        """
+        if self.is_seeded(name):
+            return False
+        if self.leader is not None and not self.leader.is_leader():
+            # The leader seeds at startup; other workers don't write
+            return False
+        try:
+            return self.seed(name)
+        except Exception as e:
+            logger.error(f"Error seeding {name}: {str(e)}", exc_info=True)
+            return False
+
+    def seed_all(self, force: bool = False) -> Dict[str, bool]:
+        """
+        Write every missing or outdated seed; a failing seed doesn't stop the others.
+
+        Returns:
+            Dictionary mapping seed names to whether they were written
+        """
+        written = {}
+        for name in list(self.seeds):
+            try:
+                written[name] = self.seed(name, force)
+            except Exception as e:
+                logger.error(f"Error seeding {name}: {str(e)}", exc_info=True)
+                written[name] = False
+        return written
+
+
+def main(argv: Optional[List[str]] = None):
+    from app.core.knowledge_registry import KnowledgeRegistry
+
+    parser = argparse.ArgumentParser(description="Write registered knowledge seeds")
+    parser.add_argument("--force", action="store_true", help="Rewrite seeds already in the manifest")
+    args = parser.parse_args(argv)
+
+    for name, written in KnowledgeRegistry.get_instance().seed_knowledge(args.force).items():
+        print(f"{name}: {'seeded' if written else 'up to date'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Versioned collection snapshots: ids, documents, metadata and raw embeddings.
+
+A snapshot is a single .npz file holding only plain NumPy arrays (it loads
+with allow_pickle=False). Strings are stored as one UTF-8 blob plus offsets,
+metadata as JSON, embeddings as a float32 or float16 matrix, and a JSON
+manifest records the format version, collection, counts and embedding model.
+
+Usage:
+    python -m app.rag.snapshot export --collection seo_knowledge --directory snapshots
+    python -m app.rag.snapshot import --directory snapshots
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List, Dict, Any, Optional
+import numpy as np
+import logging
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_SUFFIX = ".snapshot.npz"
+
+
+def snapshot_path(directory: str, collection_name: str) -> str:
+    return os.path.join(directory, f"{collection_name}{SNAPSHOT_SUFFIX}")
+
+
+def _encode_strings(values: List[str]):
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = blob.tobytes()
+    return [raw[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def _encode_json(value: Any) -> np.ndarray:
+    return np.frombuffer(json.dumps(value).encode("utf-8"), dtype=np.uint8)
+
+
+def _decode_json(array: np.ndarray) -> Any:
+    return json.loads(array.tobytes().decode("utf-8"))
+
+
+def write_snapshot(
+    path: str,
+    collection_name: str,
+    records: Dict[str, Any],
+    embedding_model: Optional[str] = None,
+    dtype: str = "float32",
+) -> Dict[str, Any]:
+    """
+    Write a collection export (see VectorStore.export) to ``path``.
+
+    Args:
+        path: Target file, replaced atomically
+        collection_name: Collection the records came from
+        records: {"ids", "documents", "metadatas", "embeddings"}
+        embedding_model: Name of the embedding function, checked on import
+        dtype: "float32", or "float16" to halve the embedding size
+
+    Returns:
+        The snapshot manifest
+    """
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"Unsupported snapshot dtype '{dtype}'")
+    embeddings = np.asarray(records["embeddings"], dtype=dtype)
+    ids_blob, ids_offsets = _encode_strings(records["ids"])
+    documents_blob, documents_offsets = _encode_strings(
+        [document or "" for document in records["documents"]]
+    )
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "collection": collection_name,
+        "count": len(records["ids"]),
+        "dim": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+        "dtype": dtype,
+        "embedding_model": embedding_model,
+        "created_at": time.time(),
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # np.savez appends ".npz" to names without it
+    temp_path = path + ".tmp.npz"
+    np.savez(
+        temp_path,
+        manifest=_encode_json(manifest),
+        ids_blob=ids_blob,
+        ids_offsets=ids_offsets,
+        documents_blob=documents_blob,
+        documents_offsets=documents_offsets,
+        metadatas=_encode_json(records["metadatas"]),
+        embeddings=embeddings,
+    )
+    os.replace(temp_path, path)
+    logger.info(f"Wrote snapshot of {collection_name} ({manifest['count']} documents) to {path}")
+    return manifest
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """Read only the manifest of a snapshot."""
+    with np.load(path, allow_pickle=False) as data:
+        return _decode_json(data["manifest"])
+
+
+def read_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Load a snapshot written by write_snapshot().
+
+    Returns:
+        {"manifest", "ids", "documents", "metadatas", "embeddings"} with float32 embeddings
+    """
+    with np.load(path, allow_pickle=False) as data:
+        manifest = _decode_json(data["manifest"])
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot format {manifest.get('format_version')} in {path}"
+            )
+        return {
+            "manifest": manifest,
+            "ids": _decode_strings(data["ids_blob"], data["ids_offsets"]),
+            "documents": _decode_strings(data["documents_blob"], data["documents_offsets"]),
+            "metadatas": _decode_json(data["metadatas"]),
+            "embeddings": data["embeddings"].astype(np.float32),
+        }
+
+
+def list_snapshots(directory: str) -> Dict[str, str]:
+    """Map collection names to snapshot files in a directory."""
+    if not os.path.isdir(directory):
+        return {}
+    return {
+        name[: -len(SNAPSHOT_SUFFIX)]: os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.endswith(SNAPSHOT_SUFFIX)
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    from app.core.knowledge_registry import KnowledgeRegistry
+
+    parser = argparse.ArgumentParser(description="Export or import RAG collection snapshots")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("--directory", required=True)
+    parser.add_argument(
+        "--collection",
+        action="append",
+        help="Collection to export/import (repeatable); defaults to all",
+    )
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    args = parser.parse_args(argv)
+
+    # The registry applies the configured backend of each collection
+    rag_service = KnowledgeRegistry.get_instance().rag_service
+    if args.action == "export":
+        collections = args.collection or sorted(rag_service.list_shared_collections())
+        for collection_name in collections:
+            path = rag_service.export_snapshot(collection_name, args.directory, args.dtype)
+            print(f"Exported {collection_name} to {path}")
+    else:
+        imported = rag_service.import_snapshots(args.directory, args.collection)
+        for collection_name, count in imported.items():
+            print(f"Imported {count} documents into {collection_name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,55 @@ import os
 import chromadb
 from chromadb.config import Settings
 from typing import List, Dict, Any, Optional
+import numpy as np
 import logging
 
+from .lexical_index import BM25Index
+from .embeddings import embed_texts, get_default_embedding_function
+from .routing import CentroidStats
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# HNSW settings accepted per collection, stored by Chroma as "hnsw:<key>" metadata
+HNSW_PARAMS = ("space", "construction_ef", "search_ef", "M")
+
+
+def hnsw_metadata(hnsw: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Convert {"space": "cosine", "M": 32, ...} into Chroma collection metadata."""
+    if not hnsw:
+        return None
+    unknown = set(hnsw) - set(HNSW_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown HNSW parameters {sorted(unknown)}, expected {HNSW_PARAMS}")
+    return {f"hnsw:{key}": value for key, value in hnsw.items()}
+
+
+def chroma_collection_exists(collection_name: str, persist_directory: str = "./chroma_db") -> bool:
+    """Whether a Chroma collection is stored in ``persist_directory``, without creating either."""
+    if not os.path.exists(os.path.join(persist_directory, "chroma.sqlite3")):
+        return False
+    client = chromadb.PersistentClient(path=persist_directory)
+    return any(collection.name == collection_name for collection in client.list_collections())
+
 
 class VectorStore:
-    def __init__(self, collection_name: str, persist_directory: str = "./chroma_db"):
+    def __init__(
+        self,
+        collection_name: str,
+        persist_directory: str = "./chroma_db",
+        embedding_function=None,
+        hnsw: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            collection_name: Name of the Chroma collection
+            persist_directory: Directory of the persistent Chroma client
+            embedding_function: Embedding function; defaults to the shared one
+            hnsw: Optional HNSW settings (space, construction_ef, search_ef, M).
+                Chroma fixes these when a collection is created, so they only
+                apply to new collections.
+        """
         # Initialize ChromaDB client with updated configuration
         logger.info(
             f"Initializing ChromaDB client with persist_directory={persist_directory}"
@@ -19,8 +60,20 @@ class VectorStore:
             # New client initialization pattern according to ChromaDB migration docs
             self.client = chromadb.PersistentClient(path=persist_directory)
 
-            # Get or create collection
-            self.collection = self.client.get_or_create_collection(name=collection_name)
+            embedding_function = embedding_function or get_default_embedding_function()
+            self.embedding_function = embedding_function
+            metadata = hnsw_metadata(hnsw)
+            try:
+                self.collection = self.client.get_collection(
+                    name=collection_name, embedding_function=embedding_function
+                )
+                self._check_hnsw_settings(metadata)
+            except ValueError:
+                self.collection = self.client.create_collection(
+                    name=collection_name,
+                    metadata=metadata,
+                    embedding_function=embedding_function,
+                )
             logger.info(f"Successfully connected to collection: {collection_name}")
 
         except Exception as e:
@@ -28,11 +81,78 @@ class VectorStore:
             # Re-raise to handle it upstream
             raise
 
+        # Keyword index over the same documents, rebuilt from the persisted collection
+        self.lexical_index = BM25Index()
+        self._load_lexical_index()
+
+        # Embedding centroid for query routing, in a file beside Chroma's
+        self._centroid_path = os.path.join(
+            persist_directory, "centroids", f"{collection_name}.json"
+        )
+        self._centroid_stats = self._load_centroid_stats()
+
+    def _check_hnsw_settings(self, metadata: Optional[Dict[str, Any]]):
+        """Warn when an existing collection was built with different HNSW settings."""
+        current = self.collection.metadata or {}
+        for key, value in (metadata or {}).items():
+            if current.get(key) != value:
+                logger.warning(
+                    f"Collection {self.collection.name} was created with {key}={current.get(key)}; "
+                    f"requested {value} only applies if the collection is recreated"
+                )
+
+    def warm_up(self):
+        """Load the embedding model and the collection's HNSW index ahead of the first query."""
+        if self.collection.count():
+            self.collection.query(query_texts=["warm up"], n_results=1, include=["distances"])
+
+    def _load_lexical_index(self):
+        """Populate the BM25 index from documents already stored in the collection."""
+        try:
+            existing = self.collection.get(include=["documents", "metadatas"])
+            self.lexical_index.add(
+                existing["ids"], existing["documents"] or [], existing["metadatas"]
+            )
+            logger.info(f"Loaded {len(self.lexical_index)} documents into lexical index")
+        except Exception as e:
+            logger.warning(f"Could not load lexical index: {str(e)}")
+
+    def _load_centroid_stats(self) -> CentroidStats:
+        """Read the saved centroid, recomputing it if it is missing or out of date."""
+        try:
+            stats = CentroidStats.load(self._centroid_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable centroid file {self._centroid_path}: {str(e)}")
+            stats = None
+        count = self.collection.count()
+        if stats is not None and stats.count == count:
+            return stats
+
+        stats = CentroidStats()
+        offset = 0
+        while offset < count:
+            page = self.collection.get(limit=5000, offset=offset or None, include=["embeddings"])
+            if not page["ids"]:
+                break
+            stats.add(np.asarray(page["embeddings"], dtype=np.float32))
+            offset += len(page["ids"])
+        stats.save(self._centroid_path)
+        return stats
+
+    def count(self) -> int:
+        """Number of stored documents."""
+        return self.collection.count()
+
+    def centroid_stats(self) -> CentroidStats:
+        """Centroid statistics of the stored embeddings, for query routing."""
+        return self._centroid_stats
+
     def add_documents(
         self,
         documents: List[str],
         metadatas: Optional[List[Dict[str, Any]]] = None,
         ids: Optional[List[str]] = None,
+        embeddings: Optional[np.ndarray] = None,
     ):
         """
         Add documents to the vector store.
@@ -41,6 +161,7 @@ class VectorStore:
             documents: List of text documents to embed and store
             metadatas: Optional metadata for each document
             ids: Optional custom IDs for each document
+            embeddings: Optional precomputed embeddings, skipping the embedding call
         """
         if not ids:
             ids = [f"doc_{i}" for i in range(len(documents))]
@@ -50,37 +171,153 @@ class VectorStore:
 
         try:
             logger.info(f"Adding {len(documents)} documents to collection")
-            self.collection.add(documents=documents, metadatas=metadatas, ids=ids)
+            # Embed here rather than in Chroma so the centroid can be updated
+            if embeddings is None:
+                embeddings = embed_texts(documents, self.embedding_function)
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            existing = set(self.collection.get(ids=list(ids), include=[])["ids"])
+            self.collection.add(
+                documents=documents,
+                # Chroma rejects empty metadata dicts but accepts None
+                metadatas=[metadata or None for metadata in metadatas],
+                ids=ids,
+                embeddings=embeddings.tolist(),
+            )
+            # Chroma keeps the first copy of an existing id, so the index does too
+            self.lexical_index.add(ids, documents, metadatas, overwrite=False)
+            new_rows = []
+            for row, doc_id in enumerate(ids):
+                if doc_id not in existing:
+                    existing.add(doc_id)
+                    new_rows.append(row)
+            self._centroid_stats.add(embeddings[new_rows])
+            self._centroid_stats.save(self._centroid_path)
             logger.info("Documents added successfully")
         except Exception as e:
             logger.error(f"Error adding documents: {str(e)}", exc_info=True)
             raise
 
-    def search(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+    def export(self, batch_size: int = 5000) -> Dict[str, Any]:
+        """
+        Read every stored document with its embedding, without re-embedding.
+
+        Returns:
+            {"ids", "documents", "metadatas", "embeddings"} with embeddings as a float32 matrix
+        """
+        ids, documents, metadatas, embeddings = [], [], [], []
+        offset = 0
+        while True:
+            page = self.collection.get(
+                limit=batch_size,
+                offset=offset or None,
+                include=["documents", "metadatas", "embeddings"],
+            )
+            if not page["ids"]:
+                break
+            ids.extend(page["ids"])
+            documents.extend(page["documents"])
+            metadatas.extend(metadata or {} for metadata in page["metadatas"])
+            embeddings.extend(page["embeddings"])
+            offset += len(page["ids"])
+        return {
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+            "embeddings": np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1),
+        }
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Merge new metadata into existing documents, leaving text and embeddings untouched.
+
+        Args:
+            ids: Documents to update
+            metadatas: Metadata to merge into each document's existing metadata
+        """
+        existing = self.collection.get(ids=list(ids), include=["metadatas"])
+        patches = dict(zip(ids, metadatas))
+        merged = [
+            {**(metadata or {}), **patches[doc_id]}
+            for doc_id, metadata in zip(existing["ids"], existing["metadatas"])
+        ]
+        if merged:
+            self.collection.update(ids=existing["ids"], metadatas=merged)
+            self.lexical_index.update_metadata(existing["ids"], merged)
+
+    def delete(self, ids: List[str]) -> int:
+        """
+        Remove documents by id from the collection and the lexical index.
+
+        Returns:
+            Number of documents removed
+        """
+        if not ids:
+            return 0
+        existing = self.collection.get(ids=list(ids), include=["embeddings"])
+        if existing["ids"]:
+            self.collection.delete(ids=existing["ids"])
+            self.lexical_index.remove(existing["ids"])
+            self._centroid_stats.remove(np.asarray(existing["embeddings"], dtype=np.float32))
+            self._centroid_stats.save(self._centroid_path)
+            logger.info(f"Deleted {len(existing['ids'])} documents from collection")
+        return len(existing["ids"])
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        offset: int = 0,
+        include_documents: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Search for documents similar to the query.
 
         Args:
             query: Text query to search for
             n_results: Number of results to return
+            where: Optional metadata filter, applied inside the index
+            where_document: Optional document content filter, applied inside the index
+            offset: Number of leading matches to skip, for pagination
+            include_documents: Return document text; False returns ids/metadata only
+            query_embedding: Precomputed embedding of the query, skipping the embedding call
 
         Returns:
             List of matched documents with their metadata and similarity scores
         """
         try:
             logger.info(f"Searching with query: '{query}' (n_results={n_results})")
-            results = self.collection.query(query_texts=[query], n_results=n_results)
+            include = ["metadatas", "distances"]
+            if include_documents:
+                include.append("documents")
+
+            # ANN queries have no offset, so fetch through the end of the page
+            if query_embedding is not None:
+                query_args = {"query_embeddings": [np.asarray(query_embedding).tolist()]}
+            else:
+                query_args = {"query_texts": [query]}
+            results = self.collection.query(
+                **query_args,
+                n_results=offset + n_results,
+                where=where or None,
+                where_document=where_document or None,
+                include=include,
+            )
 
             # Format the results
             formatted_results = []
-            for i in range(len(results["documents"][0])):
+            for i in range(offset, len(results["ids"][0])):
                 formatted_results.append(
                     {
                         "id": results["ids"][0][i],
-                        "document": results["documents"][0][i],
-                        "metadata": results["metadatas"][0][i],
+                        "document": results["documents"][0][i]
+                        if include_documents
+                        else None,
+                        "metadata": results["metadatas"][0][i] or {},
                         "distance": results["distances"][0][i]
-                        if "distances" in results
+                        if results.get("distances")
                         else None,
                     }
                 )
@@ -90,3 +327,84 @@ class VectorStore:
             logger.error(f"Error searching documents: {str(e)}", exc_info=True)
             # Return empty results instead of breaking
             return []
+
+    def get_documents(
+        self,
+        where: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        include_documents: bool = True,
+        ids: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        List stored documents matching metadata/content filters, without a query.
+
+        Args:
+            where: Optional metadata filter
+            where_document: Optional document content filter
+            limit: Maximum number of documents to return
+            offset: Number of leading matches to skip, for pagination
+            include_documents: Return document text; False returns ids/metadata only
+            ids: Only these document ids (those that exist)
+
+        Returns:
+            List of documents with their metadata
+        """
+        include = ["metadatas"]
+        if include_documents:
+            include.append("documents")
+
+        results = self.collection.get(
+            ids=ids,
+            where=where or None,
+            where_document=where_document or None,
+            limit=limit,
+            offset=offset or None,
+            include=include,
+        )
+        return [
+            {
+                "id": doc_id,
+                "document": results["documents"][i] if include_documents else None,
+                "metadata": results["metadatas"][i] or {},
+            }
+            for i, doc_id in enumerate(results["ids"])
+        ]
+
+    def lexical_search(
+        self,
+        query: str,
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+        where_document: Optional[Dict[str, Any]] = None,
+        offset: int = 0,
+        include_documents: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for documents by keyword using the BM25 index, without embedding the query.
+
+        Args:
+            query: Keyword query
+            n_results: Number of results to return
+            where: Optional metadata filter
+            where_document: Optional document content filter
+            offset: Number of leading matches to skip, for pagination
+            include_documents: Return document text; False returns ids/metadata only
+
+        Returns:
+            List of matched documents with their metadata and BM25 scores
+        """
+        try:
+            logger.info(f"Lexical search with query: '{query}' (n_results={n_results})")
+            return self.lexical_index.search(
+                query,
+                n_results,
+                where=where,
+                where_document=where_document,
+                offset=offset,
+                include_documents=include_documents,
+            )
+        except Exception as e:
+            logger.error(f"Error in lexical search: {str(e)}", exc_info=True)
+            return []
@@ -2,6 +2,7 @@ import os
 import google.generativeai as genai
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
+from app.core.execution_metrics import record_llm_call
 import logging
 
 # Setup logging
@@ -62,6 +63,8 @@ class GeminiService:
 
             # Generate the response
             response = model.generate_content(combined_prompt)
+            usage = getattr(response, "usage_metadata", None)
+            record_llm_call(getattr(usage, "total_token_count", 0) or 0)
 
             # Extract and return the text
             return response.text
@@ -185,6 +185,60 @@ def test_create_workflow_with_zoom_scheduler():
     assert len(created_workflow["agents"]) >= 1
 
 
+def test_catalog_listing_revalidates_with_etag():
+    response = client.get("/api/marketplace/templates/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    unchanged = client.get("/api/marketplace/templates/", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+
+    # Any catalog write changes the response, and with it the ETag
+    workflow = client.post(
+        "/api/workflows/",
+        json={
+            "name": "ETag Test Template",
+            "description": "Temporary",
+            "category": "testing",
+            "is_template": True,
+            "agents": [{"agent_id": 1, "order": 1, "config": {}}],
+        },
+    ).json()
+    try:
+        changed = client.get("/api/marketplace/templates/", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert workflow["id"] in [template["id"] for template in changed.json()]
+    finally:
+        client.delete(f"/api/workflows/{workflow['id']}")
+
+
+def test_catalog_encodings_have_their_own_etags():
+    url = "/api/marketplace/agents/"
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+
+    for accept_encoding in ["gzip;q=0", "identity, *;q=0", "deflate, gzip;q=0"]:
+        plain = client.get(url, headers={"Accept-Encoding": accept_encoding})
+        assert "content-encoding" not in plain.headers
+        assert plain.headers["etag"] != compressed.headers["etag"]
+        assert plain.json() == compressed.json()
+
+    # A cached compressed copy doesn't validate the plain one, and vice versa
+    revalidated = client.get(
+        url, headers={"Accept-Encoding": "identity", "If-None-Match": compressed.headers["etag"]}
+    )
+    assert revalidated.status_code == 200
+    not_modified = client.get(
+        url, headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.headers["vary"] == "Accept-Encoding"
+    assert client.get(url, headers={"If-None-Match": "*"}).status_code == 304
+
+
 # Allow running this file directly for testing
 if __name__ == "__main__":
     print("Running tests for API endpoints...")
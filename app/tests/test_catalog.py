@@ -0,0 +1,413 @@
+import sys, os
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.api import catalog as catalog_api
+from app.core.catalog_search import CatalogSearch
+from app.core.compatibility import CompatibilityGraph, compatibility
+from app.core.workflow_planner import WorkflowPlanner
+from app.db.database import make_engine, make_async_engine
+from app.db.history import ExecutionHistoryWriter
+from app.db.models import Agent
+from app.db.repository import (
+    AGENT_COLUMNS,
+    AsyncCatalog,
+    CatalogRepository,
+    decode_id_cursor,
+    get_catalog,
+    next_cursor,
+    project_fields,
+)
+from app.models.workflow import WorkflowCreate, WorkflowUpdate
+
+AGENTS = {
+    1: {
+        "id": 1,
+        "name": "SEO Optimizer",
+        "description": "SEO recommendations",
+        "category": "marketing",
+        "input_schema": {"type": "object"},
+        "output_schema": {"type": "object"},
+        "config_schema": {},
+        "implementation_path": "app.agents.seo_optimizer.SEOOptimizer",
+        "price": 49.99,
+        "tags": ["SEO"],
+    },
+    2: {
+        "id": 2,
+        "name": "Meeting Summarizer",
+        "description": "Summaries",
+        "category": "productivity",
+        "input_schema": {"type": "object"},
+        "output_schema": {"type": "object"},
+        "config_schema": {},
+        "implementation_path": "app.agents.meeting_summarizer.MeetingSummarizer",
+    },
+}
+
+WORKFLOWS = {
+    1: {
+        "id": 1,
+        "name": "Marketing Content Optimizer",
+        "description": "SEO",
+        "category": "marketing",
+        "is_template": True,
+        "agents": [{"agent_id": 1, "order": 1, "config": {}, "id": 1, "workflow_id": 1}],
+    }
+}
+
+
+def make_repository(engine=None):
+    engine = engine or make_engine("sqlite://")
+    repository = CatalogRepository(sessionmaker(bind=engine), engine)
+    repository.ensure_schema()
+    return repository
+
+
+def test_bootstrap_keeps_ids_and_listing_fields():
+    repository = make_repository()
+    assert repository.bootstrap(AGENTS, WORKFLOWS)
+    assert not repository.bootstrap(AGENTS, WORKFLOWS)
+
+    agent = repository.get_agent(1)
+    assert agent["price"] == 49.99 and agent["tags"] == ["SEO"]
+    assert [a["id"] for a in repository.list_agents(category="productivity")] == [2]
+    template = repository.list_workflows(is_template=True)[0]
+    assert template["id"] == 1 and template["agents"][0]["agent_id"] == 1
+    assert repository.list_categories()["workflow_categories"] == ["marketing"]
+
+
+def test_writes_invalidate_cached_reads():
+    repository = make_repository()
+    repository.bootstrap(AGENTS, WORKFLOWS)
+    assert len(repository.list_workflows()) == 1
+
+    # Cached copies can be modified without affecting later reads
+    repository.get_workflow(1)["name"] = "changed"
+    assert repository.get_workflow(1)["name"] == "Marketing Content Optimizer"
+
+    created = repository.create_workflow(
+        WorkflowCreate(
+            name="Summaries",
+            description="",
+            category="productivity",
+            agents=[{"agent_id": 2, "order": 1, "config": {"summary_length": "short"}}],
+        )
+    )
+    assert [w["id"] for w in repository.list_workflows()] == [1, created["id"]]
+
+    updated = repository.update_workflow(
+        created["id"],
+        WorkflowUpdate(agents=[{"agent_id": 1, "order": 1}, {"agent_id": 2, "order": 2}]),
+    )
+    assert [step["agent_id"] for step in updated["agents"]] == [1, 2]
+    assert repository.get_workflow(created["id"])["agents"] == updated["agents"]
+
+    with pytest.raises(ValueError):
+        repository.update_workflow(created["id"], WorkflowUpdate(agents=[{"agent_id": 9, "order": 1}]))
+    assert repository.update_workflow(99, WorkflowUpdate(name="missing")) is None
+
+    assert repository.delete_workflow(created["id"])
+    assert repository.get_workflow(created["id"]) is None
+    assert not repository.delete_workflow(created["id"])
+
+
+def test_ensure_schema_adds_new_columns_to_existing_tables():
+    engine = make_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE agents (id INTEGER PRIMARY KEY, name VARCHAR, description TEXT, "
+                "category VARCHAR, input_schema JSON, output_schema JSON, config_schema JSON, "
+                "implementation_path VARCHAR)"
+            )
+        )
+    repository = make_repository(engine)
+    repository.bootstrap(AGENTS, {})
+    assert repository.get_agent(1)["tags"] == ["SEO"]
+
+
+def test_async_catalog_without_driver_reads_through_repository():
+    repository = make_repository()
+    repository.bootstrap(AGENTS, WORKFLOWS)
+    catalog = AsyncCatalog(repository, None)
+
+    async def read():
+        workflow = await catalog.get_workflow(1)
+        agents = await catalog.get_agents([agent["agent_id"] for agent in workflow["agents"]])
+        return workflow, agents, await catalog.get_agent(99)
+
+    workflow, agents, missing = asyncio.run(read())
+    assert workflow["name"] == "Marketing Content Optimizer"
+    assert list(agents) == [1]
+    assert missing is None
+
+
+def test_async_catalog_session_shares_repository_cache(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    url = f"sqlite:///{tmp_path / 'catalog.db'}"
+    repository = make_repository(make_engine(url))
+    repository.bootstrap(AGENTS, WORKFLOWS)
+    async_engine = make_async_engine(url)
+
+    async def read():
+        async with async_sessionmaker(async_engine, expire_on_commit=False)() as session:
+            catalog = AsyncCatalog(repository, session)
+            workflow = await catalog.get_workflow(1)
+            agents = await catalog.list_agents(category="marketing")
+        await async_engine.dispose()
+        return workflow, agents
+
+    workflow, agents = asyncio.run(read())
+    assert [agent["agent_id"] for agent in workflow["agents"]] == [1]
+    assert [agent["name"] for agent in agents] == ["SEO Optimizer"]
+    # The async read filled the cache the synchronous repository serves from
+    assert repository.cache_lookup(("workflow", 1))[0]
+
+
+def test_listing_pages_by_cursor_in_id_order():
+    repository = make_repository()
+    agents = {
+        agent_id: {**AGENTS[1], "id": agent_id, "category": "odd" if agent_id % 2 else "even"}
+        for agent_id in range(1, 26)
+    }
+    repository.bootstrap(agents, {})
+
+    seen, after = [], None
+    while True:
+        page = repository.list_agents("odd", limit=5, after=after)
+        seen += [agent["id"] for agent in page]
+        cursor = next_cursor(page, 5)
+        if cursor is None:
+            break
+        after = decode_id_cursor(cursor)
+    assert seen == list(range(1, 26, 2))
+
+    assert project_fields(repository.list_agents(limit=1), "name, price") == [
+        {"id": 1, "name": "SEO Optimizer", "price": 49.99}
+    ]
+    with pytest.raises(ValueError):
+        decode_id_cursor("not-a-cursor")
+
+    # Pages come straight off an index, without sorting the matching rows
+    with repository.bind.connect() as connection:
+        for query in (
+            "SELECT id FROM agents WHERE category = 'odd' AND id > 7 ORDER BY id LIMIT 5",
+            "SELECT id FROM workflows WHERE is_template = 1 AND id > 7 ORDER BY id LIMIT 5",
+            "SELECT id FROM workflows WHERE is_template = 1 AND category = 'x' ORDER BY id",
+        ):
+            plan = " ".join(row[-1] for row in connection.execute(text("EXPLAIN QUERY PLAN " + query)))
+            assert "INDEX" in plan and "TEMP B-TREE" not in plan
+
+
+def test_keyword_search_follows_catalog_writes():
+    repository = make_repository()
+    repository.bootstrap(AGENTS, WORKFLOWS)
+    search = CatalogSearch(repository)
+
+    page = search.search("summaries", kind="agents")
+    assert [(entry["kind"], entry["id"]) for entry in page["results"]] == [("agent", 2)]
+    # Tags are indexed, and name matches outrank description matches
+    assert [entry["id"] for entry in search.search("seo")["results"]][:1] == [1]
+    assert search.search("seo", kind="templates")["results"][0]["name"] == "Marketing Content Optimizer"
+
+    created = repository.create_workflow(
+        WorkflowCreate(
+            name="Weekly Digest",
+            description="Collects meeting summaries into a newsletter",
+            category="productivity",
+            is_template=False,
+            agents=[{"agent_id": 2, "order": 1, "config": {}}],
+        )
+    )
+    hits = search.search("newsletter", kind="workflows")["results"]
+    assert [entry["id"] for entry in hits] == [created["id"]]
+    assert search.search("newsletter", kind="templates")["results"] == []
+
+    repository.delete_workflow(created["id"])
+    assert search.search("newsletter")["results"] == []
+
+    # Pages continue where the cursor left off
+    first = search.search("seo summaries", limit=1)
+    second = search.search("seo summaries", limit=1, cursor=first["next_cursor"])
+    assert first["next_cursor"] and first["results"] != second["results"]
+    with pytest.raises(ValueError):
+        search.search("seo", kind="everything")
+
+
+def schema_agent(agent_id, inputs, outputs, required=None):
+    return {
+        **AGENTS[1],
+        "id": agent_id,
+        "name": f"Agent {agent_id}",
+        "input_schema": {
+            "type": "object",
+            "properties": {name: {"type": "string"} for name in inputs},
+            **({"required": required} if required else {}),
+        },
+        "output_schema": {
+            "type": "object",
+            "properties": {name: {"type": "string"} for name in outputs},
+        },
+    }
+
+
+def test_compatibility_scores_exact_and_alias_matches():
+    summarizer = schema_agent(1, ["transcript"], ["summary", "action_items"])
+    grammar = schema_agent(2, ["content"], ["corrected_text"])
+    scheduler = schema_agent(3, ["meeting_title", "agenda"], ["join_url"], required=["agenda"])
+
+    # A text output feeds a text input under another name
+    assert compatibility(summarizer, grammar) == {
+        "score": 0.9,
+        "compatible": True,
+        "fields": {"content": "summary"},
+    }
+    assert compatibility(grammar, scheduler)["compatible"] is False
+    assert compatibility(grammar, scheduler)["score"] == 0.5
+    # Required inputs decide; optional ones don't dilute the score
+    assert compatibility(schema_agent(4, [], ["agenda"]), scheduler)["score"] == 1.0
+
+
+def test_compatibility_graph_ranks_next_agents_and_follows_new_agents():
+    repository = make_repository()
+    agents = {
+        1: schema_agent(1, ["transcript"], ["summary", "action_items"]),
+        2: schema_agent(2, ["content"], ["corrected_text"]),
+        3: schema_agent(3, ["summary", "action_items"], ["email"]),
+    }
+    repository.bootstrap(agents, {})
+    graph = CompatibilityGraph(repository)
+
+    ranked = graph.next_agents(1, k=5)
+    assert [(entry["agent_id"], entry["score"]) for entry in ranked] == [(3, 1.0), (2, 0.9)]
+    assert graph.next_agents(1, k=1)[0]["name"] == "Agent 3"
+    assert graph.next_agents(3) == []
+    assert graph.next_agents(99) is None
+    assert graph.pair(3, 1)["compatible"] is False
+    assert graph.pair(2, 1)["fields"] == {"transcript": "corrected_text"}
+
+    # An agent added later is scored against the others in both directions
+    added = schema_agent(4, ["email"], ["transcript"])
+    with repository.session_factory() as session, session.begin():
+        session.add(Agent(**{column: added[column] for column in AGENT_COLUMNS}))
+    repository.invalidate()
+
+    assert graph.sync() == 1
+    assert [entry["agent_id"] for entry in graph.next_agents(3)] == [4]
+    assert [entry["agent_id"] for entry in graph.next_agents(4)] == [1, 2, 3]
+    assert graph.sync() == 0
+
+
+def test_planner_returns_cheapest_and_fastest_chains():
+    repository = make_repository()
+    agents = {
+        1: schema_agent(1, ["transcript"], ["minutes"]),
+        2: schema_agent(2, ["content"], ["seo_score"]),
+        3: schema_agent(3, ["minutes"], ["seo_score"]),
+        4: schema_agent(4, ["email"], ["seo_score"]),
+    }
+    repository.bootstrap(agents, {})
+
+    # Agent 2 is slow and agent 3 fast in recent history; agent 1 has none
+    writer = ExecutionHistoryWriter(repository.session_factory, flush_interval=0.05)
+    for agent_id, duration in ((2, 5000.0), (3, 100.0)):
+        writer.submit(
+            {
+                "workflow_id": 1,
+                "status": "success",
+                "started_at": time.time(),
+                "steps": [
+                    {
+                        "step": 0,
+                        "agent_id": agent_id,
+                        "status": "success",
+                        "started_at": time.time(),
+                        "duration_ms": duration,
+                        "llm_calls": 1,
+                    }
+                ],
+            }
+        )
+    writer.flush()
+    writer.shutdown()
+
+    planner = WorkflowPlanner(CompatibilityGraph(repository), repository.session_factory)
+    plans = planner.plan("transcript", "seo_score")
+
+    def chains(objective):
+        return [[step["agent_id"] for step in plan["workflow"]["agents"]] for plan in plans[objective]]
+
+    # One step with an aliased input is cheapest; two well-fitting fast steps are fastest
+    assert chains("cheapest") == [[2], [1, 3]]
+    assert chains("fastest") == [[1, 3], [2]]
+    best = plans["fastest"][0]
+    assert best["estimated_latency_ms"] == 3100.0
+    assert [step["measured"] for step in best["steps"]] == [False, True]
+    assert [step["order"] for step in best["workflow"]["agents"]] == [1, 2]
+
+    assert planner.plan("transcript", "unknown_field") == {"cheapest": [], "fastest": []}
+    with pytest.raises(ValueError):
+        planner.plan("transcript", "seo_score", max_steps=0)
+
+
+def test_ndjson_export_round_trips_through_batched_import():
+    source = make_repository()
+    source.bootstrap(AGENTS, WORKFLOWS)
+    target = make_repository()
+
+    app = FastAPI()
+    app.include_router(catalog_api.router)
+    app.dependency_overrides[get_catalog] = lambda: source
+    exported = TestClient(app).get("/catalog/export", params={"batch_size": 1})
+    assert exported.headers["content-type"] == "application/x-ndjson"
+    lines = exported.content.splitlines()
+    assert [json.loads(line)["kind"] for line in lines] == ["agent", "agent", "workflow"]
+
+    new_workflow = {
+        "kind": "workflow",
+        "name": "Notes",
+        "description": "Summaries",
+        "category": "productivity",
+        "agents": [{"agent_id": 2, "order": 1, "config": {}}],
+    }
+    body = b"\n".join(
+        lines
+        + [
+            b"not json",
+            json.dumps({**new_workflow, "agents": [{"agent_id": 99, "order": 1}]}).encode(),
+            json.dumps({"kind": "agent", "name": "Incomplete"}).encode(),
+            b"",
+            json.dumps(new_workflow).encode(),
+        ]
+    )
+    app.dependency_overrides[get_catalog] = lambda: target
+    client = TestClient(app)
+    report = client.post("/catalog/import", params={"batch_size": 2}, content=body).json()
+
+    assert report["imported"] == 4
+    assert [error["line"] for error in report["errors"]] == [4, 5, 6]
+    assert "Agent with id 99 not found" in report["errors"][1]["error"]
+    assert target.get_agent(1)["price"] == 49.99
+    assert target.get_workflow(1)["agents"][0]["agent_id"] == 1
+    # Records without an id take the next one
+    assert [workflow["id"] for workflow in target.list_workflows()] == [1, 2]
+
+    # Existing ids are reported unless replaced
+    again = client.post("/catalog/import", content=lines[0]).json()
+    assert again["failed"] == 1 and "already exists" in again["errors"][0]["error"]
+    renamed = json.dumps({**json.loads(lines[0]), "name": "SEO Pro"}).encode()
+    replaced = client.post("/catalog/import", params={"replace": True}, content=renamed).json()
+    assert replaced["imported"] == 1
+    assert target.get_agent(1)["name"] == "SEO Pro"
@@ -0,0 +1,181 @@
+import sys, os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.rag.chunker import TokenChunker, count_tokens
+from app.rag.document_processor import DocumentProcessor
+from app.rag.bulk_ingest import BulkIngestor
+from app.rag.ingestion_queue import KnowledgeIngestionQueue
+
+SAMPLE_TRANSCRIPT = os.path.join(
+    os.path.dirname(__file__), "..", "..", "sample_inputs", "meeting_transcript.txt"
+)
+
+
+def load_transcript() -> str:
+    with open(SAMPLE_TRANSCRIPT) as f:
+        return f.read()
+
+
+def test_chunks_respect_size_and_overlap():
+    text = load_transcript()
+    chunker = TokenChunker(chunk_size=200, chunk_overlap=40)
+
+    chunks = chunker.split_text(text)
+
+    assert len(chunks) > 1
+    # Allow a little slack for boundary whitespace in the token estimate
+    assert all(count_tokens(chunk) <= 210 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        # Each chunk starts with text repeated from the end of the previous one
+        assert current.split()[0] in previous
+
+
+def test_chunks_prefer_sentence_boundaries():
+    sentence = "The launch review covers budget, timeline and owners. "
+    chunker = TokenChunker(chunk_size=60, chunk_overlap=10)
+
+    chunks = chunker.split_text(sentence * 20)
+
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_unspaced_multibyte_text_is_cut_between_characters():
+    text = "キャッシュの無効化は難しい問題です" * 30
+    chunker = TokenChunker(chunk_size=40, chunk_overlap=10)
+    # Byte-level tokens, as byte-pair encodings produce for CJK text
+    chunker._pieces = lambda value: [bytes([byte]) for byte in value.encode("utf-8")]
+
+    chunks = chunker.split_text(text)
+
+    assert len(chunks) > 1
+    assert all(chunk in text for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        # Without word boundaries the overlap is kept at the token offset
+        assert previous[-2:] in current
+    # Nothing is lost: every character is in some chunk, in order
+    rebuilt = chunks[0]
+    for chunk in chunks[1:]:
+        overlap = next(k for k in range(len(chunk), 0, -1) if rebuilt.endswith(chunk[:k]))
+        rebuilt += chunk[overlap:]
+    assert rebuilt == text
+
+
+def test_stream_matches_whole_document():
+    text = load_transcript() * 5
+    chunker = TokenChunker(chunk_size=150, chunk_overlap=30)
+
+    streamed = list(chunker.chunk_stream(text.splitlines(keepends=True), 2000))
+
+    assert streamed == chunker.split_text(text)
+
+
+def test_process_documents_keeps_metadata_per_chunk():
+    processor = DocumentProcessor(chunk_size=100, chunk_overlap=20)
+
+    processed = processor.process_documents(
+        [load_transcript(), "Short note."], [{"source": "transcript"}, {"source": "note"}]
+    )
+
+    assert len(processed["chunks"]) == len(processed["metadatas"])
+    assert processed["chunks"][-1] == "Short note."
+    assert processed["metadatas"][-1] == {"source": "note"}
+    assert processed["metadatas"][0] == {"source": "transcript"}
+
+
+class RecordingStore:
+    """Stand-in vector store that records what would be embedded."""
+
+    def __init__(self):
+        self.batches = []
+
+    def add_documents(self, documents, metadatas=None, ids=None):
+        self.batches.append({"documents": documents, "metadatas": metadatas, "ids": ids})
+
+
+def test_bulk_ingestor_batches_and_reports_progress():
+    store = RecordingStore()
+    progress = []
+    documents = (f"Archived meeting {i}. " * 50 for i in range(40))
+
+    stats = BulkIngestor(
+        store,
+        max_workers=2,
+        docs_per_task=4,
+        embed_batch_size=16,
+        max_pending_tasks=2,
+        chunk_size=100,
+        chunk_overlap=20,
+    ).ingest(documents, id_prefix="archive", total_documents=40, progress_callback=progress.append)
+
+    ids = [chunk_id for batch in store.batches for chunk_id in batch["ids"]]
+    assert stats["documents_processed"] == 40
+    assert stats["chunks_written"] == len(ids) == len(set(ids))
+    assert all(len(batch["ids"]) <= 16 for batch in store.batches)
+    assert "archive_39_0" in ids
+    assert progress[-1]["documents_processed"] == 40
+    assert "ingested_at" in store.batches[0]["metadatas"][0]
+
+
+def test_process_documents_derives_chunk_ids():
+    processor = DocumentProcessor(chunk_size=100, chunk_overlap=20)
+
+    processed = processor.process_documents([load_transcript(), "Short note."], ids=["t", "n"])
+
+    assert processed["ids"][0] == "t_0"
+    assert processed["ids"][-1] == "n"
+    assert len(processed["ids"]) == len(set(processed["ids"])) == len(processed["chunks"])
+
+
+class RecordingService:
+    """Stand-in RAG service that records store_documents calls."""
+
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+
+    def store_documents(self, collection_name, documents, metadatas=None, ids=None):
+        if collection_name in self.failing:
+            raise RuntimeError(f"{collection_name} is unavailable")
+        self.calls.append((collection_name, documents, metadatas))
+        return len(documents)
+
+
+def test_ingestion_queue_batches_dedupes_and_flushes_on_shutdown():
+    service = RecordingService()
+    ingestion_queue = KnowledgeIngestionQueue(service, batch_size=10, flush_interval=0.05)
+
+    assert ingestion_queue.submit("notes", "Budget review moved to Friday.", {"step": 1})
+    assert not ingestion_queue.submit("notes", "budget review  moved to friday.")
+    ingestion_queue.submit_many(
+        [{"collection": "tips", "document": f"Tip {i}"} for i in range(12)]
+    )
+    ingestion_queue.shutdown()
+
+    written = {(name, doc) for name, docs, _ in service.calls for doc in docs}
+    assert len(written) == 13
+    assert all(len(docs) <= 10 for _, docs, _ in service.calls)
+    assert ingestion_queue.stats["duplicates"] == 1
+    assert ingestion_queue.pending() == 0
+
+    # After shutdown, submissions are written inline instead of being lost
+    ingestion_queue.submit("notes", "Late note.")
+    assert service.calls[-1][1] == ["Late note."]
+
+
+def test_ingestion_queue_counts_failed_writes_and_accepts_them_again():
+    service = RecordingService()
+    service.failing.add("notes")
+    ingestion_queue = KnowledgeIngestionQueue(service, flush_interval=0.05)
+
+    assert ingestion_queue.submit("notes", "Budget review moved to Friday.")
+    ingestion_queue.flush()
+    assert ingestion_queue.stats["failed"] == 1
+    assert ingestion_queue.stats["written"] == 0
+
+    # A document whose write failed is not a duplicate of itself
+    service.failing.clear()
+    assert ingestion_queue.submit("notes", "Budget review moved to Friday.")
+    ingestion_queue.shutdown()
+    assert ingestion_queue.stats["written"] == 1
+    assert service.calls == [("notes", ["Budget review moved to Friday."], [{}])]
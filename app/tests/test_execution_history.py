@@ -0,0 +1,107 @@
+import sys, os
+
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.core.execution_metrics import track_step, record_llm_call, record_cache_hit
+from app.db.database import make_engine
+from app.db.history import (
+    ExecutionHistoryWriter,
+    agent_stats,
+    get_execution,
+    list_executions,
+    percentile,
+)
+from app.db.repository import ensure_schema
+
+
+def make_writer():
+    engine = make_engine("sqlite://")
+    ensure_schema(engine)
+    session_factory = sessionmaker(bind=engine)
+    return ExecutionHistoryWriter(session_factory, flush_interval=0.05), session_factory
+
+
+def run_record(started_at, durations, failed_step=None):
+    steps = [
+        {
+            "step": i,
+            "agent_id": agent_id,
+            "agent_name": f"Agent {agent_id}",
+            "status": "error" if i == failed_step else "success",
+            "started_at": started_at + i,
+            "finished_at": started_at + i + duration / 1000,
+            "duration_ms": duration,
+            "input_size": 100,
+            "output_size": 200,
+            "llm_calls": 1,
+            "tokens": 50,
+            "cache_hits": 0,
+            "error": "boom" if i == failed_step else None,
+        }
+        for i, (agent_id, duration) in enumerate(durations)
+    ]
+    return {
+        "workflow_id": 1,
+        "workflow_name": "Pipeline",
+        "status": "error" if failed_step is not None else "success",
+        "started_at": started_at,
+        "duration_ms": sum(duration for _, duration in durations),
+        "llm_calls": len(steps),
+        "tokens": 50 * len(steps),
+        "error_count": int(failed_step is not None),
+        "steps": steps,
+    }
+
+
+def test_step_counters_only_count_inside_a_step():
+    record_llm_call(100)  # Outside a step: ignored
+    with track_step() as metrics:
+        record_llm_call(120)
+        record_llm_call(30)
+        record_cache_hit()
+    record_cache_hit()
+
+    assert metrics["llm_calls"] == 2
+    assert metrics["tokens"] == 150
+    assert metrics["cache_hits"] == 1
+    assert metrics["duration_ms"] >= 0
+    assert metrics["finished_at"] >= metrics["started_at"]
+
+
+def test_writer_batches_records_and_stats_report_percentiles():
+    writer, session_factory = make_writer()
+    for run in range(20):
+        failed_step = 1 if run == 0 else None
+        writer.submit(run_record(1000.0 + run * 10, [(1, 10.0 * (run + 1)), (2, 5.0)], failed_step))
+    writer.flush()
+    writer.shutdown()
+    assert writer.stats["written"] == 20
+
+    with session_factory() as db:
+        recent = list_executions(db, workflow_id=1, limit=5)
+        assert [run["started_at"] for run in recent] == [1190.0, 1180.0, 1170.0, 1160.0, 1150.0]
+
+        execution = get_execution(db, recent[-1]["id"])
+        assert [step["agent_id"] for step in execution["steps"]] == [1, 2]
+
+        stats = {entry["agent_id"]: entry for entry in agent_stats(db, since=0, until=2000)}
+        assert stats[1]["steps"] == 20
+        assert stats[1]["p50_ms"] == 100.0
+        assert stats[1]["p95_ms"] == 190.0
+        assert stats[1]["max_ms"] == 200.0
+        assert stats[2]["errors"] == 1
+        assert stats[2]["error_rate"] == 0.05
+        assert stats[2]["avg_tokens"] == 50
+
+        # The window excludes older runs
+        windowed = agent_stats(db, since=1100, until=2000, agent_id=1)
+        assert [entry["steps"] for entry in windowed] == [10]
+
+
+def test_percentile_nearest_rank():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 95) == 4.0
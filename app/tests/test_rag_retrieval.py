@@ -0,0 +1,716 @@
+import sys, os
+import hashlib
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.rag.lexical_index import BM25Index, tokenize
+from app.rag.numpy_store import NumpyVectorStore
+from app.rag.vector_store import VectorStore
+from app.rag.benchmark import benchmark_hnsw, param_grid
+from app.rag.rag_service import RAGService
+from app.rag.retention import RetentionCompactor, plan_retention
+from app.rag.dedup import NearDuplicateIndex
+from app.rag.seeding import KnowledgeSeeder
+from app.rag.ranking import reciprocal_rank_fusion, rerank
+from app.rag.filters import (
+    matches_where,
+    matches_where_document,
+    encode_cursor,
+    decode_cursor,
+    cursor_state,
+)
+
+
+def build_index():
+    index = BM25Index()
+    index.add(
+        ["m1", "m2", "s1"],
+        [
+            "Meeting summary: Priya and Marcus agreed on the launch timeline.",
+            "Meeting summary: budget review postponed to next sprint.",
+            "Use canonical tags to prevent duplicate content issues.",
+        ],
+        [{"type": "meeting_summary"}, {"type": "meeting_summary"}, {"type": "seo"}],
+    )
+    return index
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert tokenize("The Launch of SEO-friendly pages") == [
+        "launch",
+        "seo-friendly",
+        "pages",
+    ]
+
+
+def test_bm25_exact_term_lookup():
+    index = build_index()
+
+    results = index.search("Marcus", n_results=3)
+
+    assert [r["id"] for r in results] == ["m1"]
+    assert results[0]["metadata"] == {"type": "meeting_summary"}
+    assert results[0]["score"] > 0
+
+
+def test_bm25_remove_and_overwrite():
+    index = build_index()
+
+    index.remove(["m1"])
+    assert index.search("Marcus") == []
+    assert "m1" not in index
+
+    index.add(["s1"], ["Canonical tags again"], overwrite=False)
+    assert index.documents["s1"].startswith("Use canonical")
+
+    index.add(["s1"], ["Sitemaps help crawlers"])
+    assert index.search("canonical") == []
+    assert [r["id"] for r in index.search("sitemaps")] == ["s1"]
+
+
+def test_reciprocal_rank_fusion_prefers_agreement():
+    vector = [
+        {"id": "a", "document": "A", "metadata": {}, "distance": 0.1},
+        {"id": "b", "document": "B", "metadata": {}, "distance": 0.2},
+    ]
+    lexical = [
+        {"id": "b", "document": "B", "metadata": {}, "distance": None, "score": 3.0},
+        {"id": "c", "document": "C", "metadata": {}, "distance": None, "score": 1.0},
+    ]
+
+    fused = reciprocal_rank_fusion([vector, lexical], n_results=3)
+
+    assert [r["id"] for r in fused] == ["b", "a", "c"]
+    assert fused[0]["distance"] == 0.2
+
+
+def test_rerank_dedupes_and_diversifies():
+    candidates = [
+        {"id": "1", "document": "Meeting summary: launch moved to May."},
+        {"id": "2", "document": "meeting summary:  launch moved to May."},
+        {"id": "3", "document": "Meeting summary: launch moved to May, again."},
+        {"id": "4", "document": "Launch checklist owned by Priya."},
+    ]
+
+    results = rerank("launch owner Priya", candidates, n_results=2)
+
+    assert [r["id"] for r in results] == ["4", "1"]
+    assert all("rerank_score" in r for r in results)
+
+
+def test_rerank_respects_token_budget():
+    candidates = [
+        {"id": "long", "document": "launch " * 200},
+        {"id": "short", "document": "launch plan"},
+    ]
+
+    results = rerank("launch", candidates, n_results=2, token_budget=20)
+
+    assert [r["id"] for r in results] == ["short"]
+
+
+def test_where_filters_and_cursor_round_trip():
+    metadata = {"type": "meeting_summary", "ingested_at": 1000.0, "tone": "professional"}
+
+    assert matches_where(metadata, {"type": "meeting_summary"})
+    assert matches_where(
+        metadata,
+        {"$and": [{"ingested_at": {"$gte": 500}}, {"tone": {"$in": ["professional"]}}]},
+    )
+    assert not matches_where(metadata, {"$or": [{"type": "seo"}, {"tone": "casual"}]})
+    assert matches_where_document("Budget review", {"$contains": "Budget"})
+    assert decode_cursor(encode_cursor(25)) == 25
+    assert decode_cursor(None) == 0
+    assert cursor_state(encode_cursor(25, candidates=40)) == {"candidates": 40}
+
+
+def test_bm25_filtered_projected_page():
+    index = build_index()
+
+    results = index.search(
+        "meeting summary",
+        n_results=1,
+        where={"type": "meeting_summary"},
+        offset=1,
+        include_documents=False,
+    )
+
+    assert len(results) == 1
+    assert results[0]["document"] is None
+    assert results[0]["metadata"]["type"] == "meeting_summary"
+
+
+class HashingEmbeddingFunction:
+    """Deterministic bag-of-words embedding so vector tests run offline."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        vectors = []
+        for text in input:
+            vector = np.zeros(32, dtype=np.float32)
+            for term in tokenize(text):
+                vector[int(hashlib.md5(term.encode()).hexdigest(), 16) % 32] += 1.0
+            norm = np.linalg.norm(vector)
+            vectors.append((vector / norm if norm else vector).tolist())
+        return vectors
+
+
+SEO_TIPS = [
+    "Use descriptive titles with primary keywords under 60 characters.",
+    "Create meta descriptions between 150-160 characters with a call to action.",
+    "Optimize images with descriptive filenames and alt text.",
+    "Use canonical tags to prevent duplicate content issues.",
+    "Create an XML sitemap and submit to search engines.",
+    "Use 301 redirects for changed or moved pages.",
+]
+
+
+def test_numpy_store_matches_chroma(tmp_path):
+    embedding_function = HashingEmbeddingFunction()
+    metadatas = [{"type": "seo_best_practice", "n": i} for i in range(len(SEO_TIPS))]
+    ids = [f"seo_{i}" for i in range(len(SEO_TIPS))]
+
+    chroma = VectorStore("seo_knowledge", str(tmp_path / "chroma"), embedding_function)
+    numpy_store = NumpyVectorStore("seo_knowledge", str(tmp_path), embedding_function)
+    chroma.add_documents(SEO_TIPS, metadatas, ids)
+    numpy_store.add_documents(SEO_TIPS, metadatas, ids)
+
+    for query in ["descriptive titles", "sitemap for search engines", "image alt text"]:
+        expected = chroma.search(query, n_results=3)
+        actual = numpy_store.search(query, n_results=3)
+        # Exact ties may come back in either order, so compare distances and the top hit
+        assert actual[0]["id"] == expected[0]["id"]
+        assert np.allclose(
+            [r["distance"] for r in actual], [r["distance"] for r in expected], atol=1e-4
+        )
+
+    filtered = numpy_store.search("titles", n_results=2, where={"n": {"$gte": 3}})
+    assert all(r["metadata"]["n"] >= 3 for r in filtered)
+
+
+def test_reranked_pages_continue_one_ranking(tmp_path):
+    service = RAGService()
+    service.configure_collection(
+        "seo",
+        "numpy",
+        persist_directory=str(tmp_path),
+        embedding_function=HashingEmbeddingFunction(),
+    )
+    tips = SEO_TIPS + [f"{tip} Review it every quarter." for tip in SEO_TIPS]
+    service.add_documents("seo", tips, ids=[f"seo_{i}" for i in range(len(tips))])
+
+    ids, cursor = [], None
+    while True:
+        page = service.search_page(
+            "seo", "descriptive titles", page_size=1, rerank=True, cursor=cursor
+        )
+        ids += [result["id"] for result in page["results"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # Every page is cut from one reranking of the first page's candidates
+    candidates = service.search("seo", "descriptive titles", n_results=8)
+    assert ids == [r["id"] for r in service.rerank_results("descriptive titles", candidates, 8)]
+
+    # A token budget covers all pages, so it ends pagination after the first
+    page = service.search_page(
+        "seo", "descriptive titles", page_size=1, rerank=True, token_budget=50
+    )
+    assert len(page["results"]) == 1 and page["next_cursor"] is None
+    with pytest.raises(ValueError):
+        service.search(
+            "seo", "descriptive titles", rerank=True, token_budget=50, cursor=encode_cursor(1)
+        )
+
+
+def test_numpy_store_persists_and_grows(tmp_path):
+    embedding_function = HashingEmbeddingFunction()
+    store = NumpyVectorStore(
+        "email_templates", str(tmp_path), embedding_function, initial_capacity=2
+    )
+    store.add_documents(SEO_TIPS, [{"i": i} for i in range(6)], [f"t{i}" for i in range(6)])
+    store.add_documents(["duplicate id is ignored"], [{"i": 99}], ["t0"])
+
+    reopened = NumpyVectorStore("email_templates", str(tmp_path), embedding_function)
+
+    assert reopened.count() == 6
+    assert reopened.capacity >= 6
+    assert reopened.search(SEO_TIPS[4], n_results=1)[0]["id"] == "t4"
+    assert reopened.lexical_search("canonical")[0]["id"] == "t3"
+
+
+def test_numpy_store_follows_writes_of_another_process(tmp_path):
+    # Two handles on one directory stand in for two worker processes
+    embedding_function = HashingEmbeddingFunction()
+    first = NumpyVectorStore("shared", str(tmp_path), embedding_function, initial_capacity=2)
+    second = NumpyVectorStore("shared", str(tmp_path), embedding_function, initial_capacity=2)
+
+    first.add_documents(SEO_TIPS[:3], [{} for _ in range(3)], ["a", "b", "c"])
+    assert second.count() == 3
+    # Appends go after the other handle's rows rather than over them
+    second.add_documents(SEO_TIPS[3:5], [{}, {}], ["d", "a"])
+    assert first.count() == 4
+    assert first.search(SEO_TIPS[3], n_results=1)[0]["id"] == "d"
+
+    first.delete(["b"])
+    assert [doc["id"] for doc in second.get_documents()] == ["a", "c", "d"]
+    assert second.lexical_search("canonical")[0]["id"] == "d"
+    assert second.search(SEO_TIPS[1], n_results=3)[0]["id"] != "b"
+
+
+def test_switching_to_numpy_copies_the_chroma_collection_once(tmp_path, monkeypatch):
+    from app.rag import rag_service
+
+    embedding_function = HashingEmbeddingFunction()
+    chroma = RAGService()
+    for name in ("seo_knowledge", "large_knowledge"):
+        chroma.configure_collection(
+            name, "chroma", persist_directory=str(tmp_path), embedding_function=embedding_function
+        )
+        chroma.add_documents(name, SEO_TIPS, [{"tip": i} for i in range(len(SEO_TIPS))])
+    expected = chroma.search("seo_knowledge", SEO_TIPS[3], n_results=2)
+
+    monkeypatch.setattr(rag_service, "NUMPY_MAX_DOCUMENTS", len(SEO_TIPS))
+    service = RAGService()
+    service.configure_collection(
+        "seo_knowledge",
+        "numpy",
+        persist_directory=str(tmp_path),
+        embedding_function=embedding_function,
+    )
+    calls = embedding_function.calls
+    store = service.get_collection("seo_knowledge")
+    assert isinstance(store, NumpyVectorStore)
+    assert store.count() == len(SEO_TIPS)
+    # Stored embeddings are copied, not recomputed
+    assert embedding_function.calls == calls
+    results = service.search("seo_knowledge", SEO_TIPS[3], n_results=2)
+    assert [r["id"] for r in results] == [r["id"] for r in expected]
+    assert results[0]["metadata"] == expected[0]["metadata"]
+
+    # Collections above the limit stay on Chroma
+    monkeypatch.setattr(rag_service, "NUMPY_MAX_DOCUMENTS", 2)
+    service.configure_collection(
+        "large_knowledge",
+        "numpy",
+        persist_directory=str(tmp_path),
+        embedding_function=embedding_function,
+    )
+    assert isinstance(service.get_collection("large_knowledge"), VectorStore)
+
+
+def test_quantized_numpy_store_rescoring_matches_exact(tmp_path):
+    rng = np.random.default_rng(7)
+    # Embeddings concentrate near a low-dimensional subspace, which PCA recovers
+    latent = rng.normal(size=(600, 12)) @ rng.normal(size=(12, 32))
+    vectors = (latent + rng.normal(scale=0.05, size=(600, 32))).astype(np.float32)
+    documents = [f"vector {i}" for i in range(len(vectors))]
+    ids = [f"v{i}" for i in range(len(vectors))]
+    queries = vectors[:20] + rng.normal(scale=0.05, size=(20, 32)).astype(np.float32)
+
+    exact = NumpyVectorStore("exact", str(tmp_path), HashingEmbeddingFunction())
+    exact.add_documents(documents, ids=ids, embeddings=vectors)
+
+    for options in ({"quantization": "int8"}, {"quantization": "float16", "pca_dim": 16}):
+        name = "_".join(str(value) for value in options.values())
+        store = NumpyVectorStore(name, str(tmp_path), HashingEmbeddingFunction(), **options)
+        store.add_documents(documents, ids=ids, embeddings=vectors)
+        assert store.quantized is not None
+
+        reopened = NumpyVectorStore(name, str(tmp_path), HashingEmbeddingFunction(), **options)
+        assert reopened.quantized is not None and reopened.sq_norms is None
+        for query in queries:
+            expected, expected_distances = exact._nearest(query, 5, None)
+            actual, actual_distances = reopened._nearest(query, 5, None)
+            assert actual[0] == expected[0]
+            assert np.allclose(actual_distances, expected_distances, atol=1e-3)
+
+
+def test_ivf_index_recall_and_incremental_adds(tmp_path):
+    rng = np.random.default_rng(11)
+    centers = rng.normal(scale=4.0, size=(20, 16))
+    vectors = (centers[rng.integers(0, 20, 4000)] + rng.normal(size=(4000, 16))).astype(np.float32)
+    ids = [f"v{i}" for i in range(len(vectors))]
+    documents = [f"vector {i}" for i in range(len(vectors))]
+    options = {"index": "ivf", "n_lists": 20, "nprobe": 4, "ivf_min_train": 1000}
+
+    store = NumpyVectorStore("ivf", str(tmp_path), HashingEmbeddingFunction(), **options)
+    store.add_documents(documents[:3000], ids=ids[:3000], embeddings=vectors[:3000])
+    store.recluster()
+    # Added after training: assigned to the existing lists without re-clustering
+    store.add_documents(documents[3000:], ids=ids[3000:], embeddings=vectors[3000:])
+    store.recluster()
+    assert store.ivf is not None and store.ivf.count == 4000
+
+    reopened = NumpyVectorStore("ivf", str(tmp_path), HashingEmbeddingFunction(), **options)
+    assert reopened.ivf is not None and reopened.ivf.n_lists == 20
+
+    hits = 0
+    for query in vectors[3900:3950] + 0.1:
+        exact_rows, _ = reopened._nearest(query, 5, None, nprobe=20)
+        approx_rows, _ = reopened._nearest(query, 5, None)
+        hits += len(set(exact_rows) & set(approx_rows))
+    assert hits / 250 >= 0.9
+
+
+def test_vector_store_applies_hnsw_settings_on_create(tmp_path):
+    hnsw = {"space": "cosine", "construction_ef": 200, "search_ef": 64, "M": 32}
+    store = VectorStore("tuned_collection", str(tmp_path), HashingEmbeddingFunction(), hnsw=hnsw)
+    store.add_documents(SEO_TIPS, [{"n": i} for i in range(6)], [f"s{i}" for i in range(6)])
+    store.warm_up()
+
+    assert store.collection.metadata["hnsw:space"] == "cosine"
+    assert store.collection.metadata["hnsw:M"] == 32
+    # Cosine distances are 1 - similarity, so an exact match is ~0
+    assert store.search(SEO_TIPS[2], n_results=1)[0]["distance"] < 1e-4
+
+    # Reopening with different settings keeps the collection as it was built
+    reopened = VectorStore("tuned_collection", str(tmp_path), HashingEmbeddingFunction(), hnsw={"M": 8})
+    assert reopened.collection.metadata["hnsw:M"] == 32
+
+
+def test_hnsw_benchmark_reports_recall_and_latency():
+    rng = np.random.default_rng(3)
+    corpus = rng.normal(size=(500, 16)).astype(np.float32)
+    queries = rng.normal(size=(20, 16)).astype(np.float32)
+
+    rows = benchmark_hnsw(corpus, queries, param_grid([100], [10, 200], [16]), k=5)
+
+    assert [row["search_ef"] for row in rows] == [10, 200]
+    assert rows[1]["recall@5"] >= 0.95
+    assert rows[1]["recall@5"] >= rows[0]["recall@5"]
+    assert all(row["p95_ms"] >= row["p50_ms"] > 0 for row in rows)
+
+
+def test_plan_retention_expires_merges_and_evicts():
+    now = 1_000_000.0
+    documents = [
+        {"id": "old", "document": "Old note", "metadata": {"ingested_at": now - 500}},
+        {"id": "a1", "document": "Meeting summary: budget.", "metadata": {"ingested_at": now - 50}},
+        {"id": "a2", "document": "meeting summary -- Budget", "metadata": {"ingested_at": now - 10}},
+        {"id": "b", "document": "Hiring plan", "metadata": {"ingested_at": now - 40}},
+        {"id": "c", "document": "Launch date", "metadata": {"ingested_at": now - 30}},
+        {"id": "seed", "document": "Reference", "metadata": {}},
+    ]
+    last_used = {doc["id"]: doc["metadata"].get("ingested_at", 0.0) for doc in documents}
+    last_used["b"] = now  # recently returned by a search
+
+    plan = plan_retention(
+        documents,
+        {"ttl_seconds": 100, "merge_duplicates": True, "max_documents": 3},
+        last_used,
+        now=now,
+    )
+
+    assert plan == {"expired": ["old"], "merged": ["a1"], "evicted": ["seed"]}
+
+
+def test_compactor_deletes_from_numpy_store_and_keeps_indexes_consistent(tmp_path):
+    service = RAGService()
+    service.configure_collection(
+        "meeting_knowledge",
+        "numpy",
+        persist_directory=str(tmp_path),
+        embedding_function=HashingEmbeddingFunction(),
+        quantization="int8",
+    )
+    expired = {"ingested_at": 1.0, "type": "meeting_summary"}
+    service.add_documents("meeting_knowledge", SEO_TIPS[:3], [expired] * 3, ["e0", "e1", "e2"])
+    service.add_documents(
+        "meeting_knowledge", SEO_TIPS[3:] + [SEO_TIPS[3].upper()], ids=["k3", "k4", "k5", "dup"]
+    )
+
+    compactor = RetentionCompactor(
+        service, {"meeting_knowledge": {"ttl_seconds": 3600, "merge_duplicates": True}}
+    )
+    report = compactor.compact("meeting_knowledge")
+
+    assert sorted(report["expired"]) == ["e0", "e1", "e2"]
+    assert len(report["merged"]) == 1 and report["remaining"] == 3
+    store = service.get_collection("meeting_knowledge")
+    assert store.search(SEO_TIPS[5], n_results=1)[0]["id"] == "k5"
+    assert not store.lexical_search("descriptive titles")
+
+    reopened = NumpyVectorStore(
+        "meeting_knowledge", str(tmp_path), HashingEmbeddingFunction(), quantization="int8"
+    )
+    assert reopened.count() == 3
+    assert reopened.search(SEO_TIPS[4], n_results=1)[0]["id"] == "k4"
+
+
+def test_minhash_index_finds_near_duplicates():
+    index = NearDuplicateIndex(threshold=0.7)
+    summary = (
+        "Meeting summary: the team agreed to move the launch to May, "
+        "hire two engineers and review the marketing budget next week."
+    )
+    index.add("s1", summary)
+    index.add("s2", "Action items: Alice drafts the press release and Bob books the venue.")
+
+    match = index.find(summary.replace("next week", "next Tuesday week"))
+    assert match is not None and match[0] == "s1" and match[1] >= 0.7
+    assert index.find("Quarterly revenue grew in every region except the north.") is None
+
+    index.remove(["s1"])
+    assert index.find(summary) is None
+
+
+def test_add_documents_skips_and_merges_near_duplicates(tmp_path):
+    service = RAGService()
+    service.configure_collection(
+        "meeting_knowledge",
+        "numpy",
+        persist_directory=str(tmp_path),
+        embedding_function=HashingEmbeddingFunction(),
+    )
+    service.configure_deduplication("meeting_knowledge", threshold=0.8, policy="merge")
+    summary = (
+        "Meeting summary: launch moves to May, the budget review is on Friday at noon "
+        "and the hiring plan needs sign-off from finance before the end of the quarter."
+    )
+
+    service.add_documents("meeting_knowledge", [summary], [{"run": 1}])
+    service.add_documents(
+        "meeting_knowledge",
+        [
+            summary + " Thanks, everyone.",
+            "Meeting summary: the hiring plan is approved for two engineers.",
+        ],
+        [{"run": 2}, {"run": 2}],
+    )
+
+    documents = service.list_documents("meeting_knowledge")["results"]
+    assert len(documents) == 2
+    merged = next(doc for doc in documents if doc["document"] == summary)
+    assert merged["metadata"]["run"] == 2
+
+
+def test_bulk_add_documents_drops_near_duplicates(tmp_path):
+    service = RAGService()
+    service.configure_collection(
+        "meeting_knowledge",
+        "numpy",
+        persist_directory=str(tmp_path),
+        embedding_function=HashingEmbeddingFunction(),
+    )
+    service.configure_deduplication("meeting_knowledge", threshold=0.8)
+    summary = (
+        "Meeting summary: launch moves to May, the budget review is on Friday at noon "
+        "and the hiring plan needs sign-off from finance before the end of the quarter."
+    )
+    service.add_documents("meeting_knowledge", [summary])
+
+    stats = service.bulk_add_documents(
+        "meeting_knowledge",
+        [summary + " Thanks, everyone.", "Meeting summary: two engineers are hired."] * 3,
+        id_prefix="archive",
+        max_workers=1,
+        embed_batch_size=2,
+    )
+
+    assert stats["chunks_written"] == 1
+    assert stats["chunks_skipped"] == 5
+    # Bulk-loaded chunks are known to later calls
+    service.add_documents("meeting_knowledge", ["Meeting summary: two engineers are hired!"])
+    assert service.get_collection("meeting_knowledge").count() == 2
+
+
+def test_snapshot_round_trip_loads_without_reembedding(tmp_path):
+    service = RAGService()
+    source_ef, target_ef = HashingEmbeddingFunction(), HashingEmbeddingFunction()
+    service.configure_collection(
+        "seo_source", persist_directory=str(tmp_path / "a"), embedding_function=source_ef
+    )
+    service.configure_collection(
+        "seo_target", "numpy", persist_directory=str(tmp_path / "b"), embedding_function=target_ef
+    )
+    metadatas = [{"type": "seo_best_practice"}] * 5 + [{}]
+    service.add_documents("seo_source", SEO_TIPS, metadatas, [f"seo_{i}" for i in range(6)])
+
+    path = service.export_snapshot("seo_source", str(tmp_path / "snapshots"), dtype="float16")
+    imported = service.import_snapshots(str(tmp_path / "snapshots"), only_empty=True)
+    assert imported == {}  # the source collection is not empty
+    assert service.import_snapshot(path, "seo_target") == 6
+
+    target = service.get_collection("seo_target")
+    assert target_ef.calls == 0
+    assert target.count() == 6
+    assert sorted(doc["id"] for doc in target.get_documents()) == sorted(f"seo_{i}" for i in range(6))
+    assert target.get_documents(where={"type": "seo_best_practice"}, limit=10)[0]["metadata"]
+    assert target.search(SEO_TIPS[3], n_results=1)[0]["id"] == "seo_3"
+
+
+def test_seeder_writes_each_version_once(tmp_path):
+    service = RAGService()
+    embedding_function = HashingEmbeddingFunction()
+    service.configure_collection(
+        "seo_knowledge",
+        "numpy",
+        persist_directory=str(tmp_path),
+        embedding_function=embedding_function,
+    )
+    manifest_path = str(tmp_path / "seed_manifest.json")
+    seeder = KnowledgeSeeder(manifest_path, service)
+    seeder.register("seo", "seo_knowledge", SEO_TIPS)
+
+    assert seeder.pending() == ["seo"]
+    assert seeder.seed_all() == {"seo": True}
+    assert seeder.is_seeded("seo")
+
+    # A new process reads the manifest instead of scanning the collection
+    restarted = KnowledgeSeeder(manifest_path, service)
+    restarted.register("seo", "seo_knowledge", SEO_TIPS)
+    calls = embedding_function.calls
+    assert restarted.ensure_seeded("seo") is False
+    assert embedding_function.calls == calls
+
+    # Editing the corpus changes its version and replaces the old documents
+    restarted.register("seo", "seo_knowledge", SEO_TIPS[:4] + ["Write for people first."])
+    assert restarted.seed_all() == {"seo": True}
+    documents = service.get_collection("seo_knowledge").get_documents()
+    assert sorted(doc["id"] for doc in documents) == [f"seo_{i}" for i in range(5)]
+    assert "Write for people first." in [doc["document"] for doc in documents]
+
+    # A lost manifest re-seeds over the stored copies without staying pending
+    os.remove(manifest_path)
+    recovered = KnowledgeSeeder(manifest_path, service)
+    recovered.register("seo", "seo_knowledge", SEO_TIPS[:4] + ["Write for people first."])
+    assert recovered.seed_all() == {"seo": True}
+    assert recovered.pending() == []
+
+
+def test_routing_searches_only_collections_near_the_query(tmp_path):
+    service = RAGService()
+    embedding_function = HashingEmbeddingFunction()
+    corpora = {
+        "seo_knowledge": SEO_TIPS,
+        "meeting_knowledge": [
+            "Meeting summary: the budget review moved to Friday.",
+            "Action items from the standup: finish the hiring plan.",
+            "Meeting notes: launch date agreed with finance.",
+        ],
+        "email_templates": [
+            "Thank you for your email, I will reply by tomorrow.",
+            "Please find the invoice attached to this email.",
+        ],
+    }
+    for name, documents in corpora.items():
+        backend = "chroma" if name == "meeting_knowledge" else "numpy"
+        service.configure_collection(
+            name, backend, persist_directory=str(tmp_path), embedding_function=embedding_function
+        )
+        service.add_documents(name, documents, [{} for _ in documents])
+
+    calls = embedding_function.calls
+    results = service.search_across_collections(
+        "canonical tags duplicate content", 2, list(corpora), route=True, top_n=1, margin=0.0
+    )
+    assert list(results) == ["seo_knowledge"]
+    assert results["seo_knowledge"][0]["document"] == SEO_TIPS[3]
+    # One embedding for routing, shared by the searches
+    assert embedding_function.calls == calls + 1
+
+    # Centroids follow deletes and survive reopening
+    stats = service.get_collection("meeting_knowledge").centroid_stats()
+    assert stats.count == 3
+    first = service.get_collection("meeting_knowledge").get_documents()[0]["id"]
+    service.delete_documents("meeting_knowledge", [first])
+    reopened = VectorStore(
+        "meeting_knowledge", persist_directory=str(tmp_path), embedding_function=embedding_function
+    )
+    assert reopened.centroid_stats().count == 2
+    assert np.allclose(reopened.centroid_stats().centroid, stats.centroid)
+
+
+def test_routing_falls_back_to_all_collections_when_embedding_fails(tmp_path):
+    service = RAGService()
+    embedding_function = HashingEmbeddingFunction()
+    for name in ("seo_knowledge", "email_templates"):
+        service.configure_collection(
+            name, "numpy", persist_directory=str(tmp_path), embedding_function=embedding_function
+        )
+        service.add_documents(name, SEO_TIPS[:2], [{}, {}])
+
+    def unavailable(input):
+        raise RuntimeError("embedding service unavailable")
+
+    for name in ("seo_knowledge", "email_templates"):
+        service.get_collection(name).embedding_function = unavailable
+
+    selected, query_embeddings = service.route_query(
+        "canonical tags", ["seo_knowledge", "email_templates"], top_n=1, margin=0.0
+    )
+    assert selected == ["seo_knowledge", "email_templates"]
+    assert query_embeddings == {}
+
+
+def test_catalog_semantic_index_reembeds_only_changed_entries(tmp_path):
+    from sqlalchemy.orm import sessionmaker
+    from app.core.catalog_search import CatalogSearch, CATALOG_COLLECTION
+    from app.db.database import make_engine
+    from app.db.repository import CatalogRepository
+    from app.models.workflow import WorkflowUpdate
+
+    engine = make_engine("sqlite://")
+    repository = CatalogRepository(sessionmaker(bind=engine), engine)
+    repository.ensure_schema()
+    agent = {
+        "input_schema": {},
+        "output_schema": {},
+        "config_schema": {},
+        "implementation_path": "app.agents.base.BaseAgent",
+    }
+    agents = {
+        1: {**agent, "id": 1, "name": "Meeting Summarizer", "category": "productivity"},
+        2: {**agent, "id": 2, "name": "SEO Optimizer", "category": "marketing"},
+    }
+    agents[1]["description"] = "Summarize meeting transcripts"
+    agents[2]["description"] = "Improve search rankings of web pages"
+    workflow = {
+        "id": 1,
+        "name": "Meeting notes pipeline",
+        "description": "Summarize meeting transcripts into notes",
+        "category": "productivity",
+        "is_template": True,
+        "agents": [{"agent_id": 1, "order": 1}],
+    }
+    repository.bootstrap(agents, {1: workflow})
+
+    service = RAGService()
+    embedding_function = HashingEmbeddingFunction()
+    service.configure_collection(
+        CATALOG_COLLECTION,
+        "numpy",
+        persist_directory=str(tmp_path),
+        embedding_function=embedding_function,
+    )
+    search = CatalogSearch(repository, service)
+
+    page = search.search("summarize my meeting transcripts", kind="templates", mode="semantic")
+    assert [(entry["kind"], entry["id"]) for entry in page["results"]] == [("workflow", 1)]
+    agents_page = search.search("search rankings", kind="agents", mode="semantic", limit=1)
+    assert agents_page["results"][0]["id"] == 2
+
+    # A restarted process finds the stored digests current; a write re-embeds
+    # only the entry it touched, without another scan
+    restarted = CatalogSearch(repository, service)
+    assert restarted.sync() == 0
+    calls = embedding_function.calls
+    repository.update_workflow(1, WorkflowUpdate(description="Turn sales calls into follow-up emails"))
+    assert embedding_function.calls == calls + 1
+    assert restarted.sync() == 0
+    page = restarted.search("sales calls follow-up emails", kind="templates", mode="semantic")
+    assert [entry["id"] for entry in page["results"]] == [1]
+
+    # Renaming an agent re-embeds the workflows that name it among their steps
+    renamed = {**agents[1], "name": "Transcript Digest"}
+    assert repository.import_batch([{"line": 1, "kind": "agent", "data": renamed}], True) == []
+    stored = service.get_collection(CATALOG_COLLECTION).get_documents(ids=["workflow_1"])
+    assert "Steps: Transcript Digest." in stored[0]["document"]
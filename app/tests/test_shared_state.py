@@ -0,0 +1,257 @@
+import sys, os
+import asyncio
+import threading
+import time
+
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from app.api.rate_limit import RateLimiter
+from app.db.database import make_engine
+from app.db.jobs import JobStore
+from app.db.knowledge_outbox import KnowledgeOutbox
+from app.db.repository import AsyncCatalog, CatalogRepository, ensure_schema
+from app.db.shared_state import LeaderLease, SharedState
+from app.rag.ingestion_queue import KnowledgeIngestionQueue
+from app.models.workflow import WorkflowCreate
+
+AGENTS = {
+    1: {
+        "id": 1,
+        "name": "Meeting Summarizer",
+        "description": "Summaries",
+        "category": "productivity",
+        "input_schema": {"type": "object"},
+        "output_schema": {"type": "object"},
+        "config_schema": {},
+        "implementation_path": "app.agents.meeting_summarizer.MeetingSummarizer",
+    }
+}
+
+WORKFLOWS = {
+    1: {
+        "id": 1,
+        "name": "Meeting Notes",
+        "description": "Summaries",
+        "category": "productivity",
+        "agents": [{"agent_id": 1, "order": 1, "config": {}}],
+    }
+}
+
+
+def make_session_factory(tmp_path):
+    # A file database, like the one worker processes share
+    engine = make_engine(f"sqlite:///{tmp_path / 'shared.db'}")
+    ensure_schema(engine)
+    return sessionmaker(bind=engine)
+
+
+def test_counters_are_atomic_and_expire(tmp_path):
+    state = SharedState(make_session_factory(tmp_path))
+    assert [state.incr("hits") for _ in range(3)] == [1, 2, 3]
+    assert state.incr("hits", 10) == 13
+
+    assert state.incr("window", ttl=0.05) == 1
+    time.sleep(0.1)
+    assert state.get("window") is None
+    assert state.incr("window", ttl=60) == 1
+    assert state.purge_expired() == 0
+
+    state.set("config", {"mode": "shared"})
+    assert state.get("config") == {"mode": "shared"}
+    state.delete("config")
+    assert state.get("config", "gone") == "gone"
+
+
+def test_workers_drop_cached_reads_after_another_workers_write(tmp_path):
+    session_factory = make_session_factory(tmp_path)
+    state = SharedState(session_factory)
+    # Two repositories on one database stand in for two worker processes
+    first = CatalogRepository(session_factory, shared_state=state, version_check_interval=0)
+    second = CatalogRepository(session_factory, shared_state=state, version_check_interval=0)
+    first.bootstrap(AGENTS, WORKFLOWS)
+
+    assert len(second.list_workflows()) == 1
+    first.create_workflow(
+        WorkflowCreate(
+            name="Notes",
+            description="Summaries",
+            category="productivity",
+            agents=[{"agent_id": 1, "order": 1, "config": {}}],
+        )
+    )
+    assert second.version == first.version
+    assert len(second.list_workflows()) == 2
+    # Loading again (as every worker does at startup) is a no-op
+    assert second.bootstrap(AGENTS, WORKFLOWS) is False
+
+
+class ThreadRecordingState(SharedState):
+    """Shared state that remembers which threads read it."""
+
+    def __init__(self, session_factory):
+        super().__init__(session_factory)
+        self.readers = set()
+
+    def get(self, key, default=None):
+        self.readers.add(threading.get_ident())
+        return super().get(key, default)
+
+
+def test_cached_reads_check_other_workers_off_the_event_loop(tmp_path):
+    session_factory = make_session_factory(tmp_path)
+    state = ThreadRecordingState(session_factory)
+    first = CatalogRepository(session_factory, shared_state=state, version_check_interval=0)
+    second = CatalogRepository(session_factory, shared_state=state, version_check_interval=0)
+    first.bootstrap(AGENTS, WORKFLOWS)
+    assert len(second.list_workflows()) == 1
+
+    first.create_workflow(
+        WorkflowCreate(
+            name="Notes",
+            description="Summaries",
+            category="productivity",
+            agents=[{"agent_id": 1, "order": 1, "config": {}}],
+        )
+    )
+    state.readers.clear()
+
+    async def read():
+        return threading.get_ident(), await AsyncCatalog(second).list_workflows()
+
+    loop_thread, workflows = asyncio.run(read())
+    # The cached listing isn't served after the other worker's write
+    assert len(workflows) == 2
+    assert state.readers and loop_thread not in state.readers
+
+
+def test_job_status_and_result_are_stored(tmp_path):
+    jobs = JobStore(make_session_factory(tmp_path))
+    job = jobs.create(workflow_id=1)
+    assert jobs.get(job["id"])["status"] == "queued"
+
+    jobs.run(job["id"], lambda value: {"final_output": value}, "done")
+    finished = jobs.get(job["id"])
+    assert finished["status"] == "success"
+    assert finished["result"] == {"final_output": "done"}
+    assert finished["finished_at"] >= finished["started_at"]
+
+    failed = jobs.create(workflow_id=1)
+    jobs.run(failed["id"], lambda: 1 / 0)
+    assert jobs.get(failed["id"])["status"] == "error"
+    assert jobs.get("missing") is None
+
+
+def test_jobs_of_exited_workers_and_overdue_jobs_fail(tmp_path):
+    import socket
+    import subprocess
+
+    jobs = JobStore(make_session_factory(tmp_path))
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    host = socket.gethostname()
+
+    orphaned, alive, overdue = (jobs.create(workflow_id=1) for _ in range(3))
+    now = time.time()
+    jobs._update(orphaned["id"], status="running", started_at=now, worker=f"{host}:{exited.pid}")
+    jobs._update(alive["id"], status="running", started_at=now, worker=f"{host}:{os.getpid()}")
+    jobs._update(overdue["id"], created_at=now - 120)
+
+    assert jobs.fail_stale(timeout=60) == 2
+    assert jobs.get(orphaned["id"])["status"] == "error"
+    assert "exited" in jobs.get(orphaned["id"])["error"]
+    assert jobs.get(alive["id"])["status"] == "running"
+    assert jobs.get(overdue["id"])["error"] == "Timed out after 60 seconds"
+
+
+def test_rate_limit_is_counted_in_shared_state(tmp_path):
+    limiter = RateLimiter(limit=2, shared_state=SharedState(make_session_factory(tmp_path)))
+    app = FastAPI()
+
+    @app.get("/limited", dependencies=[Depends(limiter)])
+    def limited():
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert [client.get("/limited").status_code for _ in range(3)] == [200, 200, 429]
+    assert int(client.get("/limited").headers["Retry-After"]) >= 1
+
+
+class RecordingRAGService:
+    def __init__(self):
+        self.written = []
+        self.failing = False
+
+    def store_documents(self, collection_name, documents, metadatas):
+        if self.failing:
+            raise RuntimeError("Embedding service unavailable")
+        self.written.extend((collection_name, document) for document in documents)
+        return len(documents)
+
+
+def test_only_the_leader_writes_knowledge(tmp_path):
+    session_factory = make_session_factory(tmp_path)
+    state = SharedState(session_factory)
+    leases = [LeaderLease("rag", ttl=60, shared_state=state) for _ in range(2)]
+    leases[1].owner = "other-host:1"
+    assert leases[0].is_leader()
+    assert not leases[1].is_leader()
+
+    services = [RecordingRAGService(), RecordingRAGService()]
+    queues = [
+        KnowledgeIngestionQueue(service, flush_interval=0.05) for service in services
+    ]
+    for queue, lease in zip(queues, leases):
+        queue.start(lease, KnowledgeOutbox(session_factory))
+
+    # A follower hands its documents to the leader instead of writing them
+    queues[1].submit("meeting_knowledge", "Standup notes: ship the beta on Friday.")
+    queues[1].flush()
+    assert services[1].written == []
+    outbox = KnowledgeOutbox(session_factory)
+    deadline = time.time() + 5
+    while outbox.take(10) and time.time() < deadline:
+        time.sleep(0.05)
+    assert outbox.take(10) == []
+    assert services[0].written == [
+        ("meeting_knowledge", "Standup notes: ship the beta on Friday.")
+    ]
+
+    # Stepping down lets the other worker lead right away
+    for queue in queues:
+        queue.shutdown()
+    leases[0].release()
+    assert leases[1].is_leader()
+    assert not leases[0].is_leader()
+
+
+def test_handed_over_knowledge_stays_in_the_outbox_until_written(tmp_path):
+    session_factory = make_session_factory(tmp_path)
+    lease = LeaderLease("rag", ttl=60, shared_state=SharedState(session_factory))
+    outbox = KnowledgeOutbox(session_factory)
+    outbox.put([{"collection": "meeting_knowledge", "document": "Ship the beta on Friday."}])
+
+    service = RecordingRAGService()
+    service.failing = True
+    queue = KnowledgeIngestionQueue(service, flush_interval=0.05)
+    queue.start(lease, outbox)
+    try:
+        deadline = time.time() + 5
+        while not queue.stats["failed"] and time.time() < deadline:
+            time.sleep(0.05)
+        assert queue.stats["failed"] >= 1
+        assert [item["document"] for _, item in outbox.take(10)] == ["Ship the beta on Friday."]
+
+        # The leader retries on a later drain
+        service.failing = False
+        deadline = time.time() + 5
+        while outbox.take(10) and time.time() < deadline:
+            time.sleep(0.05)
+        assert outbox.take(10) == []
+        assert service.written == [("meeting_knowledge", "Ship the beta on Friday.")]
+    finally:
+        queue.shutdown()
+        lease.release()
@@ -1,21 +1,24 @@
-from app.db.database import SessionLocal, engine
-from app.db.models import Base
-from app.core.sample_data import create_sample_data
+from app.db.repository import CatalogRepository
+from app.core.knowledge_registry import KnowledgeRegistry
 
 
 def setup():
     """Initialize the database with sample data."""
     # Create database tables first
     print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    catalog = CatalogRepository()
+    catalog.ensure_schema()
 
     # Then add sample data
-    db = SessionLocal()
-    try:
-        create_sample_data(db)
+    if catalog.bootstrap():
         print("Sample data created successfully!")
-    finally:
-        db.close()
+    else:
+        print("Catalog already populated, skipping sample data.")
+
+    # Write the agents' reference knowledge so the app starts with it in place
+    print("Seeding knowledge collections...")
+    for name, written in KnowledgeRegistry.get_instance().seed_knowledge().items():
+        print(f"  {name}: {'seeded' if written else 'up to date'}")
 
 
 if __name__ == "__main__":